@@ -0,0 +1,136 @@
+"""Corpus of API responses which the benchmark server replays."""
+
+import gzip
+import json
+import re
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Optional
+
+from tests.stub_server import (
+    StubServer,
+    make_github_content,
+    make_github_license,
+    make_github_tree,
+    make_pypi_release,
+)
+
+
+@dataclass(frozen=True)
+class CorpusEntry:
+    """Recorded responses related to a package.
+
+    `license` is the response of GitHub's "Get the license for a repository" API,
+    or None if the API answered "404 Not Found". `github` holds other responses of
+    GitHub API used to search the source tree for a license file, keyed by paths
+    relative to `/repos/{owner}/{repo}` (e.g. "/git/trees/main").
+    """
+
+    name: str
+    version: str
+    pypi: str
+    repository: Optional[str] = None  # "owner/repo" on GitHub
+    license: Optional[str] = None
+    github: dict[str, str] = field(default_factory=dict)
+
+
+def load_corpus(path: Path) -> list[CorpusEntry]:
+    """Load a corpus recorded by `scripts/record_benchmark_corpus.py`."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [CorpusEntry(**json.loads(line)) for line in f if line.strip()]
+
+
+def save_corpus(path: Path, entries: Iterable[CorpusEntry]) -> None:
+    """Save a corpus in form of gzip-compressed JSON Lines."""
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+
+
+def synthesize_corpus(size: int) -> list[CorpusEntry]:
+    """Make a corpus of fake packages.
+
+    Most of the packages have a license file GitHub can detect. Every tenth one
+    has a license file only in its source tree, and every twentieth one has no
+    repository on GitHub.
+    """
+    entries = []
+    for i in range(size):
+        name = f"package-{i:05d}"
+        repository = f"org/{name}"
+        if i % 20 == 19:
+            pypi = make_pypi_release(name, "1.0.0", {"Homepage": "https://example.com"})
+            entries.append(CorpusEntry(name, "1.0.0", pypi=pypi.decode("utf-8")))
+            continue
+
+        pypi = make_pypi_release(
+            name, "1.0.0", {"Source": f"https://github.com/{repository}"}
+        )
+        entry = CorpusEntry(
+            name, "1.0.0", pypi=pypi.decode("utf-8"), repository=repository
+        )
+        if i % 10 == 9:
+            text = f"Copyright of {name}\n" * 20
+            github = {
+                "": json.dumps({"default_branch": "main"}),
+                "/git/trees/main": make_github_tree(
+                    {"README.md": "blob", "COPYING.txt": "blob", "src": "tree"}
+                ).decode("utf-8"),
+                "/contents/COPYING.txt": make_github_content(
+                    "org", name, "COPYING.txt", text
+                ).decode("utf-8"),
+            }
+            entries.append(replace(entry, github=github))
+        else:
+            text = f"MIT License of {name}\n" * 20
+            license_ = make_github_license("org", name, text)
+            entries.append(replace(entry, license=license_.decode("utf-8")))
+    return entries
+
+
+def scale_corpus(entries: Sequence[CorpusEntry], size: int) -> list[CorpusEntry]:
+    """Repeat entries of a corpus to make one of the given size.
+
+    Copies are distinguished by suffix `-N` appended to the package and repository
+    names, so that they are not deduplicated by DLC.
+    """
+    scaled = list(entries[:size])
+    k = 1
+    while len(scaled) < size:
+        for entry in entries[: size - len(scaled)]:
+            scaled.append(_make_copy(entry, k))
+        k += 1
+    return scaled
+
+
+def _make_copy(entry: CorpusEntry, k: int) -> CorpusEntry:
+    pypi = entry.pypi
+    repository = entry.repository
+    if repository is not None:
+        pattern = re.compile(
+            rf"(github\.com/{re.escape(repository)})(?![\w-])", re.IGNORECASE
+        )
+        pypi = pattern.sub(rf"\g<1>-{k}", pypi)
+        repository = f"{repository}-{k}"
+    return replace(entry, name=f"{entry.name}-{k}", pypi=pypi, repository=repository)
+
+
+def install_corpus(server: StubServer, entries: Iterable[CorpusEntry]) -> None:
+    """Register responses in a corpus to a server."""
+    for entry in entries:
+        server.add(f"/pypi/{entry.name}/{entry.version}/json", entry.pypi.encode())
+        if entry.repository is None:
+            continue
+
+        # DLC requests GitHub API with normalized (lower case) names
+        repos_path = f"/repos/{entry.repository.lower()}"
+        if entry.license is not None:
+            server.add(f"{repos_path}/license", entry.license.encode())
+        for path, body in entry.github.items():
+            server.add(f"{repos_path}{path}", body.encode())
+
+
+def make_requirements(entries: Iterable[CorpusEntry]) -> str:
+    """Make content of requirements.txt pinning packages in a corpus."""
+    return "".join(f"{entry.name}=={entry.version}\n" for entry in entries)
@@ -0,0 +1,309 @@
+"""Benchmark of collecting license data and writing the report.
+
+Requests are sent to a local server replaying a corpus of API responses, so
+results do not depend on network nor rate limit of the real services. Each size is
+run in a fresh process so that its peak memory usage is measured on its own. Run
+from the repository root:
+
+    python -m benchmarks.run --sizes 100,1000,10000
+"""
+
+import asyncio
+import functools
+import io
+import json
+import logging
+import multiprocessing
+import sys
+import tempfile
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Literal, Optional
+
+import click
+import rich.logging
+
+from benchmarks.corpus import (
+    CorpusEntry,
+    install_corpus,
+    load_corpus,
+    make_requirements,
+    scale_corpus,
+    synthesize_corpus,
+)
+from dlc.rate_limit import GITHUB_REST_RATE_LIMITER
+from dlc.registries.pypi import collect_package_metadata
+from dlc.reports.html_report import write_html_report
+from dlc.reports.report_params import ReportParams
+from dlc.settings import SETTINGS
+from tests.stub_server import StubServer
+
+if sys.platform != "win32":
+    import resource
+
+_logger = logging.getLogger(__name__)
+
+CacheMode = Literal["none", "cold", "warm"]
+
+
+@dataclass
+class BenchmarkResult:
+    size: int
+    engine: str
+    cache: str
+    collect_seconds: float
+    report_seconds: float
+    num_packages: int
+    num_failures: int
+    num_requests: int
+    max_rss_mib: Optional[float]  # Peak of the process; None if not available
+
+
+@dataclass
+class ServerOptions:
+    latency: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_every: int = 0
+    retry_after: int = 1
+
+
+def run_benchmark(
+    entries: Sequence[CorpusEntry],
+    *,
+    engine: Literal["thread", "async"] = "thread",
+    cache: CacheMode = "cold",
+    server_options: Optional[ServerOptions] = None,
+    github_rate: float = 1000.0,
+) -> BenchmarkResult:
+    """Measure time to collect license data of packages in a corpus and report it.
+
+    `cache` selects state of the on-disk cache: disabled, empty, or filled by a run
+    before the measured one.
+    """
+    server = StubServer(**asdict(server_options or ServerOptions()), seed=0)
+    install_corpus(server, entries)
+    requirements = make_requirements(entries)
+    with (
+        server.running(),
+        tempfile.TemporaryDirectory() as tmpdir,
+        _configure(server, Path(tmpdir, "cache"), cache, github_rate),
+    ):
+        if cache == "warm":
+            _collect(requirements, engine)
+            server.requests.clear()
+
+        t0 = perf_counter()
+        packages = _collect(requirements, engine)
+        t1 = perf_counter()
+        params = ReportParams(
+            input_format="requirements_txt",
+            input_source=requirements,
+            target_name="benchmark",
+            outdir=Path(tmpdir, "report"),
+            start_time=datetime.now(tz=timezone.utc),
+            packages=packages,
+        )
+        write_html_report(params)
+        t2 = perf_counter()
+
+    return BenchmarkResult(
+        size=len(entries),
+        engine=engine,
+        cache=cache,
+        collect_seconds=t1 - t0,
+        report_seconds=t2 - t1,
+        num_packages=len(packages),
+        num_failures=params.num_failures,
+        num_requests=len(server.requests),
+        max_rss_mib=_get_max_rss_mib(),
+    )
+
+
+def _get_max_rss_mib() -> Optional[float]:
+    if sys.platform == "win32":
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # In bytes on macOS, and in KiB on the other platforms
+    return max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+
+
+def _run_in_process(
+    benchmark: Callable[[], BenchmarkResult], max_workers: Optional[int]
+) -> BenchmarkResult:
+    # Peak memory usage of a process never decreases; measure each run in a
+    # process of its own
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_process,
+        initargs=(max_workers,),
+    ) as executor:
+        return executor.submit(benchmark).result()
+
+
+def _init_process(max_workers: Optional[int]) -> None:
+    logging.basicConfig(level=logging.ERROR, handlers=[rich.logging.RichHandler()])
+    if max_workers is not None:
+        SETTINGS.max_workers = max_workers
+
+
+def _collect(requirements: str, engine: Literal["thread", "async"]) -> list:
+    with io.StringIO(requirements) as f:
+        if engine == "async":
+            from dlc.registries.pypi_async import collect_package_metadata_async
+
+            return asyncio.run(collect_package_metadata_async(f))
+
+        with ThreadPoolExecutor(SETTINGS.max_workers) as executor:
+            return collect_package_metadata(executor, f)
+
+
+@contextmanager
+def _configure(
+    server: StubServer, cache_dir: Path, cache: CacheMode, github_rate: float
+) -> Iterator[None]:
+    overrides = {
+        "github_token": None,
+        "github_api_url": server.url,
+        "pypi_url": server.url,
+        "use_cache": cache != "none",
+        "refresh_cache": False,
+        "cache_dir": cache_dir,
+    }
+    saved_settings = {name: getattr(SETTINGS, name) for name in overrides}
+    saved_rate = GITHUB_REST_RATE_LIMITER.rate
+    for name, value in overrides.items():
+        setattr(SETTINGS, name, value)
+    # Start with a fresh schedule; the local server has no rate limit of its own
+    # except the simulated one.
+    GITHUB_REST_RATE_LIMITER.reset(rate=github_rate)
+    try:
+        yield
+    finally:
+        for name, value in saved_settings.items():
+            setattr(SETTINGS, name, value)
+        GITHUB_REST_RATE_LIMITER.reset(rate=saved_rate)
+
+
+@click.command
+@click.option(
+    "--sizes",
+    default="100,1000,10000",
+    show_default=True,
+    help="Comma separated numbers of packages to benchmark with.",
+)
+@click.option(
+    "--corpus",
+    "corpus_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help=(
+        "Corpus recorded by scripts/record_benchmark_corpus.py. It is repeated to"
+        " fill the sizes. Fake packages are used if omitted."
+    ),
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["thread", "async"]),
+    default="thread",
+    show_default=True,
+)
+@click.option(
+    "--cache",
+    type=click.Choice(["none", "cold", "warm"]),
+    default="cold",
+    show_default=True,
+    help="State of the on-disk cache: disabled, empty, or filled by a prior run.",
+)
+@click.option("--max-workers", type=int, help="Override MAX_WORKERS setting.")
+@click.option(
+    "--latency", type=float, default=0.02, show_default=True, help="In seconds."
+)
+@click.option(
+    "--error-rate",
+    type=float,
+    default=0.0,
+    show_default=True,
+    help="Ratio of requests answered with 502.",
+)
+@click.option(
+    "--rate-limit-every",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Answer every N-th GitHub request with 403 and Retry-After.",
+)
+@click.option("--retry-after", type=int, default=1, show_default=True)
+@click.option(
+    "--github-rate",
+    type=float,
+    default=1000.0,
+    show_default=True,
+    help="Requests per second allowed by DLC's GitHub rate limiter.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="Write results to this file in JSON.",
+)
+def main(  # noqa: PLR0913
+    *,
+    sizes: str,
+    corpus_path: Optional[Path],
+    engine: Literal["thread", "async"],
+    cache: CacheMode,
+    max_workers: Optional[int],
+    latency: float,
+    error_rate: float,
+    rate_limit_every: int,
+    retry_after: int,
+    github_rate: float,
+    output: Optional[Path],
+) -> None:
+    """Benchmark collecting license data and writing the report."""
+    corpus = load_corpus(corpus_path) if corpus_path is not None else None
+    server_options = ServerOptions(latency, error_rate, rate_limit_every, retry_after)
+
+    results = []
+    click.echo(
+        f"{'size':>6} {'collect[s]':>10} {'report[s]':>10} {'pkg/s':>8}"
+        f" {'failures':>8} {'requests':>8} {'maxrss[MiB]':>11}"
+    )
+    for size in [int(x) for x in sizes.split(",")]:
+        entries = (
+            scale_corpus(corpus, size)
+            if corpus is not None
+            else synthesize_corpus(size)
+        )
+        benchmark = functools.partial(
+            run_benchmark,
+            entries,
+            engine=engine,
+            cache=cache,
+            server_options=server_options,
+            github_rate=github_rate,
+        )
+        result = _run_in_process(benchmark, max_workers)
+        results.append(result)
+        throughput = result.size / (result.collect_seconds + result.report_seconds)
+        max_rss = "n/a" if result.max_rss_mib is None else f"{result.max_rss_mib:.1f}"
+        click.echo(
+            f"{result.size:>6} {result.collect_seconds:>10.2f}"
+            f" {result.report_seconds:>10.2f} {throughput:>8.1f}"
+            f" {result.num_failures:>8} {result.num_requests:>8} {max_rss:>11}"
+        )
+
+    if output is not None:
+        output.write_text(
+            json.dumps([asdict(result) for result in results], indent=2),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Script to record API responses of PyPI top 100 packages for the benchmark.
+
+This script must be run in a virtual environment where dlc is installed. The
+output can be passed to `python -m benchmarks.run --corpus`. Set GITHUB_TOKEN to
+avoid hitting the rate limit of GitHub API.
+"""  # noqa: INP001
+
+import gzip
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import click
+import requests
+import rich.logging
+from get_pypi_top100 import _collect
+
+from dlc.models.pypi import PyPIRelease
+from dlc.registries.pypi import _guess_repository_url
+from dlc.repositories.github import (
+    _get_owner_and_repo_from_url,
+    _make_headers_for_github_api,
+    find_license_file_in_github,
+)
+from dlc.session import get_session
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+# Responses of GitHub API received by the current thread, keyed by URL
+_recorded = threading.local()
+
+
+@click.command
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=Path("corpus.jsonl.gz"),
+    show_default=True,
+)
+def main(output: Path) -> None:
+    """Record API responses of PyPI top 100 packages."""
+    logging.basicConfig(handlers=[rich.logging.RichHandler()])
+    # Every request must reach the API to be recorded
+    SETTINGS.use_cache = False
+    get_session().hooks["response"].append(_record_response)
+
+    with ThreadPoolExecutor() as executor:
+        packages = _collect(executor)
+        entries = list(
+            executor.map(
+                lambda p: _record(p.info.name, p.info.version),
+                packages,
+            )
+        )
+
+    # Same format as `benchmarks.corpus.save_corpus`
+    with gzip.open(output, "wt", encoding="utf-8") as f:
+        for entry in entries:
+            if entry is not None:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def _record(name: str, version: str) -> Optional[dict[str, Any]]:
+    response = requests.get(
+        f"{SETTINGS.pypi_url}/pypi/{name}/{version}/json", timeout=SETTINGS.timeout
+    )
+    if response.status_code != 200:
+        _logger.warning("Failed to get PyPI package data for %s.", name)
+        return None
+    entry: dict[str, Any] = {"name": name, "version": version, "pypi": response.text}
+
+    repos_url = _guess_repository_url(PyPIRelease.model_validate_json(response.content))
+    if repos_url is None:
+        return entry
+    owner, repo = _get_owner_and_repo_from_url(repos_url)
+    if owner is None or repo is None:
+        return entry
+    entry["repository"] = f"{owner}/{repo}"
+
+    headers = _make_headers_for_github_api()
+    repos_api_url = f"{SETTINGS.github_api_url}/repos/{owner}/{repo}"
+    response = requests.get(
+        f"{repos_api_url}/license", headers=headers, timeout=SETTINGS.timeout
+    )
+    if response.status_code == 200:
+        entry["license"] = response.text
+        return entry
+
+    # Record requests which DLC sends to search the source tree
+    _recorded.responses = {}
+    try:
+        find_license_file_in_github(repos_url, (name,))
+    except Exception:
+        _logger.warning("Failed to search source tree of %s.", name, exc_info=True)
+    entry["github"] = {
+        url.removeprefix(repos_api_url): text
+        for url, text in _recorded.responses.items()
+        if url.startswith(repos_api_url)
+    }
+    return entry
+
+
+def _record_response(
+    response: requests.Response, *args: object, **kwargs: object
+) -> None:
+    responses = getattr(_recorded, "responses", None)
+    if responses is not None and response.status_code == 200:
+        url = response.url.split("?", 1)[0]
+        responses[url] = response.text
+
+
+if __name__ == "__main__":
+    main()
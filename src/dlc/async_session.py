@@ -0,0 +1,107 @@
+"""Shared HTTP client for the asyncio engine.
+
+This module requires optional dependency `httpx`.
+"""
+
+import asyncio
+import importlib.util
+import time
+from collections import defaultdict
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Optional
+
+import httpx
+from typing_extensions import Self
+
+from dlc.metrics import METRICS
+from dlc.mirror import read_mirror
+from dlc.settings import SETTINGS
+
+
+class AsyncSession:
+    """HTTP client which limits number of concurrent requests per host.
+
+    Requests are multiplexed over HTTP/2 connections if package `h2` is available,
+    otherwise sent over pooled HTTP/1.1 keep-alive connections. If
+    `SETTINGS.mirror_dir` is set, responses are read from the mirror directory.
+    Requests are recorded in `METRICS`.
+    """
+
+    def __init__(self, max_connections_per_host: Optional[int] = None) -> None:
+        self.max_connections_per_host = (
+            max_connections_per_host or SETTINGS.max_connections_per_host
+        )
+        self._client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=self.max_connections_per_host,
+            ),
+            timeout=SETTINGS.timeout,
+            transport=(
+                _AsyncMirrorTransport(SETTINGS.mirror_dir)
+                if SETTINGS.mirror_dir is not None
+                else None
+            ),
+        )
+        self._semaphores: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.max_connections_per_host)
+        )
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:  # noqa: ANN401
+        """Send a GET request."""
+        async with self._semaphores[httpx.URL(url).host]:
+            start_ns = time.time_ns()
+            t0 = time.perf_counter()
+            try:
+                resp = await self._client.get(url, **kwargs)
+            except Exception as ex:
+                METRICS.record_request(
+                    "GET",
+                    url,
+                    start_ns=start_ns,
+                    duration=time.perf_counter() - t0,
+                    status=None,
+                    size=None,
+                    error=type(ex).__name__,
+                )
+                raise
+        METRICS.record_request(
+            "GET",
+            url,
+            start_ns=start_ns,
+            duration=time.perf_counter() - t0,
+            status=resp.status_code,
+            size=len(resp.content),
+            headers=resp.headers,
+        )
+        return resp
+
+    async def aclose(self) -> None:
+        """Close all connections."""
+        await self._client.aclose()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+
+class _AsyncMirrorTransport(httpx.AsyncBaseTransport):
+    """Transport which reads responses from a mirror directory."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status_code, content = await asyncio.to_thread(
+            read_mirror, self.directory, request.method, str(request.url)
+        )
+        return httpx.Response(status_code, content=content, request=request)
@@ -0,0 +1,167 @@
+"""Persistent on-disk cache of API responses."""
+
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from dlc.metrics import METRICS
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+_cache: Optional["FileCache"] = None
+_cache_lock = threading.Lock()
+
+
+class FileCache:
+    """Size-bounded, content-addressed on-disk cache.
+
+    Each entry is stored gzip-compressed in a file named after the SHA-256 digest of
+    its key, so arbitrary strings (package names, URLs, etc.) can be used as keys.
+    Modification time of the files is used as the last access time; when total size
+    of the entries exceeds `max_size`, least recently used ones are removed first.
+    """
+
+    def __init__(
+        self, directory: Path, max_size: int, *, refresh: bool = False
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.refresh = refresh
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, *key: str) -> Optional[bytes]:
+        """Get content of an entry, or None if not cached."""
+        content = self._read(namespace, key)
+        METRICS.record_cache_lookup(namespace, hit=content is not None)
+        return content
+
+    def contains(self, namespace: str, *key: str) -> bool:
+        """Check whether an entry exists without reading it nor counting a lookup."""
+        return not self.refresh and self._path_of(namespace, key).exists()
+
+    def _read(self, namespace: str, key: tuple[str, ...]) -> Optional[bytes]:
+        if self.refresh:
+            return None
+
+        path = self._path_of(namespace, key)
+        try:
+            with path.open("rb") as f:
+                content = gzip.decompress(f.read())
+            os.utime(path)  # Mark as recently used
+        except (OSError, EOFError, gzip.BadGzipFile):
+            return None
+        return content
+
+    def put(self, namespace: str, *key: str, data: bytes) -> None:
+        """Store content of an entry."""
+        path = self._path_of(namespace, key)
+        compressed = gzip.compress(data, compresslevel=6)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(compressed)
+            tmp_path.replace(path)
+        except OSError:
+            _logger.warning("Failed to write cache entry: %s", path, exc_info=True)
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._measure()
+            else:
+                self._size += len(compressed) - old_size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _path_of(self, namespace: str, key: tuple[str, ...]) -> Path:
+        digest = hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()
+        return self.directory.joinpath(namespace, digest[:2], f"{digest}.gz")
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*/??/*.gz"))
+
+    def _measure(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self) -> None:
+        # Remove least recently used entries until the total size gets reasonably
+        # smaller than the limit so that eviction won't run on every write.
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_size * 0.9
+        n_removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            n_removed += 1
+        self._size = total
+        _logger.debug("Evicted %d cache entries from %s", n_removed, self.directory)
+
+
+class CachedResponse(BaseModel):
+    """HTTP response body stored together with its cache validators."""
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content: str
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Make request headers to revalidate this response."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def get_cache() -> Optional[FileCache]:
+    """Get the cache configured by the application settings.
+
+    Returns None if caching is disabled.
+    """
+    global _cache
+
+    if not SETTINGS.use_cache:
+        return None
+
+    with _cache_lock:
+        if (
+            _cache is None
+            or _cache.directory != SETTINGS.cache_dir
+            or _cache.max_size != SETTINGS.cache_max_size
+            or _cache.refresh != SETTINGS.refresh_cache
+        ):
+            _cache = FileCache(
+                SETTINGS.cache_dir,
+                SETTINGS.cache_max_size,
+                refresh=SETTINGS.refresh_cache,
+            )
+        return _cache
@@ -1,50 +1,96 @@
 """Command line interface."""
 
-import concurrent
+import functools
 import io
 import logging
-import logging.config
-import pathlib
 import sys
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Optional, TextIO
+from typing import TYPE_CHECKING, Literal, Optional
 
 import click
-import jinja2
-import pydantic
-import tenacity
-from click_help_colors import HelpColorsCommand
-from rich.logging import RichHandler
-from typing_extensions import assert_never
-
-from dlc.models.common import InputFormat
-from dlc.registries.pypi import collect_package_metadata
-from dlc.reports.html_report import write_html_report
-from dlc.reports.report_params import ReportParams
-from dlc.settings import SETTINGS
+from click_help_colors import HelpColorsGroup
+
+# Modules of DLC and most of its dependencies are imported lazily so that
+# `--help` and usage errors respond quickly.
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+    from dlc.models.common import InputFormat, Package
+    from dlc.projects import ProjectInput, Shard
+    from dlc.reports._output import ArchiveFormat, ReportOutput
 
 _logger = logging.getLogger(__name__)
 
 
-@click.command(
-    cls=HelpColorsCommand,
+class _DefaultCommandGroup(HelpColorsGroup):
+    """Command group which runs `collect` if no command name is given.
+
+    This keeps `dlc -f requirements_txt FILENAME` working as before the other
+    commands were added.
+    """
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        if args and args[0] not in self.commands and args[0] not in ("--help",):
+            args = ["collect", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(
+    cls=_DefaultCommandGroup,
     help_headers_color="yellow",
     help_options_color="blue",
 )
+def main() -> None:
+    """A tool for collecting dependency licenses in software projects.
+
+    Command `collect` is run if COMMAND is omitted.
+    """
+
+
+_host_option = click.option(
+    "--host", help="Host name of the DLC server. (default: 127.0.0.1)"
+)
+_port_option = click.option(
+    "--port", type=int, help="Port number of the DLC server. (default: 8765)"
+)
+_socket_option = click.option(
+    "--socket",
+    "socket_path",
+    metavar="PATH",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Unix domain socket of the DLC server, used instead of host and port.",
+)
+
+
+def _parse_shard(
+    ctx: click.Context, param: click.Parameter, value: Optional[str]
+) -> "Optional[Shard]":
+    if value is None:
+        return None
+    index, sep, count = value.partition("/")
+    if sep and index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count):
+        return int(index), int(count)
+    msg = f"{value!r} is not in the form INDEX/COUNT with 1 <= INDEX <= COUNT."
+    raise click.BadParameter(msg, ctx, param)
+
+
+@main.command()
 @click.option(
     "-f",
     "--format",
-    type=click.Choice(["requirements_txt"], case_sensitive=False),
+    type=click.Choice(["requirements_txt", "installed"], case_sensitive=False),
     required=True,
     help="Input data format.",
 )
 @click.option(
     "--target-name",
     metavar="NAME",
-    help="Name of the target software project. This will be used in the report.",
+    help=(
+        "Name of the target software project. This will be used in the report."
+        " In batch mode, it is used for the report of all the projects."
+    ),
 )
 @click.option(
     "-o",
@@ -53,21 +99,111 @@ _logger = logging.getLogger(__name__)
     default=Path("report"),
     help="Directory to store generated report files.",
 )
+@click.option(
+    "--archive",
+    type=click.Choice(["zip", "tar.gz"], case_sensitive=False),
+    help="Write the report files into a single archive in OUTDIR.",
+)
+@click.option(
+    "--page-size",
+    metavar="N",
+    type=click.IntRange(min=1),
+    help=(
+        "Split the license list into pages of N packages, with a search box to"
+        " find packages across the pages."
+    ),
+)
+@click.option(
+    "--incremental",
+    "previous_outdir",
+    metavar="PREVIOUS_OUTDIR",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help=(
+        "Reuse license data in a report previously generated in PREVIOUS_OUTDIR."
+        " Only packages which are new or failed previously are collected."
+    ),
+)
+@click.option(
+    "--shard",
+    metavar="INDEX/COUNT",
+    callback=_parse_shard,
+    help=(
+        "Collect only the INDEX-th of COUNT slices of the packages, e.g. 1/4."
+        " Packages are assigned to slices by hash of their names and versions."
+    ),
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["thread", "async"], case_sensitive=False),
+    default="thread",
+    show_default=True,
+    help=(
+        "Engine to send requests with: a pool of worker threads, or asyncio"
+        " (requires extra `async`)."
+    ),
+)
+@click.option(
+    "--mirror",
+    "mirror_dir",
+    metavar="DIRECTORY",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Read API responses from files in a local mirror instead of network.",
+)
+@click.option(
+    "--pin-release-ref",
+    is_flag=True,
+    help=(
+        "Read license files at git tags of the pinned versions instead of the"
+        " default branches. Results are cached permanently."
+    ),
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not read nor write the on-disk cache of API responses.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Ignore cached API responses and fetch them again.",
+)
+@click.option(
+    "--export-spans",
+    is_flag=True,
+    help=(
+        "Write HTTP requests as OpenTelemetry spans in OTLP JSON format into"
+        " OUTDIR/spans.json."
+    ),
+)
 @click.option("-v", "--verbose", is_flag=True, help="Log more verbose message.")
 @click.option("-q", "--quiet", is_flag=True, help="Log less verbose message.")
 @click.argument(
-    "input_file", metavar="FILENAME", type=click.File("rt", encoding="utf-8")
+    "input_paths",
+    metavar="FILENAME...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, allow_dash=True, path_type=Path),
 )
-def main(  # noqa: PLR0913
+def collect(  # noqa: PLR0913
     *,
-    format: InputFormat,  # noqa: A002
+    format: "InputFormat",  # noqa: A002
     target_name: Optional[str],
     outdir: Path,
+    archive: "Optional[ArchiveFormat]",
+    page_size: Optional[int],
+    previous_outdir: Optional[Path],
+    shard: "Optional[Shard]",
+    engine: Literal["thread", "async"],
+    mirror_dir: Optional[Path],
+    pin_release_ref: bool,
+    no_cache: bool,
+    refresh: bool,
+    export_spans: bool,
     verbose: bool,
     quiet: bool,
-    input_file: TextIO,
+    input_paths: tuple[Path, ...],
 ) -> None:
-    """A tool for collecting dependency licenses in software projects.
+    """Collect license data of dependencies and generate a report.
 
     DLC (Dependency License Collector) collects dependency packages' license data,
     download license file content, and generate an HTML report.
@@ -78,82 +214,529 @@ def main(  # noqa: PLR0913
     Strictly writing, only the dependency specifier using `==` is supported.
     Note that majority of project management tools such as Pipenv, Poetry, and
     uv supports exporting list of dependencies in this format.
+
+    With format "installed", FILENAME is a Python interpreter or a site-packages
+    directory. License data is read from the distributions installed there, and
+    only packages without a license file are looked up online.
+
+    Batch mode is used if more than one FILENAME is given, or a directory is given
+    for "requirements.txt" (files named `requirements*.txt` in it are read).
+    Packages pinned by any of the projects are collected only once. A report of
+    each project is written in OUTDIR/projects/NAME, and a report of all the
+    packages in OUTDIR together with `inventory.jsonl` listing projects using
+    each package.
+
+    With `--shard`, jobs given the same input and different INDEX collect
+    disjoint slices of the packages; combine their reports with `dlc merge`.
+
+    Statistics of HTTP requests, cache lookups and waits for rate limits are
+    written into OUTDIR/stats.json.
     """
     _setup_logging(outdir, int(verbose) - int(quiet))
+    _configure(
+        mirror_dir=mirror_dir,
+        pin_release_ref=pin_release_ref,
+        no_cache=no_cache,
+        refresh=refresh,
+    )
 
-    # Setting validation
-    if SETTINGS.github_token is None:
-        _logger.warning(
-            "(DLC_)GITHUB_TOKEN is not set; "
-            "setting MAX_WORKERS=1 to prevent API rate limit error."
-        )
-        SETTINGS.max_workers = 1
+    if engine == "async":
+        try:
+            import dlc.registries.pypi_async  # noqa: F401
+        except ImportError as ex:
+            msg = (
+                "The async engine requires optional dependencies;"
+                " install dependency-license-collector[async]."
+            )
+            raise click.UsageError(msg) from ex
+
+    from dlc.projects import find_inputs, make_project_names
+
+    batch = len(input_paths) > 1 or (
+        format == "requirements_txt" and any(p.is_dir() for p in input_paths)
+    )
+    paths = find_inputs(format, input_paths)
+    if not paths:
+        msg = "No input files found."
+        raise click.UsageError(msg)
 
     start_time = datetime.now(tz=timezone.utc)
     try:
-        input_content = input_file.read()
+        from dlc.metrics import METRICS
+        from dlc.projects import collect_projects, read_project_input
+        from dlc.reports._output import open_output
+        from dlc.reports.merge import read_report
+
+        METRICS.reset(keep_spans=export_spans)
+
+        previous = None
+        if previous_outdir is not None:
+            previous = read_report(previous_outdir)
 
         # Collect package metadata and license data
-        if format == "requirements_txt":
-            with (
-                ThreadPoolExecutor(SETTINGS.max_workers) as executor,
-                io.StringIO(input_content) as f,
-            ):
-                packages = collect_package_metadata(executor, f)
-        else:
-            assert_never(format)
-            msg = f"Unsupported input format: {format}"
-            raise AssertionError(msg)
-        n_packages = len(packages)
+        projects = [
+            read_project_input(format, path, name)
+            for path, name in zip(paths, make_project_names(paths))
+        ]
+        packages_per_project = collect_projects(
+            projects,
+            lambda requirements: _collect(requirements, engine, previous),
+            shard,
+        )
+        n_packages = sum(len(packages) for packages in packages_per_project)
         _logger.info("Collected license data of %d packages.", n_packages)
 
         # Save the result
-        report_params = ReportParams(
+        write_report = functools.partial(
+            _write_report,
             input_format=format,
-            input_source=input_content,
-            target_name=target_name,
-            outdir=outdir,
             start_time=start_time,
-            packages=packages,
+            archive=archive,
+            page_size=page_size,
         )
-        write_html_report(report_params)
+        with open_output(outdir, archive) as output:
+            if not batch:
+                write_report(
+                    outdir,
+                    target_name,
+                    projects[0].source,
+                    packages_per_project[0],
+                    output=output,
+                )
+            else:
+                _write_batch_reports(
+                    outdir,
+                    target_name,
+                    projects,
+                    packages_per_project,
+                    write_report,
+                    output=output,
+                )
+            _write_metrics(output, export_spans=export_spans)
     except Exception:
         _logger.exception("Unexpected error")
         sys.exit(1)
 
 
-def _setup_logging(outdir: Path, verbosity: int) -> None:
-    outdir.mkdir(parents=True, exist_ok=True)
+@main.command()
+@_host_option
+@_port_option
+@_socket_option
+@click.option(
+    "--mirror",
+    "mirror_dir",
+    metavar="DIRECTORY",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    help="Read API responses from files in a local mirror instead of network.",
+)
+@click.option(
+    "--pin-release-ref",
+    is_flag=True,
+    help="Read license files at git tags of the pinned versions.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Do not read nor write the on-disk cache.",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Ignore cached data and fetch them again.",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Log more verbose message.")
+@click.option("-q", "--quiet", is_flag=True, help="Log less verbose message.")
+def serve(  # noqa: PLR0913
+    *,
+    host: Optional[str],
+    port: Optional[int],
+    socket_path: Optional[Path],
+    mirror_dir: Optional[Path],
+    pin_release_ref: bool,
+    no_cache: bool,
+    refresh: bool,
+    verbose: bool,
+    quiet: bool,
+) -> None:
+    """Run DLC server answering license data of packages to `dlc query`.
 
-    level = {-1: logging.WARNING, 1: logging.DEBUG}.get(verbosity, logging.INFO)
-    file_formatter = logging.Formatter(
-        "%(asctime)s %(levelname)-7s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    The server keeps collected license data in memory and in the on-disk cache
+    for (DLC_)SERVER_CACHE_TTL seconds, so that a package is collected only once
+    in that period however many times it is queried.
+    """
+    _setup_logging(None, int(verbose) - int(quiet))
+    _configure(
+        mirror_dir=mirror_dir,
+        pin_release_ref=pin_release_ref,
+        no_cache=no_cache,
+        refresh=refresh,
     )
-    file_formatter.default_msec_format = "%s.%03d"
-    file_handler = RotatingFileHandler(
-        filename=outdir.joinpath("dlc.log"), maxBytes=1024 * 1024, backupCount=1
+    _configure_server(host, port, socket_path)
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from dlc.server import PackageService, make_server
+    from dlc.settings import SETTINGS
+
+    with ThreadPoolExecutor(SETTINGS.max_workers) as executor:
+        service = PackageService(executor, SETTINGS.server_cache_ttl)
+        server = make_server(
+            service,
+            host=SETTINGS.server_host,
+            port=SETTINGS.server_port,
+            socket_path=SETTINGS.server_socket,
+        )
+        _logger.info("Listening on %s", SETTINGS.server_socket or server.server_address)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            _logger.info("Stopped.")
+        finally:
+            server.server_close()
+
+
+@main.command()
+@click.option(
+    "--target-name",
+    metavar="NAME",
+    help="Name of the target software project. This will be used in the report.",
+)
+@click.option(
+    "-o",
+    "--outdir",
+    type=click.Path(file_okay=False, writable=True, path_type=Path),
+    default=Path("report"),
+    help="Directory to store generated report files.",
+)
+@click.option(
+    "--archive",
+    type=click.Choice(["zip", "tar.gz"], case_sensitive=False),
+    help="Write the report files into a single archive in OUTDIR.",
+)
+@click.option(
+    "--page-size",
+    metavar="N",
+    type=click.IntRange(min=1),
+    help="Split the license list into pages of N packages.",
+)
+@_host_option
+@_port_option
+@_socket_option
+@click.option("-v", "--verbose", is_flag=True, help="Log more verbose message.")
+@click.option("-q", "--quiet", is_flag=True, help="Log less verbose message.")
+@click.argument(
+    "input_path",
+    metavar="FILENAME",
+    type=click.Path(exists=True, dir_okay=False, allow_dash=True, path_type=Path),
+)
+def query(  # noqa: PLR0913
+    *,
+    target_name: Optional[str],
+    outdir: Path,
+    archive: "Optional[ArchiveFormat]",
+    page_size: Optional[int],
+    host: Optional[str],
+    port: Optional[int],
+    socket_path: Optional[Path],
+    verbose: bool,
+    quiet: bool,
+    input_path: Path,
+) -> None:
+    """Generate a report with license data from DLC server.
+
+    License data is collected by a server started by `dlc serve`, which reuses
+    the data collected for earlier queries.
+    """
+    _setup_logging(outdir, int(verbose) - int(quiet))
+    _configure_server(host, port, socket_path)
+
+    start_time = datetime.now(tz=timezone.utc)
+    try:
+        from dlc.client import query_packages
+
+        with click.open_file(str(input_path), encoding="utf-8") as f:
+            input_content = f.read()
+        packages = query_packages(input_content)
+        _write_report(
+            outdir,
+            target_name,
+            input_content,
+            packages,
+            input_format="requirements_txt",
+            start_time=start_time,
+            archive=archive,
+            page_size=page_size,
+        )
+    except Exception:
+        _logger.exception("Unexpected error")
+        sys.exit(1)
+
+
+@main.command()
+@click.option(
+    "--target-name",
+    metavar="NAME",
+    help="Name of the target software project. This will be used in the report.",
+)
+@click.option(
+    "-o",
+    "--outdir",
+    type=click.Path(file_okay=False, writable=True, path_type=Path),
+    default=Path("report"),
+    help="Directory to store generated report files.",
+)
+@click.option(
+    "--archive",
+    type=click.Choice(["zip", "tar.gz"], case_sensitive=False),
+    help="Write the report files into a single archive in OUTDIR.",
+)
+@click.option(
+    "--page-size",
+    metavar="N",
+    type=click.IntRange(min=1),
+    help="Split the license list into pages of N packages.",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Log more verbose message.")
+@click.option("-q", "--quiet", is_flag=True, help="Log less verbose message.")
+@click.argument(
+    "shard_outdirs",
+    metavar="SHARD_OUTDIR...",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+def merge(  # noqa: PLR0913
+    *,
+    target_name: Optional[str],
+    outdir: Path,
+    archive: "Optional[ArchiveFormat]",
+    page_size: Optional[int],
+    verbose: bool,
+    quiet: bool,
+    shard_outdirs: tuple[Path, ...],
+) -> None:
+    """Merge reports of shards into one report.
+
+    SHARD_OUTDIR is OUTDIR of `dlc collect --shard`, with or without `--archive`.
+    License data and registry data in the reports are reused; nothing is
+    collected again.
+    """
+    _setup_logging(outdir, int(verbose) - int(quiet))
+
+    start_time = datetime.now(tz=timezone.utc)
+    try:
+        from dlc.registries.installed import make_requirements_txt
+        from dlc.reports.merge import ShardReports, merge_shard_reports
+
+        with ShardReports() as reports:
+            packages = merge_shard_reports(reports, shard_outdirs)
+            _write_report(
+                outdir,
+                target_name,
+                make_requirements_txt(packages),
+                packages,
+                input_format="requirements_txt",
+                start_time=start_time,
+                archive=archive,
+                page_size=page_size,
+            )
+    except Exception:
+        _logger.exception("Unexpected error")
+        sys.exit(1)
+
+
+def _configure(
+    *,
+    mirror_dir: Optional[Path],
+    pin_release_ref: bool,
+    no_cache: bool,
+    refresh: bool,
+) -> None:
+    from dlc.settings import SETTINGS
+
+    _restore_settings_on_close()
+    if mirror_dir is not None:
+        SETTINGS.mirror_dir = mirror_dir
+    if SETTINGS.github_token is None and SETTINGS.mirror_dir is None:
+        _logger.warning(
+            "(DLC_)GITHUB_TOKEN is not set; "
+            "GitHub API allows only 60 requests per hour without it."
+        )
+    if pin_release_ref:
+        SETTINGS.pin_release_ref = True
+    if no_cache:
+        SETTINGS.use_cache = False
+    if refresh:
+        SETTINGS.refresh_cache = True
+
+
+def _configure_server(
+    host: Optional[str], port: Optional[int], socket_path: Optional[Path]
+) -> None:
+    from dlc.settings import SETTINGS
+
+    _restore_settings_on_close()
+    if host is not None:
+        SETTINGS.server_host = host
+    if port is not None:
+        SETTINGS.server_port = port
+    if socket_path is not None:
+        SETTINGS.server_socket = socket_path
+
+
+def _restore_settings_on_close() -> None:
+    # Options override the process-wide settings only while the command runs, so
+    # that commands invoked in-process (e.g. in tests) do not leak them
+    from dlc.settings import SETTINGS
+
+    saved = SETTINGS.model_dump()
+
+    def restore() -> None:
+        for name, value in saved.items():
+            setattr(SETTINGS, name, value)
+
+    click.get_current_context().call_on_close(restore)
+
+
+def _write_batch_reports(  # noqa: PLR0913
+    outdir: Path,
+    target_name: Optional[str],
+    projects: "Sequence[ProjectInput]",
+    packages_per_project: "Sequence[list[Package]]",
+    write_report: "Callable[..., None]",
+    *,
+    output: "ReportOutput",
+) -> None:
+    from dlc.projects import union_packages
+    from dlc.registries.installed import make_requirements_txt
+    from dlc.reports.inventory import write_inventory
+
+    for project, packages in zip(projects, packages_per_project):
+        write_report(
+            outdir.joinpath("projects", project.name),
+            project.name,
+            project.source,
+            packages,
+        )
+
+    packages = union_packages(packages_per_project)
+    write_report(
+        outdir, target_name, make_requirements_txt(packages), packages, output=output
+    )
+    write_inventory(
+        output,
+        {
+            project.name: packages
+            for project, packages in zip(projects, packages_per_project)
+        },
+    )
+
+
+def _write_metrics(output: "ReportOutput", *, export_spans: bool) -> None:
+    from dlc.metrics import METRICS
+    from dlc.reports.stats import write_spans_json, write_stats_json
+
+    stats = METRICS.get_stats()
+    write_stats_json(output, stats)
+    if export_spans:
+        write_spans_json(output, "dlc collect", stats, METRICS.get_spans())
+
+
+def _write_report(  # noqa: PLR0913
+    outdir: Path,
+    target_name: Optional[str],
+    input_source: str,
+    packages: "list[Package]",
+    *,
+    input_format: "InputFormat",
+    start_time: datetime,
+    archive: "Optional[ArchiveFormat]",
+    page_size: Optional[int],
+    output: "Optional[ReportOutput]" = None,
+) -> None:
+    from dlc.reports.html_report import write_html_report
+    from dlc.reports.report_params import ReportParams
+
+    report_params = ReportParams(
+        input_format=input_format,
+        input_source=input_source,
+        target_name=target_name,
+        outdir=outdir,
+        start_time=start_time,
+        packages=packages,
     )
-    file_handler.setFormatter(file_formatter)
-    logging.basicConfig(
-        format="%(message)s",
-        handlers=[
-            RichHandler(
-                omit_repeated_times=False,
-                show_path=False,
-                rich_tracebacks=True,
-                tracebacks_suppress=[
-                    click,
-                    concurrent,
-                    jinja2,
-                    logging,
-                    pathlib,
-                    pydantic,
-                    tenacity,
-                ],
-            ),
-            file_handler,
-        ],
+    write_html_report(
+        report_params,
+        archive=archive,
+        page_size=page_size,
+        output=output,
     )
+
+
+def _collect(
+    requirements: str,
+    engine: Literal["thread", "async"],
+    previous: "Optional[Sequence[Package]]",
+) -> "list[Package]":
+    from dlc.settings import SETTINGS
+
+    if engine == "async":
+        import asyncio
+
+        from dlc.registries.pypi_async import collect_package_metadata_async
+
+        with io.StringIO(requirements) as f:
+            return asyncio.run(collect_package_metadata_async(f, previous))
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from dlc.registries.pypi import collect_package_metadata
+
+    with (
+        ThreadPoolExecutor(SETTINGS.max_workers) as executor,
+        io.StringIO(requirements) as f,
+    ):
+        return collect_package_metadata(executor, f, previous)
+
+
+def _setup_logging(outdir: Optional[Path], verbosity: int) -> None:
+    import concurrent
+    import pathlib
+
+    import jinja2
+    import pydantic
+    import tenacity
+    from rich.logging import RichHandler
+
+    level = {-1: logging.WARNING, 1: logging.DEBUG}.get(verbosity, logging.INFO)
+    handlers: list[logging.Handler] = [
+        RichHandler(
+            omit_repeated_times=False,
+            show_path=False,
+            rich_tracebacks=True,
+            tracebacks_suppress=[
+                click,
+                concurrent,
+                jinja2,
+                logging,
+                pathlib,
+                pydantic,
+                tenacity,
+            ],
+        )
+    ]
+    if outdir is not None:
+        outdir.mkdir(parents=True, exist_ok=True)
+        file_formatter = logging.Formatter(
+            "%(asctime)s %(levelname)-7s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+        )
+        file_formatter.default_msec_format = "%s.%03d"
+        file_handler = RotatingFileHandler(
+            filename=outdir.joinpath("dlc.log"), maxBytes=1024 * 1024, backupCount=1
+        )
+        file_handler.setFormatter(file_formatter)
+        handlers.append(file_handler)
+    logging.basicConfig(format="%(message)s", handlers=handlers)
     logging.getLogger(__name__.split(".")[0]).setLevel(level)
 
 
@@ -0,0 +1,66 @@
+"""Client of the DLC server (`dlc serve`)."""
+
+import http.client
+import logging
+import socket
+from pathlib import Path
+from typing import Optional
+
+from dlc.exceptions import ServerError
+from dlc.models.common import Package
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+# Collecting packages not cached in the server may take long
+_TIMEOUT = 30 * 60.0
+
+
+def query_packages(requirements: str) -> list[Package]:
+    """Get packages of pins in requirements.txt from the DLC server.
+
+    The server is the one at `SETTINGS.server_socket` if set, or at
+    `SETTINGS.server_host` and `SETTINGS.server_port` otherwise.
+    """
+    conn = _connect(SETTINGS.server_socket)
+    try:
+        conn.request(
+            "POST",
+            "/packages",
+            body=requirements.encode("utf-8"),
+            headers={"Content-Type": "text/plain; charset=utf-8"},
+        )
+        resp = conn.getresponse()
+        content = resp.read()
+    finally:
+        conn.close()
+    if resp.status != 200:
+        raise ServerError(resp.status, content.decode("utf-8", errors="replace"))
+
+    packages = [
+        Package.model_validate_json(line) for line in content.splitlines() if line
+    ]
+    _logger.info("Got %d package(s) from the DLC server.", len(packages))
+    return packages
+
+
+def _connect(socket_path: Optional[Path]) -> http.client.HTTPConnection:
+    if socket_path is not None:
+        return _UnixHTTPConnection(socket_path, _TIMEOUT)
+    return http.client.HTTPConnection(
+        SETTINGS.server_host, SETTINGS.server_port, timeout=_TIMEOUT
+    )
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: Path, timeout: float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(str(self.socket_path))
+        self.sock = sock
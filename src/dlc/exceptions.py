@@ -29,3 +29,11 @@ class LicenseDataUnavailableError(DependencyLicenseCollectorError):
 
 class VersionSpecifierError(DependencyLicenseCollectorError):
     """Raised when unacceptable version specifier was found."""
+
+
+class ServerError(DependencyLicenseCollectorError):
+    """Raised when the DLC server (`dlc serve`) responded with an error."""
+
+    def __init__(self, status_code: int, msg: str) -> None:
+        super().__init__(f"DLC server responded {status_code}: {msg}")
+        self.status_code = status_code
@@ -0,0 +1,240 @@
+"""Metrics of HTTP requests sent while collecting license data.
+
+Requests sent through the shared HTTP sessions are recorded with the kind of the
+endpoint, which callers label with `endpoint`. They are aggregated into counters
+and latency histograms per endpoint and host, together with retries, waits for
+rate limits and on-disk cache hits. If enabled, each request is also kept as a
+span so that it can be exported for tracing tools.
+"""
+
+import contextvars
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel
+
+# Upper bounds of the latency histogram buckets in seconds, which OpenTelemetry
+# recommends for `http.client.request.duration`
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "endpoint", default="other"
+)
+
+
+@contextmanager
+def endpoint(kind: str) -> Iterator[None]:
+    """Label HTTP requests sent in the block with kind of the endpoint."""
+    token = _endpoint.set(kind)
+    try:
+        yield
+    finally:
+        _endpoint.reset(token)
+
+
+class LatencyHistogram(BaseModel):
+    """Histogram of latency in seconds with explicit bucket bounds.
+
+    `counts[i]` is the number of requests which took at most `bounds[i]` seconds
+    and more than `bounds[i - 1]` seconds. The last one counts the rest.
+    """
+
+    bounds: list[float]
+    counts: list[int]
+    sum: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """Add a sample."""
+        i = next((i for i, b in enumerate(self.bounds) if value <= b), -1)
+        self.counts[i] += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+class EndpointStats(BaseModel):
+    """Statistics of requests to an endpoint at a host."""
+
+    endpoint: str
+    host: str
+    requests: int = 0
+    errors: int = 0  # Requests which got no response
+    statuses: dict[str, int] = {}
+    bytes: int = 0  # Size of response bodies
+    latency: LatencyHistogram
+    # Lowest `X-RateLimit-Remaining` seen in the responses
+    rate_limit_remaining: Optional[int] = None
+
+
+class CacheStats(BaseModel):
+    """Number of lookups of a namespace of the on-disk cache."""
+
+    hits: int = 0
+    misses: int = 0
+
+
+class RunStats(BaseModel):
+    """Statistics of a run, the content of `stats.json`."""
+
+    started_at: datetime
+    duration: float
+    endpoints: list[EndpointStats]
+    retries: dict[str, int]  # Number of retries per endpoint
+    rate_limit_wait: dict[str, float]  # Seconds waited per rate limiter
+    cache: dict[str, CacheStats]
+
+
+class Span(NamedTuple):
+    """An HTTP request kept for tracing."""
+
+    endpoint: str
+    method: str
+    url: str
+    status: Optional[int]
+    start_ns: int  # Nanoseconds since Unix epoch
+    end_ns: int
+    size: Optional[int]
+    error: Optional[str]
+
+
+class Metrics:
+    """Thread-safe collector of metrics of a run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, *, keep_spans: bool = False) -> None:
+        """Discard the metrics recorded so far and start a new run."""
+        with self._lock:
+            self.started_at = datetime.now(tz=timezone.utc)
+            self._t0 = time.monotonic()
+            self._endpoints: dict[tuple[str, str], EndpointStats] = {}
+            self._retries: Counter[str] = Counter()
+            self._waits: defaultdict[str, float] = defaultdict(float)
+            self._cache: defaultdict[str, CacheStats] = defaultdict(CacheStats)
+            self._spans: Optional[list[Span]] = [] if keep_spans else None
+
+    def record_request(  # noqa: PLR0913
+        self,
+        method: str,
+        url: str,
+        *,
+        start_ns: int,
+        duration: float,
+        status: Optional[int],
+        size: Optional[int],
+        headers: Optional[Mapping[str, str]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """Record a request sent to the endpoint labeled by `endpoint`."""
+        kind = _endpoint.get()
+        host = urlsplit(url).netloc
+        remaining = _parse_int(
+            headers.get("X-RateLimit-Remaining") if headers else None
+        )
+        with self._lock:
+            stats = self._endpoints.get((kind, host))
+            if stats is None:
+                stats = self._endpoints[kind, host] = EndpointStats(
+                    endpoint=kind,
+                    host=host,
+                    latency=LatencyHistogram(
+                        bounds=list(LATENCY_BUCKETS),
+                        counts=[0] * (len(LATENCY_BUCKETS) + 1),
+                    ),
+                )
+            stats.requests += 1
+            if status is None:
+                stats.errors += 1
+            else:
+                stats.statuses[str(status)] = stats.statuses.get(str(status), 0) + 1
+            stats.bytes += size or 0
+            stats.latency.add(duration)
+            if remaining is not None and (
+                stats.rate_limit_remaining is None
+                or remaining < stats.rate_limit_remaining
+            ):
+                stats.rate_limit_remaining = remaining
+            if self._spans is not None:
+                end_ns = start_ns + int(duration * 1e9)
+                self._spans.append(
+                    Span(kind, method, url, status, start_ns, end_ns, size, error)
+                )
+
+    def record_retry(self, kind: str) -> None:
+        """Record a retry of a request to an endpoint."""
+        with self._lock:
+            self._retries[kind] += 1
+
+    def record_rate_limit_wait(self, name: str, seconds: float) -> None:
+        """Record time to wait for a rate limit before sending a request."""
+        with self._lock:
+            self._waits[name] += seconds
+
+    def record_cache_lookup(self, namespace: str, *, hit: bool) -> None:
+        """Record a lookup of the on-disk cache."""
+        with self._lock:
+            stats = self._cache[namespace]
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+
+    def get_stats(self) -> RunStats:
+        """Get the statistics of the run so far."""
+        with self._lock:
+            return RunStats(
+                started_at=self.started_at,
+                duration=time.monotonic() - self._t0,
+                endpoints=[
+                    stats.model_copy(deep=True)
+                    for _, stats in sorted(self._endpoints.items())
+                ],
+                retries=dict(sorted(self._retries.items())),
+                rate_limit_wait=dict(sorted(self._waits.items())),
+                cache={
+                    namespace: stats.model_copy()
+                    for namespace, stats in sorted(self._cache.items())
+                },
+            )
+
+    def get_spans(self) -> list[Span]:
+        """Get the requests kept as spans, if enabled on `reset`."""
+        with self._lock:
+            return list(self._spans or [])
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+METRICS = Metrics()
@@ -0,0 +1,91 @@
+"""Local mirror of web APIs for offline environments.
+
+A mirror is a directory holding API responses in files named after their URLs;
+response of `https://pypi.org/pypi/click/8.1.8/json` is read from
+`{mirror}/pypi.org/pypi/click/8.1.8/json`. This is the same layout as
+`wget --force-directories` produces, including the query string in the file name
+(`.../license?ref=v1.0.0`).
+
+A URL may be both a file and a directory, e.g. `repos/{owner}/{repo}` and
+`repos/{owner}/{repo}/license` of GitHub API. Response of such a URL, and of one
+ending with a slash, is read from `index.html` in the directory. Paths are matched
+case-sensitively, in the case of the requested URL.
+"""
+
+import io
+import logging
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+_logger = logging.getLogger(__name__)
+
+_NOT_FOUND = b'{"message": "Not Found"}'
+
+
+def resolve_mirror_path(directory: Path, url: str) -> Optional[Path]:
+    """Get path of the file in a mirror which holds response for a URL.
+
+    Returns None if the URL cannot be mapped into the mirror directory.
+    """
+    parts = urlsplit(url)
+    segments = [unquote(s) for s in parts.path.split("/") if s]
+    if not parts.hostname or any(s in (".", "..") or "/" in s for s in segments):
+        return None
+    path = directory.joinpath(parts.hostname, *segments)
+    if not segments or parts.path.endswith("/") or path.is_dir():
+        path = path.joinpath("index.html")
+    if parts.query:
+        # A slash cannot be in a file name
+        path = path.with_name(f"{path.name}?{parts.query.replace('/', '%2F')}")
+    return path
+
+
+def read_mirror(directory: Path, method: str, url: str) -> tuple[int, bytes]:
+    """Read response for a request from a mirror, as pair of status and body."""
+    path = resolve_mirror_path(directory, url)
+    if method in ("GET", "HEAD") and path is not None:
+        try:
+            content = path.read_bytes()
+        except OSError:
+            pass
+        else:
+            _logger.debug("Read %s from mirror", url)
+            return 200, content
+    _logger.debug("Not found in mirror: %s %s", method, url)
+    return 404, _NOT_FOUND
+
+
+class MirrorAdapter(BaseAdapter):
+    """Transport adapter of `requests` which reads responses from a mirror."""
+
+    def __init__(self, directory: Path) -> None:
+        super().__init__()
+        self.directory = directory
+
+    def send(  # noqa: PLR0913, PLR0917
+        self,
+        request: PreparedRequest,
+        stream: bool = False,  # noqa: FBT001, FBT002
+        timeout: object = None,
+        verify: object = True,  # noqa: FBT002
+        cert: object = None,
+        proxies: object = None,
+    ) -> Response:
+        url = request.url or ""
+        status_code, content = read_mirror(self.directory, request.method or "GET", url)
+        response = Response()
+        response.status_code = status_code
+        response.reason = "OK" if status_code == 200 else "Not Found"
+        response.headers = CaseInsensitiveDict({"Content-Length": str(len(content))})
+        response.raw = io.BytesIO(content)
+        response.url = url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
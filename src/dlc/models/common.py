@@ -1,17 +1,22 @@
+import logging
 import re
 from functools import cached_property
 from typing import Literal, Optional, Union
 
 import requests
-from pydantic import BaseModel, computed_field
+from pydantic import Base64Bytes, BaseModel, computed_field
 from typing_extensions import TypeAlias, assert_never
 
+from dlc.metrics import endpoint
 from dlc.models.github import GitHubLicenseContent
-from dlc.models.pypi import PyPIPackage
+from dlc.models.pypi import DistributionLicenseContent, PyPIRelease
 from dlc.models.version import Version
+from dlc.session import get_session
 from dlc.settings import SETTINGS
 
-InputFormat: TypeAlias = Literal["requirements_txt"]
+_logger = logging.getLogger(__name__)
+
+InputFormat: TypeAlias = Literal["requirements_txt", "installed"]
 _re_http_url = re.compile(r"^https?://")
 
 
@@ -22,8 +27,13 @@ class LicenseContentFailed(BaseModel):
 class Package(BaseModel):
     name: str
     version: Version
-    registry_data: Union[PyPIPackage, None]
-    license_data: Union[GitHubLicenseContent, LicenseContentFailed, None]
+    registry_data: Union[PyPIRelease, None]
+    license_data: Union[
+        GitHubLicenseContent, DistributionLicenseContent, LicenseContentFailed, None
+    ]
+    # License file downloaded from `license_file_url`, kept in the package data so
+    # that it is not downloaded again after the package is serialized
+    downloaded_license_file: Optional[Base64Bytes] = None
 
     @computed_field  # type: ignore[prop-decorator]
     @property
@@ -36,32 +46,41 @@ class Package(BaseModel):
             if name is None or name == "NOASSERTION":
                 name = self.license_data.license.name
             return name
+        elif self.license_data._tag == "distribution":
+            return self.license_data.license_name
         elif self.license_data._tag == "failure":
             return "(Failed to get)"
         else:
             assert_never(self.license_data._tag)
             raise AssertionError()
 
+    @property
+    def license_file_url(self) -> Optional[str]:
+        """URL to download license file from, if it is not in the license data."""
+        # Fetch from URL in "license" field in PyPI package record.
+        if (
+            self.license_data is None
+            and self.registry_data is not None
+            and self.registry_data._tag == "pypi"
+            and self.registry_data.info.license is not None
+            and _re_http_url.match(self.registry_data.info.license)
+        ):
+            return self.registry_data.info.license
+        return None
+
     @cached_property
     def license_file(self) -> Optional[bytes]:
         if self.license_data is None:
-            # Fetch from URl in "license" field in PyPI package record.
-            if (
-                self.registry_data is not None
-                and self.registry_data._tag == "pypi"
-                and self.registry_data.info.license is not None
-                and _re_http_url.match(self.registry_data.info.license)
-            ):
-                resp = requests.get(
-                    self.registry_data.info.license,
-                    headers={"Accept": "text/plain"},
-                    timeout=SETTINGS.timeout,
-                )
-                return resp.content
+            if self.downloaded_license_file is not None:
+                return self.downloaded_license_file
+            if (url := self.license_file_url) is not None:
+                return self._download_license_file(url)
 
             return None
 
-        elif self.license_data._tag == "github":
+        elif isinstance(
+            self.license_data, (GitHubLicenseContent, DistributionLicenseContent)
+        ):
             return self.license_data.decode_content()
 
         elif self.license_data._tag == "failure":
@@ -70,3 +89,32 @@ class Package(BaseModel):
         else:
             assert_never(self.license_data._tag)
             raise AssertionError()
+
+    def _download_license_file(self, url: str) -> Optional[bytes]:
+        try:
+            with endpoint("license-file"):
+                resp = get_session().get(
+                    url, headers={"Accept": "text/plain"}, timeout=SETTINGS.timeout
+                )
+        except requests.RequestException:
+            _logger.warning(
+                "Failed to download license file. package=%s version=%s url=%s",
+                self.name,
+                self.version,
+                url,
+                exc_info=True,
+            )
+            return None
+        if resp.status_code != 200:
+            _logger.warning(
+                "Failed to download license file. package=%s version=%s url=%s"
+                " status=%d",
+                self.name,
+                self.version,
+                url,
+                resp.status_code,
+            )
+            return None
+
+        self.downloaded_license_file = resp.content
+        return resp.content
@@ -2,7 +2,7 @@ import logging
 from base64 import b64decode
 from typing import Literal, Optional
 
-from pydantic import AnyUrl, BaseModel, HttpUrl
+from pydantic import AnyUrl, BaseModel, Field, HttpUrl
 
 _logger = logging.getLogger(__name__)
 
@@ -19,6 +19,7 @@ class GitHubLicenseSimple(BaseModel):
 class GitHubLicenseContent(BaseModel):
     _tag: Literal["github"] = "github"
     name: str
+    sha: Optional[str] = None  # Git blob SHA of the license file
     size: int
     url: AnyUrl
     download_url: HttpUrl
@@ -38,6 +39,31 @@ class GitHubLicenseContent(BaseModel):
         return None
 
 
+# https://docs.github.com/en/rest/repos/repos#get-a-repository
+class GitHubRepository(BaseModel):
+    """Subset of repository data which DLC uses."""
+
+    default_branch: str
+
+
+class GitHubGitObject(BaseModel):
+    sha: str
+    type: str
+
+
+# https://docs.github.com/en/rest/git/refs#list-matching-references
+class GitHubGitRef(BaseModel):
+    ref: str
+    object: GitHubGitObject
+
+    @property
+    def tag_name(self) -> Optional[str]:
+        """Name of the tag, or None if this is not a tag."""
+        if not self.ref.startswith("refs/tags/"):
+            return None
+        return self.ref.removeprefix("refs/tags/")
+
+
 class GitHubTreeItem(BaseModel):
     path: Optional[str] = None
     mode: Optional[str] = None
@@ -52,3 +78,46 @@ class GitHubGitTree(BaseModel):
     url: AnyUrl
     truncated: bool
     tree: list[GitHubTreeItem]
+
+
+# https://docs.github.com/en/graphql/reference/objects#license
+class GitHubGraphQLLicense(BaseModel):
+    key: str
+    name: str
+    spdx_id: Optional[str] = Field(default=None, alias="spdxId")
+    url: Optional[HttpUrl] = None
+    id: str
+
+
+# https://docs.github.com/en/graphql/reference/objects#blob
+class GitHubGraphQLBlob(BaseModel):
+    oid: str
+    byte_size: int = Field(alias="byteSize")
+    is_binary: Optional[bool] = Field(default=None, alias="isBinary")
+    is_truncated: bool = Field(default=False, alias="isTruncated")
+    text: Optional[str] = None
+
+
+class GitHubGraphQLTreeEntry(BaseModel):
+    name: str
+    type: str
+
+
+class GitHubGraphQLTree(BaseModel):
+    entries: list[GitHubGraphQLTreeEntry] = []
+
+
+class GitHubGraphQLRef(BaseModel):
+    name: str
+
+
+# https://docs.github.com/en/graphql/reference/objects#repository
+class GitHubGraphQLRepository(BaseModel):
+    license_info: Optional[GitHubGraphQLLicense] = Field(
+        default=None, alias="licenseInfo"
+    )
+    default_branch_ref: Optional[GitHubGraphQLRef] = Field(
+        default=None, alias="defaultBranchRef"
+    )
+    root: Optional[GitHubGraphQLTree] = None
+    license_files: dict[str, Optional[GitHubGraphQLBlob]] = {}
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from typing import Any, Optional
 
 from pydantic import BaseModel, HttpUrl
@@ -68,6 +69,110 @@ class PyPIPackage(BaseModel):
     vulnerabilities: list[Any]
 
 
+class PyPIReleaseInfo(BaseModel):
+    """Subset of package information which DLC uses.
+
+    See `PyPIPackageInfo` for the full data.
+    """
+
+    name: str
+    version: str
+    license: Optional[str] = None
+    license_expression: Optional[str] = None
+    classifiers: Optional[list[str]] = None
+    home_page: Optional[str] = None
+    project_url: Optional[str] = None
+    project_urls: Optional[dict[str, str]] = None
+
+
+class PyPIReleaseFile(BaseModel):
+    """Distribution file of a release, an item of `urls` in the release data."""
+
+    filename: str
+    url: str
+    packagetype: str
+    size: Optional[int] = None
+
+
+class PyPIRelease(BaseModel):
+    """Subset of PyPI package data which DLC uses.
+
+    Response of "Get a release" JSON API contains large fields such as README text
+    (`info.description`) which DLC never uses. This model keeps only the fields DLC
+    uses, and ignores the others on validation. The original response, which is
+    written into the report as is, can be read back with `_raw_content` if it was
+    kept while collecting.
+
+    References
+    ----------
+    https://docs.pypi.org/api/json/#get-a-release
+
+    """
+
+    _tag: Literal["pypi"] = "pypi"
+    _raw_content: Optional[Callable[[], Optional[bytes]]] = None
+    info: PyPIReleaseInfo
+    urls: list[PyPIReleaseFile] = []
+
+
+class DistributionLicenseFile(BaseModel):
+    """License file included in a distribution file."""
+
+    path: str  # Path in the archive
+    content: str
+
+
+class DistributionLicenseContent(BaseModel):
+    """License data read from a distribution file of a release.
+
+    References
+    ----------
+    https://packaging.python.org/en/latest/specifications/core-metadata/#license-expression
+    https://packaging.python.org/en/latest/specifications/core-metadata/#license-file
+
+    """
+
+    _tag: Literal["distribution"] = "distribution"
+    filename: str
+    url: str
+    license_expression: Optional[str] = None
+    license: Optional[str] = None
+    classifiers: list[str] = []
+    license_files: list[DistributionLicenseFile] = []
+
+    @property
+    def license_name(self) -> Optional[str]:
+        """Name of the license declared in the core metadata, if any."""
+        if self.license_expression:
+            return self.license_expression
+
+        # e.g. "License :: OSI Approved :: MIT License"
+        names = [
+            parts[-1]
+            for classifier in self.classifiers
+            if (parts := [s.strip() for s in classifier.split("::")])[0] == "License"
+            and len(parts) > 1
+            and parts[-1] != "OSI Approved"
+        ]
+        if names:
+            return " OR ".join(names)
+
+        # Some packages put the whole license text in the "License" field
+        if self.license and "\n" not in self.license.strip():
+            return self.license.strip()
+        return None
+
+    def decode_content(self) -> Optional[bytes]:
+        if not self.license_files:
+            return None
+        if len(self.license_files) == 1:
+            return self.license_files[0].content.encode("utf-8")
+        return "\n".join(
+            f"----- {file.path} -----\n\n{file.content.rstrip()}\n"
+            for file in self.license_files
+        ).encode("utf-8")
+
+
 class PyPIStats(BaseModel):
     """PyPI statistics.
 
@@ -0,0 +1,176 @@
+"""Input of projects to collect license data for.
+
+Pins of all the projects given in an invocation are collected at once, so that a
+package shared by many projects is looked up only once.
+"""
+
+import hashlib
+import io
+import logging
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import click
+from typing_extensions import assert_never
+
+from dlc.models.common import InputFormat, Package
+from dlc.registries.installed import (
+    find_distribution_paths,
+    make_requirements_txt,
+    merge_collected_packages,
+    needs_lookup,
+    read_installed_packages,
+)
+from dlc.registries.pypi import _make_pypi_cache_key, read_pinned_requirements
+
+_logger = logging.getLogger(__name__)
+
+# Files looked up in a directory given as input of format `requirements_txt`
+_REQUIREMENTS_TXT_PATTERN = "**/requirements*.txt"
+
+
+# Shard of packages to collect, as 1-based index and the number of shards
+Shard = tuple[int, int]
+
+
+@dataclass
+class ProjectInput:
+    """Input of a project read from a file or an environment."""
+
+    name: str
+    source: str  # Input source shown in the report
+    pins: list[tuple[str, str]]  # Packages to collect online
+    installed: Optional[list[Package]] = field(default=None)
+
+
+def find_inputs(input_format: InputFormat, paths: Sequence[Path]) -> list[Path]:
+    """Expand directories in input paths into the input files in them."""
+    results = []
+    for path in paths:
+        if input_format == "requirements_txt" and path.is_dir():
+            found = sorted(path.glob(_REQUIREMENTS_TXT_PATTERN))
+            _logger.info("Found %d input file(s) in %s.", len(found), path)
+            results.extend(found)
+        else:
+            results.append(path)
+    return results
+
+
+def make_project_names(paths: Sequence[Path]) -> list[str]:
+    """Name projects after their input paths, uniquely.
+
+    A project of `requirements.txt` or `requirements-dev.txt` is named after its
+    directory, e.g. `myapp` or `myapp-dev`; otherwise after the file stem.
+    """
+    names: list[str] = []
+    for path in paths:
+        stem = path.stem if str(path) != "-" else "stdin"
+        if stem.startswith("requirements"):
+            stem = path.resolve().parent.name + stem.removeprefix("requirements")
+        name = stem
+        n = 1
+        while name in names:
+            n += 1
+            name = f"{stem}-{n}"
+        names.append(name)
+    return names
+
+
+def read_project_input(
+    input_format: InputFormat, path: Path, name: str
+) -> ProjectInput:
+    """Read input of a project."""
+    if input_format == "requirements_txt":
+        with click.open_file(str(path), encoding="utf-8") as f:
+            source = f.read()
+        with io.StringIO(source) as f:
+            pins = read_pinned_requirements(f)
+        return ProjectInput(name, source, pins)
+    elif input_format == "installed":
+        installed = read_installed_packages(find_distribution_paths(path))
+        pins = [(p.name, p.version) for p in installed if needs_lookup(p)]
+        return ProjectInput(name, make_requirements_txt(installed), pins, installed)
+    else:
+        assert_never(input_format)
+        msg = f"Unsupported input format: {input_format}"
+        raise AssertionError(msg)
+
+
+def in_shard(name: str, version: str, shard: Shard) -> bool:
+    """Return whether a package is assigned to a shard.
+
+    Packages are assigned by hash of their normalized name and version, so that
+    every job of a sharded run agrees on the assignment regardless of the order or
+    the grouping of the input.
+    """
+    index, count = shard
+    key = "==".join(_make_pypi_cache_key(name, version))
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+
+def collect_projects(
+    projects: Sequence[ProjectInput],
+    collect: Callable[[str], list[Package]],
+    shard: Optional[Shard] = None,
+) -> list[list[Package]]:
+    """Collect packages of projects, looking up each unique pin only once.
+
+    `collect` takes requirements.txt of the union of pins and returns the packages
+    collected, e.g. `collect_package_metadata`. Returns packages of each project.
+    If `shard` is given, only the packages assigned to it are included.
+    """
+    if shard is not None:
+        projects = [_select_shard(project, shard) for project in projects]
+    unique_pins = {
+        _make_pypi_cache_key(name, version): (name, version)
+        for project in projects
+        for name, version in project.pins
+    }
+    _logger.info(
+        "Collecting %d unique package(s) out of %d pin(s) in %d project(s).",
+        len(unique_pins),
+        sum(len(project.pins) for project in projects),
+        len(projects),
+    )
+    requirements = "".join(
+        f"{name}=={version}\n" for name, version in unique_pins.values()
+    )
+    collected = {
+        _make_pypi_cache_key(package.name, package.version): package
+        for package in (collect(requirements) if unique_pins else [])
+    }
+
+    results = []
+    for project in projects:
+        packages = [
+            package
+            for name, version in project.pins
+            if (package := collected.get(_make_pypi_cache_key(name, version)))
+            is not None
+        ]
+        if project.installed is not None:
+            packages = merge_collected_packages(project.installed, packages)
+        results.append(packages)
+    return results
+
+
+def _select_shard(project: ProjectInput, shard: Shard) -> ProjectInput:
+    pins = [(n, v) for n, v in project.pins if in_shard(n, v, shard)]
+    installed = None
+    if project.installed is not None:
+        installed = [p for p in project.installed if in_shard(p.name, p.version, shard)]
+    return ProjectInput(project.name, project.source, pins, installed)
+
+
+def union_packages(packages_per_project: Sequence[Sequence[Package]]) -> list[Package]:
+    """Get unique packages used by any of the projects, in order of appearance."""
+    packages: dict[tuple[str, str], Package] = {}
+    for project_packages in packages_per_project:
+        for package in project_packages:
+            packages.setdefault(
+                _make_pypi_cache_key(package.name, package.version), package
+            )
+    return list(packages.values())
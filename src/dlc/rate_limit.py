@@ -0,0 +1,151 @@
+"""Rate limiter shared by all requests to an API."""
+
+import logging
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dlc.exceptions import ApiRateLimitError
+from dlc.metrics import METRICS, _parse_int
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Schedules requests to an API according to its rate limit headers.
+
+    All workers reserve a time slot before sending a request. Slots are given out
+    by a token bucket which refills `rate` tokens per second up to `burst` tokens,
+    and within the quota reported by the latest response (`X-RateLimit-Remaining`).
+    Once the quota is exhausted, or the API asks to back off (`Retry-After`), the
+    whole pool of workers is paused at once until the time the API told.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int) -> None:
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, rate: Optional[float] = None) -> None:
+        """Forget the schedule and the quota reported so far.
+
+        If `rate` is given, it replaces the number of requests per second.
+        """
+        with self._lock:
+            if rate is not None:
+                self.rate = rate
+            self._tat = 0.0  # Theoretical arrival time of the next request
+            self._remaining: Optional[int] = None
+            self._reset_at = 0.0
+            self._paused_until = 0.0
+
+    def reserve(self) -> float:
+        """Reserve a slot for a request.
+
+        Returns seconds to wait before sending the request. Raises
+        `ApiRateLimitError` if it is longer than `SETTINGS.rate_limit_max_wait`.
+        """
+        if SETTINGS.mirror_dir is not None:
+            return 0.0  # Requests are served from a local mirror
+
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._paused_until)
+            if self._remaining is not None and self._remaining <= 0:
+                if self._reset_at <= start:
+                    self._remaining = None  # Quota was reset; unknown until next update
+                else:
+                    start = self._reset_at
+
+            # Token bucket in form of GCRA (Generic Cell Rate Algorithm)
+            interval = 1.0 / self.rate
+            tat = max(start, self._tat)
+            start = max(start, tat - interval * (self.burst - 1))
+
+            delay = start - now
+            if delay > SETTINGS.rate_limit_max_wait:
+                raise ApiRateLimitError()
+
+            self._tat = tat + interval
+            if self._remaining is not None:
+                self._remaining -= 1
+        if delay > 0:
+            METRICS.record_rate_limit_wait(self.name, delay)
+        return delay
+
+    def acquire(self) -> None:
+        """Wait until a request can be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(
+        self, status_code: int, headers: Mapping[str, str], content: bytes = b""
+    ) -> None:
+        """Update the schedule with rate limit headers in a response.
+
+        Requests are paused only if the response tells that the rate limit was
+        hit (see `is_rate_limited`), or asks to retry after a while.
+        """
+        remaining = _parse_int(headers.get("X-RateLimit-Remaining"))
+        reset = _parse_int(headers.get("X-RateLimit-Reset"))
+        retry_after = _parse_int(headers.get("Retry-After"))
+
+        with self._lock:
+            now = time.monotonic()
+            if reset is not None:
+                self._reset_at = now + (reset - time.time())
+            if remaining is not None:
+                self._remaining = remaining
+
+            paused_until = self._paused_until
+            if retry_after is not None:
+                paused_until = now + retry_after
+            elif is_rate_limited(status_code, headers, content):
+                if remaining == 0:
+                    paused_until = self._reset_at
+                else:
+                    # Secondary rate limit; GitHub recommends to wait at least
+                    # one minute if no other information was given.
+                    paused_until = now + 60
+            if paused_until > self._paused_until:
+                self._paused_until = paused_until
+                resume_at = datetime.now(tz=timezone.utc) + timedelta(
+                    seconds=paused_until - now
+                )
+                _logger.warning(
+                    "Hit rate limit of %s; pausing requests until %s.",
+                    self.name,
+                    resume_at.isoformat(timespec="seconds"),
+                )
+
+
+def is_rate_limited(
+    status_code: int, headers: Mapping[str, str], content: bytes = b""
+) -> bool:
+    """Check whether a response tells that the rate limit of GitHub API was hit.
+
+    GitHub also answers 403 for other reasons, e.g. lack of permission or SAML
+    enforcement of an organization, which must not pause the other requests.
+    """
+    if status_code == 429:
+        return True
+    if status_code != 403:
+        return False
+    return (
+        headers.get("Retry-After") is not None
+        or _parse_int(headers.get("X-RateLimit-Remaining")) == 0
+        or b"rate limit" in content.lower()
+    )
+
+
+# GitHub REST API and GraphQL API have separate quotas. Both limits number of
+# requests to 900 points per minute as "secondary rate limit".
+# https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api
+GITHUB_REST_RATE_LIMITER = RateLimiter("GitHub REST API", rate=15.0, burst=100)
+GITHUB_GRAPHQL_RATE_LIMITER = RateLimiter("GitHub GraphQL API", rate=15.0, burst=100)
@@ -0,0 +1,509 @@
+"""License data in distribution files of PyPI releases.
+
+Only small parts of a wheel are downloaded: the core metadata from the file served
+next to it (PEP 658), and the license files in its `.dist-info` directory using
+HTTP range requests on the zip archive.
+
+Reading a zip archive is implemented as a generator which yields HTTP requests to
+send and receives their responses, so that the same logic is driven by both of
+the thread and asyncio engines.
+
+Source distributions are the last resort. A tar archive is streamed and
+decompressed incrementally until a license file near the root is found.
+"""
+
+import logging
+import re
+import struct
+import tarfile
+import zlib
+from collections.abc import Collection, Generator, Mapping
+from dataclasses import dataclass, field
+from email.parser import BytesHeaderParser
+from typing import NamedTuple, Optional, Protocol
+
+from typing_extensions import TypeAlias
+
+from dlc.cache import get_cache
+from dlc.exceptions import LicenseDataUnavailableError
+from dlc.metrics import endpoint
+from dlc.models.pypi import (
+    DistributionLicenseContent,
+    DistributionLicenseFile,
+    PyPIRelease,
+    PyPIReleaseFile,
+)
+from dlc.repositories.github import LICENSE_FILENAMES, _license_file_likelihood
+from dlc.session import get_session
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+# Size of the first read from the end of a wheel, which covers the central
+# directory of most wheels
+_TAIL_SIZE = 64 * 1024
+# Minimum size of the other reads, so that a local file header and the data
+# following it are usually read at once
+_MIN_READ_SIZE = 16 * 1024
+_MAX_LICENSE_FILES = 20
+_MAX_LICENSE_FILE_SIZE = 1024 * 1024
+# Give up scanning a tar archive after reading this many bytes of it
+_MAX_SDIST_SCAN_SIZE = 16 * 1024 * 1024
+_SDIST_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".zip")
+# License files in source distributions are often named with a suffix, e.g.
+# `LICENSE-MIT`, `LICENSE.APACHE2` or `COPYING.LESSER`
+_re_sdist_license_filename = re.compile(
+    r"^(?!.*\.pyi?$)(licen[cs]e|copying)([-._].*)?$", re.IGNORECASE
+)
+
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIGNATURE = b"PK\x06\x07"
+_ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+_CENTRAL_DIRECTORY_ENTRY = struct.Struct("<4s4B4HL2L5H2L")
+_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x01\x02"
+_LOCAL_FILE_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_FILE_HEADER_SIGNATURE = b"PK\x03\x04"
+_re_content_range = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class _Request(NamedTuple):
+    url: str
+    headers: Mapping[str, str] = {}
+
+
+class _Response(NamedTuple):
+    status_code: int
+    headers: Mapping[str, str]
+    content: bytes
+
+
+_Reader: TypeAlias = Generator[
+    _Request, _Response, Optional[DistributionLicenseContent]
+]
+
+
+def get_license_data_from_wheel(
+    release: PyPIRelease,
+) -> Optional[DistributionLicenseContent]:
+    """Read license data from a wheel of a release.
+
+    Returns None if the release has no wheel or no license data was found in it.
+    Raises `LicenseDataUnavailableError` if the wheel could not be read.
+    """
+    file = select_wheel(release)
+    if file is None:
+        return None
+    if (cached := _get_cached(file)) is not None:
+        return cached[0]
+
+    license_content = _drive(read_wheel_license(file))
+    _put_cached(file, license_content)
+    return license_content
+
+
+def get_license_data_from_sdist(
+    release: PyPIRelease,
+) -> Optional[DistributionLicenseContent]:
+    """Read license file near the root of a source distribution of a release.
+
+    Only the beginning of a tar archive up to the license file is downloaded.
+    License name is taken from the release data since the core metadata
+    (`PKG-INFO`) may be anywhere in the archive. Returns None if the release has
+    no source distribution or no license file was found in it.
+    """
+    file = select_sdist(release)
+    if file is None:
+        return None
+    if (cached := _get_cached(file)) is not None:
+        return cached[0]
+
+    if file.filename.endswith(".zip"):
+        license_content = _drive(read_zip_sdist_license(file, release))
+    else:
+        license_content = _scan_tar_sdist(file, release)
+    _put_cached(file, license_content)
+    return license_content
+
+
+def _drive(reader: _Reader) -> Optional[DistributionLicenseContent]:
+    try:
+        request = next(reader)
+        while True:
+            _logger.debug("GET %s %s", request.url, request.headers.get("Range", ""))
+            with endpoint("distribution"):
+                resp = get_session().get(
+                    request.url, headers=request.headers, timeout=SETTINGS.timeout
+                )
+            request = reader.send(
+                _Response(resp.status_code, resp.headers, resp.content)
+            )
+    except StopIteration as stop:
+        license_content: Optional[DistributionLicenseContent] = stop.value
+    return license_content
+
+
+def select_wheel(release: PyPIRelease) -> Optional[PyPIReleaseFile]:
+    """Select a wheel to read license data from, preferring a pure Python one."""
+    wheels = [
+        file
+        for file in release.urls
+        if file.packagetype == "bdist_wheel" and file.filename.endswith(".whl")
+    ]
+    for file in wheels:
+        if file.filename.endswith("-none-any.whl"):
+            return file
+    return wheels[0] if wheels else None
+
+
+def select_sdist(release: PyPIRelease) -> Optional[PyPIReleaseFile]:
+    """Select a source distribution to read license file from."""
+    for file in release.urls:
+        if file.packagetype == "sdist" and file.filename.endswith(_SDIST_SUFFIXES):
+            return file
+    return None
+
+
+def _get_cached(
+    file: PyPIReleaseFile,
+) -> Optional[tuple[Optional[DistributionLicenseContent]]]:
+    # Distribution files never change once uploaded, so results are cached
+    # permanently, including the ones which found nothing.
+    cache = get_cache()
+    if cache is None or (content := cache.get("distribution", file.url)) is None:
+        return None
+    _logger.debug("Cache hit: %s", file.filename)
+    if content == b"null":
+        return (None,)
+    return (DistributionLicenseContent.model_validate_json(content),)
+
+
+def _put_cached(
+    file: PyPIReleaseFile, license_content: Optional[DistributionLicenseContent]
+) -> None:
+    if (cache := get_cache()) is not None:
+        data = "null" if license_content is None else license_content.model_dump_json()
+        cache.put("distribution", file.url, data=data.encode())
+
+
+def read_wheel_license(file: PyPIReleaseFile) -> _Reader:
+    """Read license data from a wheel, yielding requests to send."""
+    metadata = None
+    resp = yield _Request(f"{file.url}.metadata")  # PEP 658
+    if resp.status_code == 200:
+        metadata = resp.content
+
+    archive = _RemoteZip(file.url)
+    entries = yield from archive.read_central_directory()
+    dist_info = next(
+        (
+            path.removesuffix("METADATA")
+            for path in entries
+            if path.count("/") == 1 and path.endswith(".dist-info/METADATA")
+        ),
+        None,
+    )
+    if dist_info is None:
+        _logger.debug("No .dist-info directory in %s", file.filename)
+        return None
+    if metadata is None:
+        metadata = yield from archive.read_member(entries[f"{dist_info}METADATA"])
+
+    headers = BytesHeaderParser().parsebytes(metadata)
+    license_files = []
+    for path in _find_license_files(
+        entries, dist_info, headers.get_all("License-File")
+    ):
+        entry = entries[path]
+        if entry.file_size > _MAX_LICENSE_FILE_SIZE:
+            _logger.debug("Skipped too large license file %s", path)
+            continue
+        content = yield from archive.read_member(entry)
+        license_files.append(
+            DistributionLicenseFile(
+                path=path, content=content.decode("utf-8", errors="replace")
+            )
+        )
+
+    license_content = DistributionLicenseContent(
+        filename=file.filename,
+        url=file.url,
+        license_expression=headers.get("License-Expression"),
+        license=headers.get("License"),
+        classifiers=headers.get_all("Classifier") or [],
+        license_files=license_files,
+    )
+    if license_content.license_name is None and not license_files:
+        return None
+    return license_content
+
+
+def read_zip_sdist_license(file: PyPIReleaseFile, release: PyPIRelease) -> _Reader:
+    """Read license file from a source distribution in zip, yielding requests."""
+    archive = _RemoteZip(file.url)
+    entries = yield from archive.read_central_directory()
+    candidates = [
+        (score, path)
+        for path in entries
+        if _is_near_root(path) and (score := _sdist_license_file_likelihood(path)) >= 0
+    ]
+    if not candidates:
+        return None
+    _, path = min(candidates)
+    if entries[path].file_size > _MAX_LICENSE_FILE_SIZE:
+        return None
+    content = yield from archive.read_member(entries[path])
+    return _make_sdist_license_content(file, release, path, content)
+
+
+def _scan_tar_sdist(
+    file: PyPIReleaseFile, release: PyPIRelease
+) -> Optional[DistributionLicenseContent]:
+    _logger.debug("GET %s (streaming)", file.url)
+    with (
+        endpoint("distribution"),
+        get_session().get(file.url, stream=True, timeout=SETTINGS.timeout) as resp,
+    ):
+        if resp.status_code != 200:
+            raise LicenseDataUnavailableError(resp.status_code, file.url)
+
+        # Members are read one by one as the archive is decompressed; closing the
+        # response on return discards the rest of the archive.
+        raw = _CountingReader(resp.raw)
+        # Stream mode needs only `read` of the file object
+        with tarfile.open(fileobj=raw, mode="r|*") as tar:  # type: ignore[call-overload]
+            for member in tar:
+                if raw.position > _MAX_SDIST_SCAN_SIZE:
+                    _logger.debug("Gave up scanning %s", file.filename)
+                    break
+                if (
+                    not member.isfile()
+                    or member.size > _MAX_LICENSE_FILE_SIZE
+                    or not _is_near_root(member.name)
+                    or _sdist_license_file_likelihood(member.name) < 0
+                ):
+                    continue
+
+                f = tar.extractfile(member)
+                if f is None:
+                    continue
+                _logger.debug(
+                    "Found %s after reading %d bytes of %s",
+                    member.name,
+                    raw.position,
+                    file.filename,
+                )
+                return _make_sdist_license_content(file, release, member.name, f.read())
+    return None
+
+
+def _sdist_license_file_likelihood(path: str) -> int:
+    """Score like `_license_file_likelihood`, also matching suffixed names."""
+    if (score := _license_file_likelihood(path)) >= 0:
+        return score
+    if _re_sdist_license_filename.match(path.rsplit("/", 1)[-1]) is None:
+        return -1
+    # Less likely than the typical names in the same directory
+    return (len(LICENSE_FILENAMES) + 1) + (path.count("/") + 1) * 1000
+
+
+def _is_near_root(path: str) -> bool:
+    # Files of a source distribution are in a directory named `{name}-{version}`
+    return path.removeprefix("./").count("/") <= 1
+
+
+def _make_sdist_license_content(
+    file: PyPIReleaseFile, release: PyPIRelease, path: str, content: bytes
+) -> DistributionLicenseContent:
+    return DistributionLicenseContent(
+        filename=file.filename,
+        url=file.url,
+        license_expression=release.info.license_expression,
+        license=release.info.license,
+        classifiers=release.info.classifiers or [],
+        license_files=[
+            DistributionLicenseFile(
+                path=path, content=content.decode("utf-8", errors="replace")
+            )
+        ],
+    )
+
+
+class _Readable(Protocol):
+    def read(self, size: int = -1, /) -> bytes: ...
+
+
+class _CountingReader:
+    """File-like object counting bytes read from another one."""
+
+    def __init__(self, f: _Readable) -> None:
+        self.f = f
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.position += len(data)
+        return data
+
+
+def _find_license_files(
+    entries: Collection[str],
+    dist_info: str,
+    declared: Optional[list[str]],
+) -> list[str]:
+    # Metadata 2.4 places license files under `licenses/` of `.dist-info`, and
+    # older tools place them directly in it.
+    if declared:
+        paths = []
+        for name in declared:
+            for path in (f"{dist_info}licenses/{name}", f"{dist_info}{name}"):
+                if path in entries:
+                    paths.append(path)
+                    break
+        return paths[:_MAX_LICENSE_FILES]
+
+    return [
+        path
+        for path in entries
+        if path.startswith(dist_info)
+        and (
+            path.startswith(f"{dist_info}licenses/")
+            or _license_file_likelihood(path) >= 0
+        )
+        and not path.endswith("/")
+    ][:_MAX_LICENSE_FILES]
+
+
+@dataclass(frozen=True)
+class _ZipEntry:
+    path: str
+    compress_type: int
+    compress_size: int
+    file_size: int
+    header_offset: int
+
+
+@dataclass
+class _RemoteZip:
+    """Zip archive read partially using HTTP range requests."""
+
+    url: str
+    size: int = 0
+    _chunks: list[tuple[int, bytes]] = field(default_factory=list)
+
+    def read_central_directory(
+        self,
+    ) -> Generator[_Request, _Response, dict[str, _ZipEntry]]:
+        tail = yield from self._read_tail()
+        eocd_pos = tail.rfind(_EOCD_SIGNATURE)
+        if eocd_pos < 0 or len(tail) - eocd_pos < _EOCD.size:
+            msg = "End of central directory not found"
+            raise _malformed(self.url, msg)
+        (_, _, _, _, n_entries, cd_size, cd_offset, _) = _EOCD.unpack_from(
+            tail, eocd_pos
+        )
+
+        locator_pos = eocd_pos - _ZIP64_LOCATOR.size
+        if (
+            locator_pos >= 0
+            and tail[locator_pos : locator_pos + 4] == _ZIP64_LOCATOR_SIGNATURE
+        ):
+            _, _, zip64_eocd_offset, _ = _ZIP64_LOCATOR.unpack_from(tail, locator_pos)
+            data = yield from self.read(zip64_eocd_offset, _ZIP64_EOCD.size)
+            (_, _, _, _, _, _, _, n_entries, cd_size, cd_offset) = (
+                _ZIP64_EOCD.unpack_from(data)
+            )
+
+        data = yield from self.read(cd_offset, cd_size)
+        entries = {}
+        pos = 0
+        for _ in range(n_entries):
+            if data[pos : pos + 4] != _CENTRAL_DIRECTORY_SIGNATURE:
+                raise _malformed(self.url, "Broken central directory")
+            (
+                *_,
+                flags,
+                compress_type,
+                _,
+                _,
+                _,
+                compress_size,
+                file_size,
+                name_len,
+                extra_len,
+                comment_len,
+                _,
+                _,
+                _,
+                header_offset,
+            ) = _CENTRAL_DIRECTORY_ENTRY.unpack_from(data, pos)
+            pos += _CENTRAL_DIRECTORY_ENTRY.size
+            raw_path = data[pos : pos + name_len]
+            path = raw_path.decode("utf-8" if flags & 0x800 else "cp437")
+            pos += name_len + extra_len + comment_len
+            if 0xFFFFFFFF in (compress_size, file_size, header_offset):
+                continue  # Sizes in ZIP64 extra field; license files are not so large
+            entries[path] = _ZipEntry(
+                path, compress_type, compress_size, file_size, header_offset
+            )
+        return entries
+
+    def read_member(self, entry: _ZipEntry) -> Generator[_Request, _Response, bytes]:
+        # Name and extra field in the local file header may differ from the ones in
+        # the central directory; read the header first, expecting the data follows
+        header_size = _LOCAL_FILE_HEADER.size + len(entry.path.encode()) + 64
+        header = yield from self.read(
+            entry.header_offset,
+            min(header_size + entry.compress_size, self.size - entry.header_offset),
+        )
+        if header[:4] != _LOCAL_FILE_HEADER_SIGNATURE:
+            raise _malformed(self.url, f"Broken local file header of {entry.path}")
+        *_, name_len, extra_len = _LOCAL_FILE_HEADER.unpack_from(header)
+        data_offset = (
+            entry.header_offset + _LOCAL_FILE_HEADER.size + name_len + extra_len
+        )
+        data = yield from self.read(data_offset, entry.compress_size)
+
+        if entry.compress_type == 0:
+            return data
+        elif entry.compress_type == 8:
+            return zlib.decompress(data, wbits=-15)
+        raise _malformed(
+            self.url, f"Unsupported compression {entry.compress_type} of {entry.path}"
+        )
+
+    def read(self, offset: int, size: int) -> Generator[_Request, _Response, bytes]:
+        for start, chunk in self._chunks:
+            if start <= offset and offset + size <= start + len(chunk):
+                return chunk[offset - start : offset - start + size]
+
+        end = min(offset + max(size, _MIN_READ_SIZE), self.size) - 1
+        resp = yield _Request(self.url, {"Range": f"bytes={offset}-{end}"})
+        if resp.status_code != 206:
+            raise LicenseDataUnavailableError(resp.status_code, self.url)
+        self._chunks.append((offset, resp.content))
+        if len(resp.content) < size:
+            raise _malformed(self.url, "Unexpected end of data")
+        return resp.content[:size]
+
+    def _read_tail(self) -> Generator[_Request, _Response, bytes]:
+        resp = yield _Request(self.url, {"Range": f"bytes=-{_TAIL_SIZE}"})
+        if resp.status_code == 200:
+            # Range is not supported by the server; got the whole file
+            self.size = len(resp.content)
+            self._chunks.append((0, resp.content))
+            return resp.content
+        if resp.status_code != 206:
+            raise LicenseDataUnavailableError(resp.status_code, self.url)
+
+        match = _re_content_range.fullmatch(resp.headers.get("Content-Range", ""))
+        if match is None:
+            raise _malformed(self.url, "Invalid Content-Range")
+        start, self.size = int(match[1]), int(match[3])
+        self._chunks.append((start, resp.content))
+        return resp.content
+
+
+def _malformed(url: str, msg: str) -> ValueError:
+    return ValueError(f"{msg}: {url}")
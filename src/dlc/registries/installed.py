@@ -0,0 +1,191 @@
+"""Functions related to packages installed in a local Python environment.
+
+License data is read from the `.dist-info` directories of installed distributions:
+`License-Expression`, `License` and classifiers in the core metadata, and the
+license files listed in `RECORD`. No network access is needed unless a
+distribution lacks a license file; such packages are collected from PyPI as usual
+and merged with `merge_collected_packages`.
+"""
+
+import importlib.metadata
+import json
+import logging
+import subprocess
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from typing import Optional
+
+from packaging.utils import canonicalize_name
+from pydantic import ValidationError
+
+from dlc.models.common import Package
+from dlc.models.pypi import (
+    DistributionLicenseContent,
+    DistributionLicenseFile,
+    PyPIRelease,
+    PyPIReleaseInfo,
+)
+from dlc.registries.distribution import (
+    _MAX_LICENSE_FILE_SIZE,
+    _find_license_files,
+)
+from dlc.registries.pypi import _has_license_file, _make_pypi_cache_key, _prefer
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+_PRINT_SYS_PATH = "import json, sys; print(json.dumps(sys.path))"
+
+
+def find_distribution_paths(target: Path) -> list[Path]:
+    """Get directories to search for installed distributions.
+
+    `target` is either a site-packages directory, or a Python interpreter of which
+    `sys.path` is searched.
+    """
+    if target.is_dir():
+        return [target]
+
+    try:
+        result = subprocess.run(  # noqa: S603
+            [str(target), "-c", _PRINT_SYS_PATH],
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=SETTINGS.timeout,
+        )
+    except (OSError, subprocess.SubprocessError) as ex:
+        msg = f"Failed to get sys.path of Python interpreter {target}: {ex}"
+        raise ValueError(msg) from ex
+    return [Path(p) for p in json.loads(result.stdout) if p and Path(p).is_dir()]
+
+
+def read_installed_packages(paths: Sequence[Path]) -> list[Package]:
+    """Read package metadata and license data of distributions installed in paths.
+
+    If a distribution is installed in more than one path, the first one is used
+    as the import system does. Packages are sorted by name.
+    """
+    packages: dict[str, Package] = {}
+    for dist in importlib.metadata.distributions(path=[str(p) for p in paths]):
+        name = dist.metadata["Name"]
+        if not name or canonicalize_name(name) in packages:
+            continue
+        try:
+            package = _read_installed_package(dist)
+        except ValidationError:
+            _logger.warning("Ignored %s of invalid version %s", name, dist.version)
+            continue
+        packages[canonicalize_name(name)] = package
+    _logger.info("Found %d installed package(s).", len(packages))
+    return [packages[key] for key in sorted(packages)]
+
+
+def make_requirements_txt(packages: Iterable[Package]) -> str:
+    """Make requirements.txt pinning the packages to their versions."""
+    return "".join(f"{package.name}=={package.version}\n" for package in packages)
+
+
+def needs_lookup(package: Package) -> bool:
+    """Whether license data of an installed package should be looked up online."""
+    return not _has_license_file(package.license_data)
+
+
+def merge_collected_packages(
+    installed: Sequence[Package], collected: Sequence[Package]
+) -> list[Package]:
+    """Merge packages collected online into the installed packages.
+
+    The collected data is used if it has a license file or is a failure (so that
+    it is retried in an incremental run). Otherwise the local data is kept, as
+    well as packages which could not be collected at all.
+    """
+    collected_packages = {
+        _make_pypi_cache_key(package.name, package.version): package
+        for package in collected
+    }
+    results = []
+    for package in installed:
+        other = collected_packages.get(
+            _make_pypi_cache_key(package.name, package.version)
+        )
+        if other is not None and (
+            _prefer(package.license_data, other.license_data) is other.license_data
+        ):
+            results.append(other)
+        else:
+            results.append(package)
+    return results
+
+
+def _read_installed_package(dist: importlib.metadata.Distribution) -> Package:
+    metadata = dist.metadata
+    project_urls = {}
+    for value in metadata.get_all("Project-URL") or []:
+        label, _, url = value.partition(",")
+        project_urls[label.strip()] = url.strip()
+    info = PyPIReleaseInfo(
+        name=metadata["Name"],
+        version=dist.version,
+        license=metadata["License"],
+        license_expression=metadata["License-Expression"],
+        classifiers=metadata.get_all("Classifier"),
+        home_page=metadata["Home-page"],
+        project_urls=project_urls or None,
+    )
+    return Package(
+        name=info.name,
+        version=info.version,
+        registry_data=PyPIRelease(info=info),
+        license_data=_read_installed_license(dist, info),
+    )
+
+
+def _read_installed_license(
+    dist: importlib.metadata.Distribution, info: PyPIReleaseInfo
+) -> Optional[DistributionLicenseContent]:
+    # Paths in RECORD are relative to the site-packages directory
+    paths = [str(path) for path in dist.files or []]
+    dist_info = next(
+        (
+            path.removesuffix("METADATA")
+            for path in paths
+            if path.count("/") == 1 and path.endswith(".dist-info/METADATA")
+        ),
+        None,
+    )
+    if dist_info is None:
+        # e.g. `.egg-info` directory of a legacy installation
+        _logger.debug("No .dist-info directory of %s in RECORD", info.name)
+        return None
+
+    license_files = []
+    for path in _find_license_files(
+        dict.fromkeys(paths), dist_info, dist.metadata.get_all("License-File")
+    ):
+        file = Path(str(dist.locate_file(path)))
+        try:
+            if file.stat().st_size > _MAX_LICENSE_FILE_SIZE:
+                _logger.debug("Skipped too large license file %s", file)
+                continue
+            content = file.read_bytes()
+        except OSError:
+            _logger.warning("Failed to read license file %s", file, exc_info=True)
+            continue
+        license_files.append(
+            DistributionLicenseFile(
+                path=path, content=content.decode("utf-8", errors="replace")
+            )
+        )
+
+    license_content = DistributionLicenseContent(
+        filename=dist_info.rstrip("/"),
+        url=Path(str(dist.locate_file(dist_info))).resolve().as_uri(),
+        license_expression=info.license_expression,
+        license=info.license,
+        classifiers=info.classifiers or [],
+        license_files=license_files,
+    )
+    if license_content.license_name is None and not license_files:
+        return None
+    return license_content
@@ -1,119 +1,438 @@
 """Functions related to PyPI package registry."""
 
 import logging
-from concurrent.futures import Executor
-from pathlib import Path
+import threading
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
 from time import monotonic
-from typing import Optional, TextIO, Union
+from typing import NamedTuple, Optional, TextIO, Union
 
-import requests
 from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+from typing_extensions import TypeAlias
 
+from dlc.cache import get_cache
 from dlc.exceptions import (
     ApiRateLimitError,
     LicenseDataUnavailableError,
     VersionSpecifierError,
 )
+from dlc.metrics import endpoint
 from dlc.models.common import LicenseContentFailed, Package
 from dlc.models.github import GitHubLicenseContent
-from dlc.models.pypi import PyPIPackage
+from dlc.models.pypi import DistributionLicenseContent, PyPIRelease
+from dlc.registries.distribution import (
+    get_license_data_from_sdist,
+    get_license_data_from_wheel,
+    select_sdist,
+    select_wheel,
+)
 from dlc.repositories.github import (
-    get_file_list_from_github,
+    _get_owner_and_repo_from_url,
+    find_license_file_in_github,
     get_license_data_from_github,
+    has_cached_license_data,
+    resolve_release_ref,
 )
+from dlc.repositories.github_graphql import GitHubLicenseBatcher, use_github_graphql
+from dlc.session import get_session
 from dlc.settings import SETTINGS
+from dlc.spill import SpillFile
 
 _logger = logging.getLogger(__name__)
 
+_LicenseData: TypeAlias = Optional[
+    Union[GitHubLicenseContent, DistributionLicenseContent, LicenseContentFailed]
+]
+
+
+class _SearchSourceTree(NamedTuple):
+    """Result of a repository lookup which found no license detected by GitHub.
+
+    The source tree is searched per package rather than per repository, since a
+    package in a monorepo has its license file in the directory named after it.
+    """
+
+    ref: Optional[str]  # Tag to search at, or None for the default branch
+
+
+_RepositoryLicenseData: TypeAlias = Union[_LicenseData, _SearchSourceTree]
+
 
 def collect_package_metadata(
     executor: Executor,
     input_file: TextIO,
+    previous: Optional[Sequence[Package]] = None,
 ) -> list[Package]:
-    requirements = _read_requirements_txt(input_file)
-    n_packages = len(requirements)
+    """Collect package metadata and license data of packages in requirements.txt.
+
+    If results of a previous run are given as `previous`, packages of the same
+    name and version are reused unless it was failed to get their license data.
+    Responses from PyPI are kept in a temporary file so that they can be written
+    into the report as is.
+    """
+    name_and_version_tuples = read_pinned_requirements(input_file)
+    results = reuse_previous_results(name_and_version_tuples, previous or [])
+    targets = [
+        (i, name_and_version)
+        for i, name_and_version in enumerate(name_and_version_tuples)
+        if i not in results
+    ]
     _logger.info(
-        "Start collecting license data of %d package(s) from PyPI.", n_packages
+        "Start collecting license data of %d package(s) from PyPI.", len(targets)
     )
+    _logger.debug("Target packages: %s", [x for _, x in targets])
 
-    # Extract package name and version number
-    name_and_version_tuples = []
-    for requirement in requirements:
-        if len(requirement.specifier) != 1:
-            msg = (
-                f"Version specifier must be in form of 'name==version': {requirement!s}"
-            )
-            raise VersionSpecifierError(msg)
-
-        specifier = list(requirement.specifier)[0]
-        if specifier.operator != "==":
-            msg = f"Version specifier's operator must be `==`: {requirement!s}"
-            raise VersionSpecifierError(msg)
-
-        name_and_version_tuples.append((requirement.name, specifier.version))
-
-    _logger.debug("Target packages: %s", name_and_version_tuples)
-
-    # Get package metadata from PyPI
-    _logger.info("Fetching package metadata from PyPI.")
     t0 = monotonic()
-    responses = list(
-        executor.map(
-            lambda x: _get_pypi_package_data(x[0], x[1]),
-            name_and_version_tuples,
-        ),
-    )
+    for j, package in iter_package_metadata(
+        executor, [x for _, x in targets], SpillFile()
+    ):
+        results[targets[j][0]] = package
     elapsed_seconds = monotonic() - t0
     _logger.info("Fetched in %.3g seconds.", elapsed_seconds)
 
-    # Find source repository URL in the PyPI metadata
-    pypi_records: dict[tuple[str, str], PyPIPackage] = {}
-    repos_urls: dict[tuple[str, str], Optional[str]] = {}
-    for name, version, response in responses:
-        if response.status_code != 200:
-            _logger.warning("Failed to get package data for %s %s", name, version)
-            continue
+    # Keep the order of the input
+    return [results[i] for i in sorted(results)]
+
+
+def reuse_previous_results(
+    name_and_version_tuples: Sequence[tuple[str, str]],
+    previous: Sequence[Package],
+) -> dict[int, Package]:
+    """Find packages which do not need to be collected again.
+
+    Returns a mapping from index in `name_and_version_tuples` to the package data
+    in `previous` of the same name and version. Packages of which license data
+    or license file could not be collected are excluded so that they are retried.
+    """
+    previous_packages = {
+        _make_pypi_cache_key(package.name, package.version): package
+        for package in previous
+        if _is_reusable(package)
+    }
+    results: dict[int, Package] = {}
+    for i, (name, version) in enumerate(name_and_version_tuples):
+        key = _make_pypi_cache_key(name, version)
+        if (package := previous_packages.get(key)) is not None:
+            results[i] = package
+    if previous:
+        _logger.info(
+            "Reusing license data of %d package(s) in the previous result.",
+            len(results),
+        )
+    return results
 
-        package_data = PyPIPackage.model_validate(response.json())
-        pypi_records[(name, version)] = package_data
 
-        # Try getting source repository URL
-        repo_url = _guess_repository_url(package_data)
-        _logger.debug(
-            "Resolved source repository URL for %s %s as %s", name, version, repo_url
+def _is_reusable(package: Package) -> bool:
+    if package.registry_data is None:
+        return False
+    if package.license_data is None:
+        # A license file referred by URL must have been downloaded
+        return (
+            package.license_file_url is None
+            or package.downloaded_license_file is not None
         )
-        repos_urls[(name, version)] = repo_url
+    return package.license_data._tag != "failure"
+
 
-    # Get license information from source repository
-    _logger.info("Fetching license information from source repository.")
+def iter_package_metadata(
+    executor: Executor,
+    name_and_version_tuples: Sequence[tuple[str, str]],
+    spill: Optional[SpillFile] = None,
+) -> Iterator[tuple[int, Package]]:
+    """Collect package metadata and license data, yielding them as completed.
+
+    Each package is processed as a pipeline: license data lookup for a package
+    starts as soon as its own metadata arrives from PyPI, regardless of the other
+    packages. License file of a package is also downloaded in this stage if it is
+    not included in the license data, so that writing the report needs no network
+    access. Results are yielded in order of completion together with index of
+    the package in `name_and_version_tuples`. Packages of which metadata could not
+    be fetched are skipped. If `spill` is given, responses from PyPI are kept in
+    it rather than being discarded after parsing.
+    """
     t0 = monotonic()
-    license_contents = list(
-        executor.map(
-            lambda x: _get_license_info(x[0][0], x[0][1], x[1]), repos_urls.items()
-        )
+    license_lookups = _LicenseLookups(executor)
+    registry_stage: dict[Future, int] = {
+        executor.submit(_get_pypi_package_data, name, version): i
+        for i, (name, version) in enumerate(name_and_version_tuples)
+    }
+    license_stage: dict[Future, list[tuple[int, PyPIRelease]]] = {}
+    license_file_stage: dict[Future, int] = {}
+    pending: set[Future] = set(registry_stage)
+    n_done = 0
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future in registry_stage:
+                # Find source repository URL in the PyPI metadata and then
+                # get license information from the source repository.
+                i = registry_stage.pop(future)
+                name, version, content = future.result()
+                if content is None:
+                    _logger.warning(
+                        "Failed to get package data for %s %s", name, version
+                    )
+                    continue
+
+                package_data = PyPIRelease.model_validate_json(content)
+                if spill is not None:
+                    package_data._raw_content = spill.append(content)
+                repos_url = _resolve_repository_url(name, version, package_data)
+                license_future = license_lookups.submit(
+                    name, version, package_data, repos_url
+                )
+                license_stage.setdefault(license_future, []).append((i, package_data))
+                pending.add(license_future)
+            elif future in license_stage:
+                # A lookup may be shared by packages of the same repository
+                for i, package_data in license_stage.pop(future):
+                    name, version = name_and_version_tuples[i]
+                    package = Package(
+                        name=name,
+                        version=version,
+                        registry_data=package_data,
+                        license_data=future.result(),
+                    )
+                    if package.license_file_url is None:
+                        n_done += 1
+                        _log_progress(n_done, len(name_and_version_tuples), package, t0)
+                        yield i, package
+                        continue
+
+                    # Download license file now rather than on writing the report
+                    license_file_future = executor.submit(
+                        _prefetch_license_file, package
+                    )
+                    license_file_stage[license_file_future] = i
+                    pending.add(license_file_future)
+            else:
+                i = license_file_stage.pop(future)
+                package = future.result()
+                n_done += 1
+                _log_progress(n_done, len(name_and_version_tuples), package, t0)
+                yield i, package
+
+
+def _prefetch_license_file(package: Package) -> Package:
+    _ = package.license_file  # Fill the cached property
+    return package
+
+
+def _log_progress(n_done: int, n_total: int, package: Package, t0: float) -> None:
+    _logger.debug(
+        "(%d/%d) Collected %s %s in %.3g seconds.",
+        n_done,
+        n_total,
+        package.name,
+        package.version,
+        monotonic() - t0,
     )
-    elapsed_seconds = monotonic() - t0
-    _logger.info("Fetched in %.3g seconds.", elapsed_seconds)
 
-    return [
-        Package(
-            name=name,
-            version=version,
-            registry_data=pypi_record,
-            license_data=license_content,
+
+def _make_license_lookup_key(
+    owner: str, repo: str, name: str, version: str
+) -> tuple[str, ...]:
+    """Make key to share a license data lookup among packages.
+
+    Packages of the same repository share the lookup, unless license data is read
+    at their own release tags.
+    """
+    # Names of GitHub repositories are case insensitive
+    key = (owner.lower(), repo.lower())
+    if SETTINGS.pin_release_ref:
+        return (*key, *_make_pypi_cache_key(name, version))
+    return key
+
+
+class _LicenseLookups:
+    """License data lookups de-duplicated per source repository.
+
+    License files in a wheel of the release are read first if available, since
+    they are exactly the ones shipped with the version and reading them consumes
+    no GitHub API rate limit. Otherwise the source repository is looked up, and
+    then the source distribution is scanned as the last resort.
+
+    Many packages are developed in the same repository (e.g. `azure-*`), so
+    lookups are coalesced by normalized owner and repository name; the first
+    request starts fetching and the others share the same future. Only the
+    license of the repository is shared; if GitHub detected none, the source tree
+    is searched for each package.
+    """
+
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        # GraphQL queries read license data only in the default branch
+        self.batcher = (
+            GitHubLicenseBatcher(executor)
+            if use_github_graphql() and not SETTINGS.pin_release_ref
+            else None
         )
-        for ((name, version), pypi_record), license_content in zip(
-            pypi_records.items(),
-            license_contents,
+        self._futures: dict[tuple[str, ...], Future[_RepositoryLicenseData]] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        name: str,
+        version: str,
+        package_data: PyPIRelease,
+        repos_url: Optional[str],
+    ) -> "Future[_LicenseData]":
+        lookups: list[Callable[[], Future[_LicenseData]]] = []
+        if SETTINGS.use_distribution_license and select_wheel(package_data):
+            lookups.append(
+                lambda: self.executor.submit(
+                    _get_license_info_from_wheel, name, version, package_data
+                )
+            )
+        lookups.append(lambda: self._submit_repository_lookup(name, version, repos_url))
+        if SETTINGS.use_distribution_license and select_sdist(package_data):
+            lookups.append(
+                lambda: self.executor.submit(
+                    _get_license_info_from_sdist, name, version, package_data
+                )
+            )
+        if len(lookups) == 1:
+            return lookups[0]()
+
+        result: Future[_LicenseData] = Future()
+        self._run_until_found(lookups, None, result)
+        return result
+
+    def _run_until_found(
+        self,
+        lookups: list[Callable[[], "Future[_LicenseData]"]],
+        fallback: _LicenseData,
+        result: "Future[_LicenseData]",
+    ) -> None:
+        def on_done(future: "Future[_LicenseData]") -> None:
+            if (ex := future.exception()) is not None:
+                result.set_exception(ex)
+                return
+            license_data = _prefer(fallback, future.result())
+            if _has_license_file(license_data) or len(lookups) == 1:
+                result.set_result(license_data)
+            else:
+                self._run_until_found(lookups[1:], license_data, result)
+
+        lookups[0]().add_done_callback(on_done)
+
+    def _submit_repository_lookup(
+        self, name: str, version: str, repos_url: Optional[str]
+    ) -> "Future[_LicenseData]":
+        owner, repo = (
+            _get_owner_and_repo_from_url(repos_url)
+            if repos_url is not None
+            else (None, None)
         )
-    ]
+        if repos_url is None or owner is None or repo is None:
+            return self.executor.submit(_get_license_info, name, version, repos_url)
+
+        key = _make_license_lookup_key(owner, repo, name, version)
+        with self._lock:
+            if (future := self._futures.get(key)) is not None:
+                _logger.debug(
+                    "Sharing license data lookup of %s/%s with %s %s",
+                    owner,
+                    repo,
+                    name,
+                    version,
+                )
+            elif self.batcher is not None and not has_cached_license_data(owner, repo):
+                # Cached data can be revalidated without consuming rate limit
+                # so query only the others in batches.
+                future = self._query_or_fallback(name, version, owner, repo, repos_url)
+                self._futures[key] = future
+            else:
+                future = self.executor.submit(
+                    _get_repository_license_info, name, version, repos_url
+                )
+                self._futures[key] = future
+        return self._search_source_tree(future, name, version, repos_url)
+
+    def _search_source_tree(
+        self,
+        shared: "Future[_RepositoryLicenseData]",
+        name: str,
+        version: str,
+        repos_url: str,
+    ) -> "Future[_LicenseData]":
+        result: Future[_LicenseData] = Future()
+
+        def on_search_done(future: "Future[_LicenseData]") -> None:
+            if (ex := future.exception()) is not None:
+                result.set_exception(ex)
+            else:
+                result.set_result(future.result())
+
+        def on_shared_done(future: "Future[_RepositoryLicenseData]") -> None:
+            if (ex := future.exception()) is not None:
+                result.set_exception(ex)
+            elif isinstance(found := future.result(), _SearchSourceTree):
+                search: Future[_LicenseData] = self.executor.submit(
+                    _find_license_in_source_tree, name, version, repos_url, found.ref
+                )
+                search.add_done_callback(on_search_done)
+            else:
+                result.set_result(found)
+
+        shared.add_done_callback(on_shared_done)
+        return result
+
+    def _query_or_fallback(
+        self, name: str, version: str, owner: str, repo: str, repos_url: str
+    ) -> "Future[_RepositoryLicenseData]":
+        assert self.batcher is not None
+        result: Future[_RepositoryLicenseData] = Future()
+
+        def on_fallback_done(future: "Future[_RepositoryLicenseData]") -> None:
+            if (ex := future.exception()) is not None:
+                result.set_exception(ex)
+            else:
+                result.set_result(future.result())
+
+        def on_query_done(future: "Future[Optional[GitHubLicenseContent]]") -> None:
+            if (license_content := future.result()) is not None:
+                result.set_result(license_content)
+                return
+
+            # Fall back to REST API
+            fallback = self.executor.submit(
+                _get_repository_license_info, name, version, repos_url
+            )
+            fallback.add_done_callback(on_fallback_done)
+
+        self.batcher.submit(owner, repo).add_done_callback(on_query_done)
+        return result
+
+
+def read_pinned_requirements(input_file: TextIO) -> list[tuple[str, str]]:
+    """Read pairs of package name and pinned version from requirements.txt."""
+    name_and_version_tuples = []
+    for requirement in _read_requirements_txt(input_file):
+        if len(requirement.specifier) != 1:
+            msg = (
+                f"Version specifier must be in form of 'name==version': {requirement!s}"
+            )
+            raise VersionSpecifierError(msg)
+
+        specifier = list(requirement.specifier)[0]
+        if specifier.operator != "==":
+            msg = f"Version specifier's operator must be `==`: {requirement!s}"
+            raise VersionSpecifierError(msg)
+
+        name_and_version_tuples.append((requirement.name, specifier.version))
+    return name_and_version_tuples
 
 
 def _read_requirements_txt(f: TextIO) -> list[Requirement]:
     requirements = []
-    for specifier in f:
-        # Skip comments and pip options
-        if specifier.startswith("#"):
+    for line in f:
+        specifier = line.strip()
+
+        # Skip blank lines, comments and pip options
+        if not specifier or specifier.startswith("#"):
             continue
         if specifier.startswith("-"):
             _logger.warning("Ignored pip option: %s", specifier)
@@ -123,7 +442,17 @@ def _read_requirements_txt(f: TextIO) -> list[Requirement]:
     return requirements
 
 
-def _guess_repository_url(package_data: PyPIPackage) -> Optional[str]:
+def _resolve_repository_url(
+    name: str, version: str, package_data: PyPIRelease
+) -> Optional[str]:
+    repo_url = _guess_repository_url(package_data)
+    _logger.debug(
+        "Resolved source repository URL for %s %s as %s", name, version, repo_url
+    )
+    return repo_url
+
+
+def _guess_repository_url(package_data: PyPIRelease) -> Optional[str]:
     if package_data.info.project_urls is None:
         return None
 
@@ -145,23 +474,130 @@ def _guess_repository_url(package_data: PyPIPackage) -> Optional[str]:
     return None
 
 
-def _get_pypi_package_data(
-    name: str, version: str
-) -> tuple[str, str, requests.Response]:
-    url = f"https://pypi.org/pypi/{name}/{version}/json"
+def _get_pypi_package_data(name: str, version: str) -> tuple[str, str, Optional[bytes]]:
+    if (content := _get_cached_pypi_package_data(name, version)) is not None:
+        return name, version, content
+
+    url = _make_pypi_package_data_url(name, version)
     _logger.debug("GET %s", url)
-    return name, version, requests.get(url, timeout=SETTINGS.timeout)
+    with endpoint("pypi"):
+        resp = get_session().get(url, timeout=SETTINGS.timeout)
+    content = _handle_pypi_package_data_response(
+        name, version, url, resp.status_code, resp.content
+    )
+    return name, version, content
+
+
+def _make_pypi_package_data_url(name: str, version: str) -> str:
+    return f"{SETTINGS.pypi_url}/pypi/{name}/{version}/json"
+
+
+def _get_cached_pypi_package_data(name: str, version: str) -> Optional[bytes]:
+    # Release metadata of a specific version never changes so it can be cached
+    # permanently, keyed by normalized name and version.
+    cache = get_cache()
+    if cache is None:
+        return None
+    content = cache.get("pypi", *_make_pypi_cache_key(name, version))
+    if content is not None:
+        _logger.debug("Cache hit: %s %s", name, version)
+    return content
+
+
+def _handle_pypi_package_data_response(
+    name: str, version: str, url: str, status_code: int, content: bytes
+) -> Optional[bytes]:
+    if status_code != 200:
+        _logger.debug("Got status code %d from %s", status_code, url)
+        return None
+
+    if (cache := get_cache()) is not None:
+        cache.put("pypi", *_make_pypi_cache_key(name, version), data=content)
+    return content
+
+
+def _make_pypi_cache_key(name: str, version: str) -> tuple[str, str]:
+    try:
+        normalized_version = str(Version(version))
+    except InvalidVersion:
+        # Not a version of a release, e.g. `1.0.*`, which is not found on PyPI
+        normalized_version = version
+    return canonicalize_name(name), normalized_version
+
+
+def _has_license_file(license_data: _LicenseData) -> bool:
+    if isinstance(license_data, DistributionLicenseContent):
+        return bool(license_data.license_files)
+    return isinstance(license_data, GitHubLicenseContent)
+
+
+def _prefer(fallback: _LicenseData, license_data: _LicenseData) -> _LicenseData:
+    """Choose license data from the result of the previous lookups and a new one.
+
+    The new one is chosen if it has a license file. Otherwise the first one found
+    is kept (e.g. license name declared in the wheel metadata), except that a
+    failure takes precedence so that it is retried.
+    """
+    if (
+        _has_license_file(license_data)
+        or fallback is None
+        or isinstance(license_data, LicenseContentFailed)
+    ):
+        return license_data
+    return fallback
+
+
+def _get_license_info_from_sdist(
+    name: str, version: str, package_data: PyPIRelease
+) -> Optional[DistributionLicenseContent]:
+    try:
+        return get_license_data_from_sdist(package_data)
+    except Exception:
+        _logger.warning(
+            "Failed to read license file from sdist. package=%s version=%s",
+            name,
+            version,
+            exc_info=True,
+        )
+        return None
+
+
+def _get_license_info_from_wheel(
+    name: str, version: str, package_data: PyPIRelease
+) -> Optional[DistributionLicenseContent]:
+    try:
+        return get_license_data_from_wheel(package_data)
+    except Exception:
+        _logger.warning(
+            "Failed to read license data from distribution. package=%s version=%s",
+            name,
+            version,
+            exc_info=True,
+        )
+        return None
 
 
 def _get_license_info(
     name: str, version: str, repos_url: Optional[str]
-) -> Optional[Union[GitHubLicenseContent, LicenseContentFailed]]:
+) -> _LicenseData:
     if repos_url is None:
         return None
+    license_data = _get_repository_license_info(name, version, repos_url)
+    if isinstance(license_data, _SearchSourceTree):
+        return _find_license_in_source_tree(name, version, repos_url, license_data.ref)
+    return license_data
+
 
+def _get_repository_license_info(
+    name: str, version: str, repos_url: str
+) -> _RepositoryLicenseData:
     # Try getting license data from GitHub
+    ref = None
     try:
-        if (license_content := get_license_data_from_github(repos_url)) is not None:
+        if SETTINGS.pin_release_ref:
+            ref = resolve_release_ref(repos_url, name, version)
+        license_content = get_license_data_from_github(repos_url, ref)
+        if license_content is not None:
             return license_content
     except ApiRateLimitError:
         _logger.error(
@@ -173,29 +609,7 @@ def _get_license_info(
     except LicenseDataUnavailableError:
         # Unusual license filename or actually no license information provided.
         _logger.debug("License data not found. package=%s version=%s", name, version)
-        try:
-            # Try searching for a license file in its source tree
-            tree_data = get_file_list_from_github(repos_url)
-            if tree_data is not None:
-                scored_file_paths = sorted(
-                    [
-                        (score, item.path, item.url)
-                        for item in tree_data.tree
-                        if item.path is not None and item.type == "blob"
-                        if (score := _license_file_likelihood(item.path)) >= 0
-                    ]
-                )
-                if len(scored_file_paths) > 0:
-                    _, _, url = scored_file_paths[0]
-                    # TODO: Fetch the URL and parse response in form {sha, node_id, size, url, content, encoding}
-                    _logger.critical("### url=%s", url)
-        except Exception:
-            _logger.warning(
-                "Failed to get file list. package=%s version=%s repos_url=%s",
-                name,
-                version,
-                repos_url,
-            )
+        return _SearchSourceTree(ref.tag_name if ref is not None else None)
 
     _logger.warning(
         "Unsupported source repository. package=%s, version=%s, repos_url=%s",
@@ -207,21 +621,37 @@ def _get_license_info(
     return None
 
 
-def _license_file_likelihood(name: str) -> int:
-    license_filenames = [
-        "LICENSE",
-        "LICENSE.md",
-        "LICENSE.txt",
-        "LICENSE.rst",
-        "COPYING",
-        "COPYING.md",
-        "COPYING.txt",
-        "COPYING.rst",
-    ]
-
-    path = Path(name)
+def _find_license_in_source_tree(
+    name: str, version: str, repos_url: str, ref: Optional[str] = None
+) -> Optional[Union[GitHubLicenseContent, LicenseContentFailed]]:
+    # Directory of the package in a monorepo is often named after it
+    canonical_name = canonicalize_name(name)
+    hints = (name, canonical_name, canonical_name.replace("-", "_"))
+    try:
+        license_content = find_license_file_in_github(repos_url, hints, ref)
+    except ApiRateLimitError:
+        _logger.error(
+            "Hit GitHub API rate limit on searching license file. package=%s version=%s",
+            name,
+            version,
+        )
+        return LicenseContentFailed()
+    except Exception:
+        _logger.warning(
+            "Failed to search license file. package=%s version=%s repos_url=%s",
+            name,
+            version,
+            repos_url,
+            exc_info=True,
+        )
+        return None
 
-    for i, s in enumerate(license_filenames):
-        if s.lower() == path.name.lower():
-            return (i + 1) + len(path.parts) * 1000
-    return -1
+    if license_content is None:
+        _logger.warning(
+            "License file not found in source repository."
+            " package=%s, version=%s, repos_url=%s",
+            name,
+            version,
+            repos_url,
+        )
+    return license_content
@@ -0,0 +1,272 @@
+"""Asynchronous variants of functions related to PyPI package registry.
+
+This module requires optional dependency `httpx`.
+"""
+
+import asyncio
+import logging
+from collections.abc import Sequence
+from time import monotonic
+from typing import Optional, TextIO
+
+from dlc.async_session import AsyncSession
+from dlc.exceptions import ApiRateLimitError, LicenseDataUnavailableError
+from dlc.metrics import endpoint
+from dlc.models.common import LicenseContentFailed, Package
+from dlc.models.pypi import DistributionLicenseContent, PyPIRelease
+from dlc.registries.distribution import (
+    _get_cached,
+    _put_cached,
+    _Response,
+    read_wheel_license,
+    select_sdist,
+    select_wheel,
+)
+from dlc.registries.pypi import (
+    _find_license_in_source_tree,
+    _get_cached_pypi_package_data,
+    _get_license_info_from_sdist,
+    _get_repository_license_info,
+    _handle_pypi_package_data_response,
+    _has_license_file,
+    _LicenseData,
+    _make_license_lookup_key,
+    _make_pypi_package_data_url,
+    _prefer,
+    _prefetch_license_file,
+    _RepositoryLicenseData,
+    _resolve_repository_url,
+    _SearchSourceTree,
+    read_pinned_requirements,
+    reuse_previous_results,
+)
+from dlc.repositories.github import _get_owner_and_repo_from_url
+from dlc.repositories.github_async import aget_license_data_from_github
+from dlc.settings import SETTINGS
+from dlc.spill import SpillFile
+
+_logger = logging.getLogger(__name__)
+
+
+async def collect_package_metadata_async(
+    input_file: TextIO,
+    previous: Optional[Sequence[Package]] = None,
+) -> list[Package]:
+    """Collect package metadata and license data using asyncio.
+
+    Unlike `collect_package_metadata`, all requests are sent from a single thread
+    and number of in-flight requests is limited only per host
+    (`SETTINGS.max_connections_per_host`).
+    """
+    name_and_version_tuples = read_pinned_requirements(input_file)
+    reused = reuse_previous_results(name_and_version_tuples, previous or [])
+    targets = [
+        name_and_version
+        for i, name_and_version in enumerate(name_and_version_tuples)
+        if i not in reused
+    ]
+    _logger.info(
+        "Start collecting license data of %d package(s) from PyPI.", len(targets)
+    )
+    _logger.debug("Target packages: %s", targets)
+
+    t0 = monotonic()
+    license_lookups: dict[tuple[str, ...], asyncio.Task[_RepositoryLicenseData]] = {}
+    spill = SpillFile()
+    async with AsyncSession() as session:
+        collected = iter(
+            await asyncio.gather(
+                *[
+                    _collect_one(session, license_lookups, spill, name, version)
+                    for name, version in targets
+                ]
+            )
+        )
+    elapsed_seconds = monotonic() - t0
+    _logger.info("Fetched in %.3g seconds.", elapsed_seconds)
+
+    # Merge the results keeping the order of the input
+    packages = [
+        reused[i] if i in reused else next(collected)
+        for i in range(len(name_and_version_tuples))
+    ]
+    return [package for package in packages if package is not None]
+
+
+async def _collect_one(
+    session: AsyncSession,
+    license_lookups: dict[tuple[str, ...], "asyncio.Task[_RepositoryLicenseData]"],
+    spill: SpillFile,
+    name: str,
+    version: str,
+) -> Optional[Package]:
+    content = await _aget_pypi_package_data(session, name, version)
+    if content is None:
+        _logger.warning("Failed to get package data for %s %s", name, version)
+        return None
+
+    package_data = PyPIRelease.model_validate_json(content)
+    package_data._raw_content = await asyncio.to_thread(spill.append, content)
+    repos_url = _resolve_repository_url(name, version, package_data)
+
+    # Same order of lookups as `_LicenseLookups`
+    license_data: _LicenseData = None
+    if SETTINGS.use_distribution_license and select_wheel(package_data):
+        license_data = await _aget_license_info_from_wheel(
+            session, name, version, package_data
+        )
+    if not _has_license_file(license_data):
+        license_data = _prefer(
+            license_data,
+            await _aget_shared_license_info(
+                session, license_lookups, name, version, repos_url
+            ),
+        )
+    if (
+        not _has_license_file(license_data)
+        and SETTINGS.use_distribution_license
+        and select_sdist(package_data)
+    ):
+        # Streaming a tar archive is rarely needed; run the blocking implementation
+        license_data = _prefer(
+            license_data,
+            await asyncio.to_thread(
+                _get_license_info_from_sdist, name, version, package_data
+            ),
+        )
+    package = Package(
+        name=name,
+        version=version,
+        registry_data=package_data,
+        license_data=license_data,
+    )
+    if package.license_file_url is not None:
+        # Download license file now rather than on writing the report
+        await asyncio.to_thread(_prefetch_license_file, package)
+    return package
+
+
+async def _aget_shared_license_info(
+    session: AsyncSession,
+    license_lookups: dict[tuple[str, ...], "asyncio.Task[_RepositoryLicenseData]"],
+    name: str,
+    version: str,
+    repos_url: Optional[str],
+) -> _LicenseData:
+    if repos_url is None:
+        return None
+
+    # Share a lookup of the repository license among packages developed in the
+    # same repository, but search the source tree for each of them
+    owner, repo = _get_owner_and_repo_from_url(repos_url)
+    if owner is None or repo is None:
+        license_data = await _aget_repository_license_info(
+            session, name, version, repos_url
+        )
+    else:
+        key = _make_license_lookup_key(owner, repo, name, version)
+        task = license_lookups.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                _aget_repository_license_info(session, name, version, repos_url)
+            )
+            license_lookups[key] = task
+        license_data = await task
+
+    if isinstance(license_data, _SearchSourceTree):
+        # Searching source tree is rarely needed; run the blocking implementation
+        return await asyncio.to_thread(
+            _find_license_in_source_tree, name, version, repos_url, license_data.ref
+        )
+    return license_data
+
+
+async def _aget_license_info_from_wheel(
+    session: AsyncSession, name: str, version: str, package_data: PyPIRelease
+) -> Optional[DistributionLicenseContent]:
+    file = select_wheel(package_data)
+    if file is None:
+        return None
+    # Disk I/O of the cache runs in a worker thread not to block the event loop
+    if (cached := await asyncio.to_thread(_get_cached, file)) is not None:
+        return cached[0]
+
+    reader = read_wheel_license(file)
+    try:
+        request = next(reader)
+        while True:
+            _logger.debug("GET %s %s", request.url, request.headers.get("Range", ""))
+            with endpoint("distribution"):
+                resp = await session.get(request.url, headers=request.headers)
+            request = reader.send(
+                _Response(resp.status_code, resp.headers, resp.content)
+            )
+    except StopIteration as stop:
+        license_content: Optional[DistributionLicenseContent] = stop.value
+    except Exception:
+        _logger.warning(
+            "Failed to read license data from distribution. package=%s version=%s",
+            name,
+            version,
+            exc_info=True,
+        )
+        return None
+    await asyncio.to_thread(_put_cached, file, license_content)
+    return license_content
+
+
+async def _aget_pypi_package_data(
+    session: AsyncSession, name: str, version: str
+) -> Optional[bytes]:
+    content = await asyncio.to_thread(_get_cached_pypi_package_data, name, version)
+    if content is not None:
+        return content
+
+    url = _make_pypi_package_data_url(name, version)
+    _logger.debug("GET %s", url)
+    with endpoint("pypi"):
+        resp = await session.get(url)
+    return await asyncio.to_thread(
+        _handle_pypi_package_data_response,
+        name,
+        version,
+        url,
+        resp.status_code,
+        resp.content,
+    )
+
+
+async def _aget_repository_license_info(
+    session: AsyncSession, name: str, version: str, repos_url: str
+) -> _RepositoryLicenseData:
+    if SETTINGS.pin_release_ref:
+        # Resolving release tags needs a few sequential requests per package;
+        # run the blocking implementation
+        return await asyncio.to_thread(
+            _get_repository_license_info, name, version, repos_url
+        )
+
+    # Try getting license data from GitHub
+    try:
+        license_content = await aget_license_data_from_github(session, repos_url)
+        if license_content is not None:
+            return license_content
+    except ApiRateLimitError:
+        _logger.error(
+            "Hit GitHub API rate limit on fetching license data. package=%s version=%s",
+            name,
+            version,
+        )
+        return LicenseContentFailed()
+    except LicenseDataUnavailableError:
+        _logger.debug("License data not found. package=%s version=%s", name, version)
+        return _SearchSourceTree(None)
+
+    _logger.warning(
+        "Unsupported source repository. package=%s, version=%s, repos_url=%s",
+        name,
+        version,
+        repos_url,
+    )
+
+    return None
@@ -0,0 +1,168 @@
+"""Destinations to write report files to."""
+
+import io
+import logging
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import IO, Literal, Optional
+
+from typing_extensions import TypeAlias
+
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+ArchiveFormat: TypeAlias = Literal["zip", "tar.gz"]
+ARCHIVE_BASENAME = "report"
+
+
+class ReportOutput(ABC):
+    """Base class of destinations of report files.
+
+    Files are identified by POSIX style paths relative to the report root.
+    """
+
+    @abstractmethod
+    def write(self, name: str, data: bytes) -> None:
+        """Write a whole file. It may complete later in background."""
+
+    @abstractmethod
+    def open(self, name: str) -> AbstractContextManager[IO[bytes]]:
+        """Open a file to write its content incrementally."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Finish writing all files."""
+
+
+class DirectoryOutput(ReportOutput):
+    """Writes report files into a directory, spreading writes over an executor."""
+
+    def __init__(self, directory: Path, executor: Executor) -> None:
+        self.directory = directory
+        self.executor = executor
+        self._futures: list[Future] = []
+        self._created_dirs: set[Path] = set()
+        self._lock = threading.Lock()
+
+    def write(self, name: str, data: bytes) -> None:
+        path = self._prepare(name)
+        self._futures.append(self.executor.submit(self._write, path, data))
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[IO[bytes]]:
+        path = self._prepare(name)
+        with path.open("wb") as f:
+            yield f
+        _logger.debug("Wrote %s.", path)
+
+    def close(self) -> None:
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def _prepare(self, name: str) -> Path:
+        path = self.directory.joinpath(name)
+        with self._lock:
+            if path.parent not in self._created_dirs:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._created_dirs.add(path.parent)
+        return path
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> None:
+        path.write_bytes(data)
+        _logger.debug("Wrote %s.", path)
+
+
+class ZipOutput(ReportOutput):
+    """Writes report files into a single zip archive."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._zipfile = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, name: str, data: bytes) -> None:
+        self._zipfile.writestr(name, data)
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[IO[bytes]]:
+        with self._zipfile.open(name, "w") as f:
+            yield f
+
+    def close(self) -> None:
+        self._zipfile.close()
+        _logger.debug("Wrote %s.", self.path)
+
+
+class TarOutput(ReportOutput):
+    """Writes report files into a single gzip-compressed tar archive."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._tarfile = tarfile.open(path, "w:gz")  # noqa: SIM115
+
+    def write(self, name: str, data: bytes) -> None:
+        self._add(name, io.BytesIO(data), len(data))
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[IO[bytes]]:
+        # Size of a member must be known before adding it to a tar archive
+        with SpooledTemporaryFile(max_size=16 * 1024 * 1024) as f:
+            yield f  # type: ignore[misc]
+            size = f.tell()
+            f.seek(0)
+            self._add(name, f, size)  # type: ignore[arg-type]
+
+    def close(self) -> None:
+        self._tarfile.close()
+        _logger.debug("Wrote %s.", self.path)
+
+    def _add(self, name: str, fileobj: IO[bytes], size: int) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(time.time())
+        self._tarfile.addfile(info, fileobj)
+
+
+def get_archive_path(outdir: Path, archive: ArchiveFormat) -> Path:
+    """Get path of the archive to write a report into."""
+    return outdir.joinpath(f"{ARCHIVE_BASENAME}.{archive}")
+
+
+@contextmanager
+def open_output(
+    outdir: Path,
+    archive: Optional[ArchiveFormat] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[ReportOutput]:
+    """Open destination of report files.
+
+    If `archive` is given, all files are written into a single archive file in
+    `outdir`. Otherwise they are written into `outdir` using `executor`, or a
+    thread pool created for this if it is omitted.
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    with ExitStack() as stack:
+        output: ReportOutput
+        if archive == "zip":
+            output = ZipOutput(get_archive_path(outdir, archive))
+        elif archive == "tar.gz":
+            output = TarOutput(get_archive_path(outdir, archive))
+        else:
+            if executor is None:
+                executor = stack.enter_context(ThreadPoolExecutor(SETTINGS.max_workers))
+            output = DirectoryOutput(outdir, executor)
+
+        try:
+            yield output
+        finally:
+            output.close()
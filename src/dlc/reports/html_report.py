@@ -1,47 +1,154 @@
+import json
 import logging
+from collections.abc import Sequence
+from concurrent.futures import Executor
+from typing import Any, NamedTuple, Optional
 
 from jinja2 import Environment, PackageLoader
 
+from dlc.models.common import Package
 from dlc.reports import _license_files
+from dlc.reports._output import ArchiveFormat, ReportOutput, open_output
+from dlc.reports.license_jsonl import write_license_jsonl
 from dlc.reports.report_params import ReportParams
 
 _logger = logging.getLogger(__name__)
 
+SEARCH_INDEX_FILENAME = "search_index.js"
 
-def write_html_report(params: ReportParams) -> None:
-    params.outdir.mkdir(parents=True, exist_ok=True)
 
+class _PackageRow(NamedTuple):
+    """Data of a package shown in the license list."""
+
+    name: str
+    version: str
+    license_name: Optional[str]
+    has_license_file: bool
+    home_page: Optional[str]
+    project_url: Optional[str]
+
+    @classmethod
+    def of(cls, package: Package) -> "_PackageRow":
+        info = package.registry_data.info if package.registry_data else None
+        return cls(
+            name=package.name,
+            version=package.version,
+            license_name=package.license_name,
+            has_license_file=package.license_file is not None,
+            home_page=info.home_page if info else None,
+            project_url=info.project_url if info else None,
+        )
+
+
+def write_html_report(
+    params: ReportParams,
+    *,
+    archive: Optional[ArchiveFormat] = None,
+    executor: Optional[Executor] = None,
+    page_size: Optional[int] = None,
+    output: Optional[ReportOutput] = None,
+) -> None:
+    """Write HTML report and related files.
+
+    Files are written into `params.outdir` in parallel on `executor`, or into a
+    single archive file in it if `archive` is given. They are written into
+    `output` instead if it is given, so that callers can add other files to the
+    same destination. If `page_size` is given, the license list is split into
+    pages of that number of packages, and a search index of all packages is
+    written for client-side search.
+    """
+    if output is not None:
+        _write_report_files(params, output, page_size)
+        return
+    with open_output(params.outdir, archive, executor) as new_output:
+        _write_report_files(params, new_output, page_size)
+
+
+def _write_report_files(
+    params: ReportParams, output: ReportOutput, page_size: Optional[int]
+) -> None:
+    _write_index_html(params, output, page_size)
+    _license_files.generate(params, output)
+    _write_registry_data(params, output)
+
+    # Generate machine readable license data in a single file
+    write_license_jsonl(params.packages, output)
+
+
+def _write_index_html(
+    params: ReportParams, output: ReportOutput, page_size: Optional[int]
+) -> None:
     environment = Environment(loader=PackageLoader("dlc"), autoescape=True)
     template = environment.get_template("index.html")
-    rendered = template.render(**params.model_dump())
-    params.outdir.joinpath("index.html").write_text(rendered, encoding="utf-8")
 
-    _license_files.generate(params)
+    # Pass only what the template uses rather than dumping all package data, and
+    # stream rendered text to the file rather than building it in memory.
+    packages = params.packages
+    if page_size is None:
+        pages: list[Sequence[Package]] = [packages]
+    else:
+        pages = [
+            packages[i : i + page_size] for i in range(0, len(packages), page_size)
+        ] or [[]]
+    page_filenames = [_make_page_filename(n) for n in range(len(pages))]
+    context: dict[str, Any] = {
+        "dlc": params.dlc,
+        "target_name": params.target_name,
+        "language": params.language,
+        "start_time": params.start_time,
+        "input_source": params.input_source,
+        "num_packages": len(packages),
+        "num_failures": params.num_failures,
+        "page_filenames": page_filenames,
+        "search_index": page_size is not None,
+    }
+    for n, page_packages in enumerate(pages):
+        stream = template.stream(
+            context,
+            page=n,
+            row_offset=n * (page_size or 0),
+            packages=(_PackageRow.of(package) for package in page_packages),
+        )
+        stream.enable_buffering(100)
+        with output.open(page_filenames[n]) as f:
+            stream.dump(f, encoding="utf-8")  # type: ignore[arg-type]
+        _logger.info("Wrote %s.", page_filenames[n])
 
-    # Generate raw API response from package registry
-    outdir = params.outdir.joinpath("registry_data")
-    outdir.mkdir(parents=True, exist_ok=True)
-    for package in params.packages:
-        if package.registry_data is not None:
-            filepath = outdir.joinpath(package.name).with_suffix(".json")
-            filepath.write_text(
-                package.registry_data.model_dump_json(indent=2), encoding="utf-8"
-            )
-            _logger.debug("Wrote %s.", filepath)
-
-    # Generate raw API response
-    outdir = params.outdir.joinpath("registry_data")
-    outdir.mkdir(parents=True, exist_ok=True)
-    for package in params.packages:
-        if package.registry_data is not None:
-            filepath = outdir.joinpath(package.name).with_suffix(".json")
-            filepath.write_text(
-                package.registry_data.model_dump_json(indent=2), encoding="utf-8"
-            )
-            _logger.debug("Wrote %s.", filepath)
+    if page_size is not None:
+        output.write(
+            SEARCH_INDEX_FILENAME,
+            _make_search_index(packages, page_size, page_filenames),
+        )
 
-    # Generate machine readable license data in a single file
-    filepath = params.outdir.joinpath("license.jsonl")
-    with filepath.open("wt", encoding="utf-8") as f:
-        f.writelines([pkg.model_dump_json() + "\n" for pkg in params.packages])
-    _logger.info("Wrote %s.", filepath)
+
+def _make_page_filename(n: int) -> str:
+    return "index.html" if n == 0 else f"index-{n + 1}.html"
+
+
+def _make_search_index(
+    packages: Sequence[Package], page_size: int, page_filenames: Sequence[str]
+) -> bytes:
+    # A script rather than a JSON file so that it can be loaded from file:// URL
+    index = {
+        "pages": page_filenames,
+        "packages": [
+            [package.name, package.version, package.license_name, i // page_size]
+            for i, package in enumerate(packages)
+        ],
+    }
+    data = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+    return f"var DLC_SEARCH_INDEX = {data};\n".encode()
+
+
+def _write_registry_data(params: ReportParams, output: ReportOutput) -> None:
+    # Write raw API response from package registry as is if it was kept while
+    # collecting. Otherwise write the subset of it which was kept in memory.
+    for package in params.packages:
+        if package.registry_data is None:
+            continue
+        content = None
+        if (read_raw_content := package.registry_data._raw_content) is not None:
+            content = read_raw_content()
+        if content is None:
+            content = package.registry_data.model_dump_json(indent=2).encode("utf-8")
+        output.write(f"registry_data/{package.name}.json", content)
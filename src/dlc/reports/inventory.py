@@ -0,0 +1,50 @@
+import logging
+from collections.abc import Mapping, Sequence
+from typing import Optional
+
+from pydantic import BaseModel
+
+from dlc.models.common import Package
+from dlc.models.version import Version
+from dlc.registries.pypi import _make_pypi_cache_key
+from dlc.reports._output import ReportOutput
+
+_logger = logging.getLogger(__name__)
+
+INVENTORY_JSONL_FILENAME = "inventory.jsonl"
+
+
+class InventoryEntry(BaseModel):
+    """Package used by one or more projects, a line of `inventory.jsonl`."""
+
+    name: str
+    version: Version
+    license_name: Optional[str]
+    has_license_file: bool
+    projects: list[str]
+
+
+def write_inventory(
+    output: ReportOutput, packages_per_project: Mapping[str, Sequence[Package]]
+) -> None:
+    """Write `inventory.jsonl` listing unique packages and projects using them."""
+    entries: dict[tuple[str, str], InventoryEntry] = {}
+    for project, packages in packages_per_project.items():
+        for package in packages:
+            key = _make_pypi_cache_key(package.name, package.version)
+            if (entry := entries.get(key)) is None:
+                entry = entries[key] = InventoryEntry(
+                    name=package.name,
+                    version=package.version,
+                    license_name=package.license_name,
+                    has_license_file=package.license_file is not None,
+                    projects=[],
+                )
+            if project not in entry.projects:
+                entry.projects.append(project)
+
+    with output.open(INVENTORY_JSONL_FILENAME) as f:
+        for key in sorted(entries):
+            f.write(entries[key].model_dump_json().encode("utf-8"))
+            f.write(b"\n")
+    _logger.info("Wrote %s of %d package(s).", INVENTORY_JSONL_FILENAME, len(entries))
@@ -0,0 +1,57 @@
+import io
+import logging
+import tarfile
+import zipfile
+from collections.abc import Iterable
+from pathlib import Path
+from typing import IO
+
+from dlc.models.common import Package
+from dlc.reports._output import ReportOutput, get_archive_path
+
+_logger = logging.getLogger(__name__)
+
+LICENSE_JSONL_FILENAME = "license.jsonl"
+
+
+def write_license_jsonl(packages: Iterable[Package], output: ReportOutput) -> None:
+    """Write package data into `license.jsonl`, one package per line."""
+    with output.open(LICENSE_JSONL_FILENAME) as f:
+        for package in packages:
+            f.write(package.model_dump_json().encode("utf-8"))
+            f.write(b"\n")
+    _logger.info("Wrote %s.", LICENSE_JSONL_FILENAME)
+
+
+def read_license_jsonl(outdir: Path) -> list[Package]:
+    """Read package data from `license.jsonl` in a report directory.
+
+    The file is also looked up in a report archive in the directory.
+    """
+    packages = []
+    with _open_license_jsonl(outdir) as f:
+        for line in f:
+            if line.strip():
+                packages.append(Package.model_validate_json(line))
+    _logger.info("Read %d package(s) from %s.", len(packages), outdir)
+    return packages
+
+
+def _open_license_jsonl(outdir: Path) -> IO[bytes]:
+    filepath = outdir.joinpath(LICENSE_JSONL_FILENAME)
+    if filepath.exists():
+        return filepath.open("rb")
+
+    zip_path = get_archive_path(outdir, "zip")
+    if zip_path.exists():
+        with zipfile.ZipFile(zip_path) as zf:
+            return io.BytesIO(zf.read(LICENSE_JSONL_FILENAME))
+
+    tar_path = get_archive_path(outdir, "tar.gz")
+    if tar_path.exists():
+        with tarfile.open(tar_path, "r:gz") as tf:
+            member = tf.extractfile(LICENSE_JSONL_FILENAME)
+            if member is not None:
+                return io.BytesIO(member.read())
+
+    return filepath.open("rb")  # Raises FileNotFoundError
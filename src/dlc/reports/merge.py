@@ -0,0 +1,141 @@
+"""Merging reports of shards into one.
+
+A run with `--shard INDEX/COUNT` collects a slice of the packages and writes a
+report of them. `merge_shard_reports` reads the reports of all the shards so that
+a report of all the packages is written with `write_html_report`, without
+collecting the packages again.
+"""
+
+import logging
+import tarfile
+import zipfile
+from collections.abc import Iterable, Sequence
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Optional
+
+from typing_extensions import Self
+
+from dlc.models.common import Package
+from dlc.registries.pypi import _has_license_file, _make_pypi_cache_key
+from dlc.reports._output import get_archive_path
+from dlc.reports.license_jsonl import read_license_jsonl
+from dlc.spill import SpillFile
+
+_logger = logging.getLogger(__name__)
+
+
+class ShardReports:
+    """Files in reports of earlier runs, which are directories or archives."""
+
+    def __init__(self) -> None:
+        self._stack = ExitStack()
+        self._zipfiles: dict[Path, zipfile.ZipFile] = {}
+        self._tar_members: dict[Path, dict[str, bytes]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stack.close()
+
+    def read(self, outdir: Path, name: str) -> Optional[bytes]:
+        """Read a file in a report, or return None if it does not exist."""
+        if (zf := self._open_zip(outdir)) is not None:
+            try:
+                return zf.read(name)
+            except KeyError:
+                return None
+        if (members := self._read_tar(outdir)) is not None:
+            return members.get(name)
+        try:
+            return outdir.joinpath(name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _open_zip(self, outdir: Path) -> Optional[zipfile.ZipFile]:
+        if outdir not in self._zipfiles:
+            path = get_archive_path(outdir, "zip")
+            if outdir.joinpath("license.jsonl").exists() or not path.exists():
+                return None
+            self._zipfiles[outdir] = self._stack.enter_context(zipfile.ZipFile(path))
+        return self._zipfiles[outdir]
+
+    def _read_tar(self, outdir: Path) -> Optional[dict[str, bytes]]:
+        # Members of a compressed tar archive cannot be read randomly; read the
+        # ones which may be needed at once
+        if outdir not in self._tar_members:
+            path = get_archive_path(outdir, "tar.gz")
+            if outdir.joinpath("license.jsonl").exists() or not path.exists():
+                return None
+            members = self._tar_members[outdir] = {}
+            with tarfile.open(path, "r:gz") as tf:
+                for member in tf:
+                    if member.name.startswith(("registry_data/", "license_files/")):
+                        f = tf.extractfile(member)
+                        if f is not None:
+                            members[member.name] = f.read()
+        return self._tar_members[outdir]
+
+
+def read_report(outdir: Path) -> list[Package]:
+    """Read packages in a report, e.g. the previous one for `--incremental`."""
+    with ShardReports() as reports:
+        packages = read_license_jsonl(outdir)
+        keep_registry_data(reports, outdir, packages, SpillFile())
+    return packages
+
+
+def keep_registry_data(
+    reports: ShardReports, outdir: Path, packages: Iterable[Package], spill: SpillFile
+) -> None:
+    """Keep raw registry data of packages read from a report in `spill`.
+
+    It is written into a new report as is, even if the new one overwrites the
+    report it was read from.
+    """
+    for package in packages:
+        if package.registry_data is None:
+            continue
+        content = reports.read(outdir, f"registry_data/{package.name}.json")
+        if content is not None:
+            package.registry_data._raw_content = spill.append(content)
+
+
+def merge_shard_reports(
+    reports: ShardReports, outdirs: Sequence[Path]
+) -> list[Package]:
+    """Read packages in reports of shards.
+
+    Returns the packages sorted by name, together with their raw registry data
+    in the reports. If a package is in more than one report, the one with a
+    license file is used.
+    """
+    packages: dict[tuple[str, str], Package] = {}
+    origins: dict[tuple[str, str], Path] = {}
+    spill = SpillFile()
+    for outdir in outdirs:
+        for package in read_license_jsonl(outdir):
+            key = _make_pypi_cache_key(package.name, package.version)
+            other = packages.get(key)
+            if other is None or (
+                not _has_license_file(other.license_data)
+                and _has_license_file(package.license_data)
+            ):
+                packages[key] = package
+                origins[key] = outdir
+
+    for key, package in packages.items():
+        if (
+            package.license_file_url is not None
+            and package.downloaded_license_file is None
+        ):
+            # Use the license file downloaded by the shard rather than downloading
+            # it again, if it is not in `license.jsonl` of an older version
+            content = reports.read(origins[key], f"license_files/{package.name}.txt")
+            if content is not None:
+                package.downloaded_license_file = content
+        keep_registry_data(reports, origins[key], [package], spill)
+    _logger.info("Merged %d package(s) in %d report(s).", len(packages), len(outdirs))
+
+    return [packages[key] for key in sorted(packages)]
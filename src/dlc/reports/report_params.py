@@ -11,7 +11,9 @@ from dlc.models.common import InputFormat, Package
 
 class Dlc(BaseModel):
     version: str = Field(
-        default=importlib.metadata.version("dependency_license_collector")
+        default_factory=lambda: importlib.metadata.version(
+            "dependency_license_collector"
+        )
     )
 
 
@@ -32,7 +34,11 @@ class ReportParams(BaseModel):
     @computed_field  # type: ignore[prop-decorator]
     @property
     def language(self) -> str:
-        if self.input_format == "requirements_txt":
+        # Not `in` so that type checkers can narrow the type for `assert_never`
+        if (
+            self.input_format == "requirements_txt"  # noqa: PLR1714
+            or self.input_format == "installed"
+        ):
             return "Python"
         else:
             assert_never(self.input_format)
@@ -0,0 +1,108 @@
+"""Output of metrics of a run.
+
+`stats.json` is `RunStats` as is. `spans.json` is the HTTP requests as spans of
+a trace in the JSON encoding of OTLP (OpenTelemetry Protocol), which can be sent
+to an OpenTelemetry collector or loaded into tracing tools as is.
+"""
+
+import importlib.metadata
+import json
+import logging
+import secrets
+from collections.abc import Sequence
+from typing import Any, Union
+
+from dlc.metrics import RunStats, Span
+from dlc.reports._output import ReportOutput
+
+_logger = logging.getLogger(__name__)
+
+STATS_JSON_FILENAME = "stats.json"
+SPANS_JSON_FILENAME = "spans.json"
+
+# Values of enums in OTLP
+_SPAN_KIND_INTERNAL = 1
+_SPAN_KIND_CLIENT = 3
+_STATUS_CODE_ERROR = 2
+
+
+def write_stats_json(output: ReportOutput, stats: RunStats) -> None:
+    """Write `stats.json` of the statistics of a run."""
+    output.write(STATS_JSON_FILENAME, stats.model_dump_json(indent=2).encode())
+    _logger.info("Wrote %s.", STATS_JSON_FILENAME)
+
+
+def write_spans_json(
+    output: ReportOutput, name: str, stats: RunStats, spans: Sequence[Span]
+) -> None:
+    """Write `spans.json` of the requests in a run, as children of a span `name`."""
+    trace_id = secrets.token_hex(16)
+    root_id = secrets.token_hex(8)
+    start_ns = int(stats.started_at.timestamp() * 1e9)
+    otlp_spans = [
+        {
+            "traceId": trace_id,
+            "spanId": root_id,
+            "name": name,
+            "kind": _SPAN_KIND_INTERNAL,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(stats.duration * 1e9)),
+        }
+    ]
+    for span in spans:
+        attributes: dict[str, Union[str, int, None]] = {
+            "dlc.endpoint": span.endpoint,
+            "http.request.method": span.method,
+            "url.full": span.url,
+            "http.response.status_code": span.status,
+            "http.response.body.size": span.size,
+            "error.type": span.error,
+        }
+        otlp_span: dict[str, Any] = {
+            "traceId": trace_id,
+            "spanId": secrets.token_hex(8),
+            "parentSpanId": root_id,
+            "name": f"{span.method} {span.endpoint}",
+            "kind": _SPAN_KIND_CLIENT,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _make_attributes(attributes),
+        }
+        if span.error is not None or (span.status is not None and span.status >= 400):
+            otlp_span["status"] = {"code": _STATUS_CODE_ERROR}
+        otlp_spans.append(otlp_span)
+
+    version = importlib.metadata.version("dependency_license_collector")
+    content = {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _make_attributes({"service.name": "dlc"})},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "dlc", "version": version},
+                        "spans": otlp_spans,
+                    }
+                ],
+            }
+        ]
+    }
+    output.write(SPANS_JSON_FILENAME, json.dumps(content, indent=2).encode())
+    _logger.info("Wrote %s of %d span(s).", SPANS_JSON_FILENAME, len(otlp_spans))
+
+
+def _make_attributes(
+    attributes: dict[str, Union[str, int, None]],
+) -> list[dict[str, Any]]:
+    # 64-bit integers are encoded as strings in OTLP JSON
+    return [
+        {
+            "key": key,
+            "value": (
+                {"intValue": str(value)}
+                if isinstance(value, int)
+                else {"stringValue": value}
+            ),
+        }
+        for key, value in attributes.items()
+        if value is not None
+    ]
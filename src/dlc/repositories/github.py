@@ -1,93 +1,505 @@
+import json
 import logging
 import re
-from collections.abc import Sequence
-from typing import Optional, Union
+import threading
+import time
+from collections.abc import Callable, Hashable, Mapping, Sequence
+from concurrent.futures import Future
+from typing import Generic, Optional, TypeVar, Union
+from urllib.parse import quote
 
-import requests
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+from pydantic import TypeAdapter
 from tenacity import (
+    RetryCallState,
     before_sleep_log,
     retry,
     retry_if_exception_type,
     stop_after_attempt,
-    wait_exponential_jitter,
+    wait_none,
 )
 
+from dlc.cache import CachedResponse, get_cache
 from dlc.exceptions import (
     ApiRateLimitError,
     LicenseDataUnavailableError,
 )
-from dlc.models.github import GitHubGitTree, GitHubLicenseContent
+from dlc.metrics import METRICS, endpoint
+from dlc.models.github import (
+    GitHubGitRef,
+    GitHubGitTree,
+    GitHubLicenseContent,
+    GitHubLicenseSimple,
+    GitHubRepository,
+)
+from dlc.rate_limit import GITHUB_REST_RATE_LIMITER, is_rate_limited
+from dlc.session import get_session
 from dlc.settings import SETTINGS
 
 _logger = logging.getLogger(__name__)
+_git_refs_adapter = TypeAdapter(list[GitHubGitRef])
+_T = TypeVar("_T")
 _re_github_url = re.compile(r"https?://github.com/([^/]+)/([^/]+)")
 
+# Typical license file names in order of preference
+LICENSE_FILENAMES = (
+    "LICENSE",
+    "LICENSE.md",
+    "LICENSE.txt",
+    "LICENSE.rst",
+    "COPYING",
+    "COPYING.md",
+    "COPYING.txt",
+    "COPYING.rst",
+)
+_LICENSE_FILENAME_RANKS = {name.lower(): i for i, name in enumerate(LICENSE_FILENAMES)}
+
+# Names of directories which likely contain a license file, and limits of the
+# search for a license file in a source tree
+_LICENSE_DIRNAMES = ("licenses", "license", "legal", "python", "src")
+_MAX_TREE_LISTINGS = 4
+_MAX_TREE_DEPTH = 2
+
+# License data used by GitHub for license files of which license was not identified
+OTHER_LICENSE = GitHubLicenseSimple(
+    key="other",
+    name="Other",
+    url=None,
+    spdx_id="NOASSERTION",
+    node_id="MDc6TGljZW5zZTA=",
+)
+
+
+# Seconds to reuse results of shared calls after they completed. Packages of a
+# repository are usually collected within this period, and tags added later are
+# seen by the next run.
+_SHARED_RESULT_TTL = 60.0
+
+
+class _SharedCalls(Generic[_T]):
+    """Calls shared among threads by key.
+
+    A call made while another one with the same key is in flight waits for it and
+    gets its result, which is also reused for `_SHARED_RESULT_TTL` seconds after
+    it completed. Exceptions are not reused, so that the callers can retry.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, tuple[Future[_T], float]] = {}
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, fn: Callable[[], _T]) -> _T:
+        """Call `fn`, or get the result of the call shared by `key`."""
+        with self._lock:
+            now = time.monotonic()
+            # Forget expired results; completion time of calls in flight is inf
+            for k, (_, completed_at) in list(self._calls.items()):
+                if now - completed_at > _SHARED_RESULT_TTL:
+                    del self._calls[k]
+            entry = self._calls.get(key)
+            if entry is None:
+                future: Future[_T] = Future()
+                self._calls[key] = (future, float("inf"))
+        if entry is not None:
+            return entry[0].result()
+
+        try:
+            result = fn()
+        except BaseException as ex:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(ex)
+            raise
+        with self._lock:
+            self._calls[key] = (future, time.monotonic())
+        future.set_result(result)
+        return result
 
-@retry(  # Retries on API rate limit error with sleep duration: 4, 8, 16, 32, 64
+    def clear(self) -> None:
+        """Forget the completed calls."""
+        with self._lock:
+            for key, (future, _) in list(self._calls.items()):
+                if future.done():
+                    del self._calls[key]
+
+
+# Tag lists per repository, and license data per git object of a tag. Packages of
+# a monorepo are released at the same tags, or share the tag list at least.
+_tag_lists: _SharedCalls[list[GitHubGitRef]] = _SharedCalls()
+_licenses_at_ref: _SharedCalls[GitHubLicenseContent] = _SharedCalls()
+
+
+def _before_retry(kind: str) -> Callable[[RetryCallState], None]:
+    """Make a callback of tenacity which logs and records a retry."""
+    log = before_sleep_log(_logger, logging.DEBUG)
+
+    def before_sleep(retry_state: RetryCallState) -> None:
+        METRICS.record_retry(kind)
+        log(retry_state)
+
+    return before_sleep
+
+
+@retry(  # Retries on API rate limit error; the rate limiter decides how long to wait
     retry=retry_if_exception_type(ApiRateLimitError),
-    wait=wait_exponential_jitter(initial=4),
-    stop=stop_after_attempt(6),
-    before_sleep=before_sleep_log(_logger, logging.WARNING),
+    wait=wait_none(),
+    stop=stop_after_attempt(3),
+    before_sleep=_before_retry("github-license"),
     reraise=True,
 )
 def get_license_data_from_github(
-    repos_url: str,
+    repos_url: str, ref: Optional[GitHubGitRef] = None
 ) -> Optional[GitHubLicenseContent]:
+    """Get license data detected by GitHub.
+
+    License file at `ref` is read if given, or the one in the default branch
+    otherwise.
+    """
+    owner, repo = _get_owner_and_repo_from_url(repos_url)
+    if owner is None or repo is None:
+        return None  # Not GitHub
+    if ref is not None:
+        return _licenses_at_ref.call(
+            (owner, repo, ref.object.sha),
+            lambda: _get_license_data_at_ref(owner, repo, repos_url, ref),
+        )
+
+    url, headers, cached = _prepare_license_request(owner, repo)
+    GITHUB_REST_RATE_LIMITER.acquire()
+    _logger.debug("Fetching %s", url)
+    with endpoint("github-license"):
+        resp = get_session().get(url, headers=headers, timeout=SETTINGS.timeout)
+    return _handle_license_response(
+        owner,
+        repo,
+        repos_url,
+        status_code=resp.status_code,
+        headers=resp.headers,
+        content=resp.content,
+        cached=cached,
+    )
+
+
+def _get_license_data_at_ref(
+    owner: str, repo: str, repos_url: str, ref: GitHubGitRef
+) -> GitHubLicenseContent:
+    # Content of a git object never changes so license data at a tag can be
+    # cached permanently without revalidation. It is stored keyed by SHA of the
+    # license file so that tags of the same license file share the entry.
+    cache = get_cache()
+    if (
+        cache is not None
+        and (blob_sha := cache.get("github-license-ref", owner, repo, ref.object.sha))
+        and (content := cache.get("github-blob", owner, repo, blob_sha.decode()))
+    ):
+        _logger.debug("Cache hit: %s/%s %s", owner, repo, ref.ref)
+        return GitHubLicenseContent.model_validate_json(content)
+
+    url = f"{SETTINGS.github_api_url}/repos/{owner}/{repo}/license"
+    content = _get_from_github_api(
+        url, repos_url, params={"ref": ref.tag_name or ref.ref}
+    )
+    if content is None:
+        _logger.debug("No license detected: %s/%s %s", owner, repo, ref.ref)
+        raise LicenseDataUnavailableError(404, repos_url)
+
+    license_content = GitHubLicenseContent.model_validate_json(content)
+    if cache is not None and license_content.sha is not None:
+        cache.put("github-blob", owner, repo, license_content.sha, data=content)
+        cache.put(
+            "github-license-ref",
+            owner,
+            repo,
+            ref.object.sha,
+            data=license_content.sha.encode(),
+        )
+    return license_content
+
+
+@retry(  # Retries on API rate limit error; the rate limiter decides how long to wait
+    retry=retry_if_exception_type(ApiRateLimitError),
+    wait=wait_none(),
+    stop=stop_after_attempt(3),
+    before_sleep=_before_retry("github-tags"),
+    reraise=True,
+)
+def resolve_release_ref(
+    repos_url: str, name: str, version: str
+) -> Optional[GitHubGitRef]:
+    """Find the git tag of a release of a package in its GitHub repository.
+
+    Tags are matched by version with optional prefixes commonly used, such as
+    `v1.0.0`, `release-1.0.0`, or `mypackage-1.0.0` in a monorepo. Returns None if
+    no tag matched.
+    """
     owner, repo = _get_owner_and_repo_from_url(repos_url)
     if owner is None or repo is None:
         return None  # Not GitHub
 
-    url = f"https://api.github.com/repos/{owner}/{repo}/license"
+    refs = _tag_lists.call((owner, repo), lambda: _list_tags(owner, repo, repos_url))
+    ref = _match_release_tag(refs, name, version)
+    if ref is None:
+        _logger.debug("No tag found for %s %s in %s/%s", name, version, owner, repo)
+    else:
+        _logger.debug("Resolved %s %s as %s/%s %s", name, version, owner, repo, ref.ref)
+    return ref
+
+
+def _list_tags(owner: str, repo: str, repos_url: str) -> list[GitHubGitRef]:
+    # New tags may be added at any time so revalidate the cached list, which does
+    # not consume rate limit if not modified
+    cached = None
+    cache = get_cache()
+    if cache is not None and (data := cache.get("github-tags", owner, repo)):
+        cached = CachedResponse.model_validate_json(data)
+
+    url = f"{SETTINGS.github_api_url}/repos/{owner}/{repo}/git/matching-refs/tags"
     headers = _make_headers_for_github_api() | {"accept": "application/vnd.github+json"}
+    if cached is not None:
+        headers |= cached.conditional_headers()
+    GITHUB_REST_RATE_LIMITER.acquire()
     _logger.debug("Fetching %s", url)
-    resp = requests.get(url, headers=headers, timeout=SETTINGS.timeout)
-    if resp.status_code == 403:
-        _logger.warning("Hit rate limit of GitHub API. repos_url=%s", repos_url)
+    with endpoint("github-tags"):
+        resp = get_session().get(url, headers=headers, timeout=SETTINGS.timeout)
+    GITHUB_REST_RATE_LIMITER.update(resp.status_code, resp.headers, resp.content)
+    if resp.status_code == 304 and cached is not None:
+        return _git_refs_adapter.validate_json(cached.content)
+    elif resp.status_code == 404:
+        return []
+    elif is_rate_limited(resp.status_code, resp.headers, resp.content):
+        _logger.debug("Hit rate limit of GitHub API. repos_url=%s", repos_url)
         raise ApiRateLimitError()
     elif resp.status_code != 200:
         _logger.warning(
-            "Failed to fetch license data of `%s/%s`. status_code=%d repos_url=%s",
+            "Failed to fetch tags of `%s/%s`. status_code=%d repos_url=%s",
             owner,
             repo,
             resp.status_code,
             repos_url,
         )
         raise LicenseDataUnavailableError(resp.status_code, repos_url)
-    return GitHubLicenseContent.model_validate(resp.json())
 
+    refs = _git_refs_adapter.validate_json(resp.content)
+    if cache is not None:
+        entry = CachedResponse(
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            content=resp.content.decode("utf-8"),
+        )
+        cache.put("github-tags", owner, repo, data=entry.model_dump_json().encode())
+    return refs
+
+
+def _match_release_tag(
+    refs: Sequence[GitHubGitRef], name: str, version: str
+) -> Optional[GitHubGitRef]:
+    try:
+        target = Version(version)
+    except InvalidVersion:
+        return None
 
-def get_file_list_from_github(
-    repos_url: str, sha_list: Sequence[str] = ("main", "master")
-) -> Optional[GitHubGitTree]:
+    canonical_name = canonicalize_name(name)
+    prefixes = {name.lower(), canonical_name, canonical_name.replace("-", "_")}
+    fallback = None
+    for ref in refs:
+        if (tag := ref.tag_name) is None:
+            continue
+
+        # Tags in a monorepo are usually prefixed with the package name
+        rest = tag.lower()
+        has_name = False
+        for prefix in prefixes:
+            if rest.startswith(prefix) and rest[len(prefix) : len(prefix) + 1] in (
+                *"-_/@=",
+            ):
+                rest = rest[len(prefix) + 1 :].lstrip("=")
+                has_name = True
+                break
+
+        try:
+            matched = Version(_re_tag_version_prefix.sub("", rest)) == target
+        except InvalidVersion:
+            matched = False
+        if matched and has_name:
+            return ref  # The most specific one
+        if matched and fallback is None:
+            fallback = ref
+    return fallback
+
+
+_re_tag_version_prefix = re.compile(r"^(?:release|version|rel)?[-_/]?v?")
+
+
+def has_cached_license_data(owner: str, repo: str) -> bool:
+    """Check whether license data of a repository can be revalidated cheaply.
+
+    Only responses of REST API are cached. Results of GraphQL API are not, since
+    GraphQL API has no conditional requests to revalidate them; caching them would
+    make the next run fetch the repositories one by one with REST API.
+    """
+    cache = get_cache()
+    return cache is not None and cache.contains("github-license", owner, repo)
+
+
+def _prepare_license_request(
+    owner: str, repo: str
+) -> tuple[str, dict[str, str], Optional[CachedResponse]]:
+    # Revalidate previously fetched data using conditional request since GitHub
+    # does not count "304 Not Modified" responses against the rate limit.
+    cached = None
+    cache = get_cache()
+    if cache is not None and (data := cache.get("github-license", owner, repo)):
+        cached = CachedResponse.model_validate_json(data)
+
+    url = f"{SETTINGS.github_api_url}/repos/{owner}/{repo}/license"
+    headers = _make_headers_for_github_api() | {"accept": "application/vnd.github+json"}
+    if cached is not None:
+        headers |= cached.conditional_headers()
+    return url, headers, cached
+
+
+def _handle_license_response(  # noqa: PLR0913
+    owner: str,
+    repo: str,
+    repos_url: str,
+    *,
+    status_code: int,
+    headers: Mapping[str, str],
+    content: bytes,
+    cached: Optional[CachedResponse],
+) -> GitHubLicenseContent:
+    GITHUB_REST_RATE_LIMITER.update(status_code, headers, content)
+    if status_code == 304 and cached is not None:
+        _logger.debug("Not modified: %s/%s", owner, repo)
+        return GitHubLicenseContent.model_validate_json(cached.content)
+    elif is_rate_limited(status_code, headers, content):
+        _logger.debug("Hit rate limit of GitHub API. repos_url=%s", repos_url)
+        raise ApiRateLimitError()
+    elif status_code != 200:
+        _logger.warning(
+            "Failed to fetch license data of `%s/%s`. status_code=%d repos_url=%s",
+            owner,
+            repo,
+            status_code,
+            repos_url,
+        )
+        raise LicenseDataUnavailableError(status_code, repos_url)
+
+    license_content = GitHubLicenseContent.model_validate_json(content)
+    if (cache := get_cache()) is not None:
+        entry = CachedResponse(
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            content=content.decode("utf-8"),
+        )
+        cache.put("github-license", owner, repo, data=entry.model_dump_json().encode())
+    return license_content
+
+
+@retry(  # Retries on API rate limit error; the rate limiter decides how long to wait
+    retry=retry_if_exception_type(ApiRateLimitError),
+    wait=wait_none(),
+    stop=stop_after_attempt(3),
+    before_sleep=_before_retry("github-contents"),
+    reraise=True,
+)
+def find_license_file_in_github(
+    repos_url: str, hints: Sequence[str] = (), ref: Optional[str] = None
+) -> Optional[GitHubLicenseContent]:
+    """Search source tree of a GitHub repository for a license file.
+
+    This is for repositories of which license file GitHub did not detect. The
+    root directory of the default branch is listed first, and then directories
+    which likely contain a license file are, up to a few levels deep; the whole
+    tree is never downloaded. Names of directories given as `hints` (e.g. name of
+    a package in a monorepo) are also looked into. If `ref` (name of a branch or
+    a tag) is given, the tree at it is searched instead of the default branch.
+    Returns None if no license file was found.
+    """
     owner, repo = _get_owner_and_repo_from_url(repos_url)
     if owner is None or repo is None:
         return None  # Not GitHub
 
-    for tree_sha in sha_list:
-        url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{tree_sha}"
-        headers = _make_headers_for_github_api() | {
-            "accept": "application/vnd.github+json",
-        }
-        _logger.debug("Fetching %s", url)
-        resp = requests.get(
-            url, params={"recursive": "true"}, headers=headers, timeout=SETTINGS.timeout
+    repos_api_url = f"{SETTINGS.github_api_url}/repos/{owner}/{repo}"
+    if ref is None:
+        content = _get_from_github_api(repos_api_url, repos_url)
+        if content is None:
+            return None
+        ref = GitHubRepository.model_validate_json(content).default_branch
+
+    likely_dirnames = {name.lower() for name in (*_LICENSE_DIRNAMES, *hints)}
+    queue = [("", ref)]  # Pairs of directory path and tree SHA to list
+    for _ in range(_MAX_TREE_LISTINGS):
+        if not queue:
+            break
+        dirpath, tree_sha = queue.pop(0)
+        content = _get_from_github_api(
+            f"{repos_api_url}/git/trees/{tree_sha}", repos_url
         )
-        if resp.status_code == 404:
-            continue
-        elif resp.status_code == 403:
-            _logger.warning("Hit rate limit of GitHub API. repos_url=%s", repos_url)
-            raise ApiRateLimitError()
-        elif resp.status_code != 200:
-            _logger.warning(
-                "Failed to get file list from GitHub. status_code=%d repos_url=%s",
-                resp.status_code,
-                repos_url,
-            )
-            raise NotImplementedError()  # TODO: Implement
+        if content is None:
+            return None
+
+        candidates = []
+        for item in GitHubGitTree.model_validate_json(content).tree:
+            if item.path is None or item.sha is None:
+                continue
+            path = f"{dirpath}/{item.path}" if dirpath else item.path
+            if item.type == "blob":
+                if (score := _license_file_likelihood(path)) >= 0:
+                    candidates.append((score, path))
+            elif (
+                item.type == "tree"
+                and item.path.lower() in likely_dirnames
+                and path.count("/") < _MAX_TREE_DEPTH
+            ):
+                queue.append((path, item.sha))
+        if candidates:
+            _, path = min(candidates)
+            return _get_license_file_from_github(repos_api_url, repos_url, path, ref)
+    return None
+
+
+def _get_license_file_from_github(
+    repos_api_url: str, repos_url: str, path: str, ref: str
+) -> Optional[GitHubLicenseContent]:
+    _logger.debug("Found a license file %s in %s", path, repos_url)
+    content = _get_from_github_api(
+        f"{repos_api_url}/contents/{quote(path)}", repos_url, params={"ref": ref}
+    )
+    if content is None:
+        return None
+    # Response of "Get repository content" API is the same as the one of "Get the
+    # license for a repository" API except that it has no license identity
+    data = json.loads(content)
+    return GitHubLicenseContent.model_validate(data | {"license": OTHER_LICENSE})
 
-        return GitHubGitTree.model_validate(resp.json())
 
-    raise NotImplementedError()  # TODO: Implement
+def _get_from_github_api(
+    url: str, repos_url: str, params: Optional[dict[str, str]] = None
+) -> Optional[bytes]:
+    headers = _make_headers_for_github_api() | {"accept": "application/vnd.github+json"}
+    GITHUB_REST_RATE_LIMITER.acquire()
+    _logger.debug("Fetching %s", url)
+    with endpoint("github-contents"):
+        resp = get_session().get(
+            url, params=params, headers=headers, timeout=SETTINGS.timeout
+        )
+    GITHUB_REST_RATE_LIMITER.update(resp.status_code, resp.headers, resp.content)
+    if resp.status_code == 404:
+        return None
+    elif is_rate_limited(resp.status_code, resp.headers, resp.content):
+        _logger.debug("Hit rate limit of GitHub API. repos_url=%s", repos_url)
+        raise ApiRateLimitError()
+    elif resp.status_code != 200:
+        _logger.warning(
+            "Failed to fetch %s. status_code=%d repos_url=%s",
+            url,
+            resp.status_code,
+            repos_url,
+        )
+        raise LicenseDataUnavailableError(resp.status_code, repos_url)
+    return resp.content
 
 
 def _get_owner_and_repo_from_url(
@@ -107,3 +519,15 @@ def _make_headers_for_github_api() -> dict[str, str]:
     if SETTINGS.github_token is not None:
         headers["Authorization"] = f"Bearer {SETTINGS.github_token}"
     return headers
+
+
+def _license_file_likelihood(path: str) -> int:
+    """Score how likely a file is a license file; smaller is more likely.
+
+    Returns -1 if the file is not a license file. Files in shallower directories
+    are preferred, and then typical names in order of `LICENSE_FILENAMES`.
+    """
+    rank = _LICENSE_FILENAME_RANKS.get(path.rsplit("/", 1)[-1].lower())
+    if rank is None:
+        return -1
+    return (rank + 1) + (path.count("/") + 1) * 1000
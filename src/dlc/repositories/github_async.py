@@ -0,0 +1,63 @@
+"""Asynchronous variants of functions related to GitHub.
+
+This module requires optional dependency `httpx`.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_none,
+)
+
+from dlc.async_session import AsyncSession
+from dlc.exceptions import ApiRateLimitError
+from dlc.metrics import endpoint
+from dlc.models.github import GitHubLicenseContent
+from dlc.rate_limit import GITHUB_REST_RATE_LIMITER
+from dlc.repositories.github import (
+    _before_retry,
+    _get_owner_and_repo_from_url,
+    _handle_license_response,
+    _prepare_license_request,
+)
+
+_logger = logging.getLogger(__name__)
+
+
+@retry(  # Retries on API rate limit error; the rate limiter decides how long to wait
+    retry=retry_if_exception_type(ApiRateLimitError),
+    wait=wait_none(),
+    stop=stop_after_attempt(3),
+    before_sleep=_before_retry("github-license"),
+    reraise=True,
+)
+async def aget_license_data_from_github(
+    session: AsyncSession, repos_url: str
+) -> Optional[GitHubLicenseContent]:
+    owner, repo = _get_owner_and_repo_from_url(repos_url)
+    if owner is None or repo is None:
+        return None  # Not GitHub
+
+    # Read and write the on-disk cache off the event loop
+    url, headers, cached = await asyncio.to_thread(
+        _prepare_license_request, owner, repo
+    )
+    await asyncio.sleep(GITHUB_REST_RATE_LIMITER.reserve())
+    _logger.debug("Fetching %s", url)
+    with endpoint("github-license"):
+        resp = await session.get(url, headers=headers)
+    return await asyncio.to_thread(
+        _handle_license_response,
+        owner,
+        repo,
+        repos_url,
+        status_code=resp.status_code,
+        headers=resp.headers,
+        content=resp.content,
+        cached=cached,
+    )
@@ -0,0 +1,228 @@
+"""Functions to resolve license data of GitHub repositories in batches.
+
+GitHub GraphQL API can query multiple repositories in a single request. Functions in
+this module get detected license, name of root level files, and content of typical
+license files of up to `SETTINGS.github_graphql_batch_size` repositories at once.
+
+Results are not stored in the on-disk cache, because they cannot be revalidated
+with conditional requests as REST API responses can. Repositories which have
+cached REST API responses are revalidated with REST API instead of being queried.
+"""
+
+import json
+import logging
+import threading
+from base64 import b64encode
+from collections.abc import Sequence
+from concurrent.futures import Executor, Future
+from typing import Any, Optional
+
+from dlc.metrics import endpoint
+from dlc.models.github import (
+    GitHubGraphQLRepository,
+    GitHubLicenseContent,
+    GitHubLicenseSimple,
+)
+from dlc.rate_limit import GITHUB_GRAPHQL_RATE_LIMITER
+from dlc.repositories.github import (
+    LICENSE_FILENAMES,
+    OTHER_LICENSE,
+    _license_file_likelihood,
+    _make_headers_for_github_api,
+)
+from dlc.session import get_session
+from dlc.settings import SETTINGS
+
+_logger = logging.getLogger(__name__)
+
+
+def use_github_graphql() -> bool:
+    """Check whether GitHub GraphQL API is available."""
+    # GraphQL API does not accept unauthenticated requests, and a mirror cannot
+    # serve POST requests
+    return (
+        SETTINGS.use_github_graphql
+        and SETTINGS.github_token is not None
+        and SETTINGS.mirror_dir is None
+    )
+
+
+def get_license_data_from_github_graphql(
+    repositories: Sequence[tuple[str, str]],
+) -> dict[tuple[str, str], Optional[GitHubLicenseContent]]:
+    """Get license data of GitHub repositories in a single request.
+
+    Each repository is specified by a pair of owner and repository name. License
+    data of a repository is None if it could not be resolved in this way, e.g. the
+    repository does not exist, or its license file has an unusual name.
+    """
+    query = _make_query(repositories)
+    headers = _make_headers_for_github_api()
+    GITHUB_GRAPHQL_RATE_LIMITER.acquire()
+    _logger.debug("Querying license data of %d repositories", len(repositories))
+    with endpoint("github-graphql"):
+        resp = get_session().post(
+            SETTINGS.github_graphql_url,
+            json={"query": query},
+            headers=headers,
+            timeout=SETTINGS.timeout,
+        )
+    GITHUB_GRAPHQL_RATE_LIMITER.update(resp.status_code, resp.headers, resp.content)
+    if resp.status_code != 200:
+        _logger.warning(
+            "Failed to query license data with GraphQL API. status_code=%d",
+            resp.status_code,
+        )
+        return dict.fromkeys(repositories)
+
+    data = resp.json().get("data") or {}
+    results: dict[tuple[str, str], Optional[GitHubLicenseContent]] = {}
+    for i, (owner, repo) in enumerate(repositories):
+        repository_data = data.get(f"r{i}")
+        if repository_data is None:
+            results[(owner, repo)] = None
+            continue
+        repository = _parse_repository(repository_data)
+        results[(owner, repo)] = _make_license_content(owner, repo, repository)
+    return results
+
+
+class GitHubLicenseBatcher:
+    """Collects license data requests and resolves them in batches.
+
+    Requests are sent when `batch_size` repositories are queued, or when `linger`
+    seconds passed since the first one was queued. The batch is resolved on the
+    given executor.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        batch_size: Optional[int] = None,
+        linger: float = 0.05,
+    ) -> None:
+        self.executor = executor
+        self.batch_size = batch_size or SETTINGS.github_graphql_batch_size
+        self.linger = linger
+        self._pending: list[tuple[str, str, Future]] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def submit(self, owner: str, repo: str) -> "Future[Optional[GitHubLicenseContent]]":
+        """Queue a request for license data of a repository."""
+        future: Future[Optional[GitHubLicenseContent]] = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((owner, repo, future))
+            if len(self._pending) >= self.batch_size:
+                batch = self._take_pending()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.linger, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self.executor.submit(self._resolve, batch)
+        return future
+
+    def flush(self) -> None:
+        """Send queued requests now."""
+        with self._lock:
+            batch = self._take_pending()
+        if batch:
+            self.executor.submit(self._resolve, batch)
+
+    def _take_pending(self) -> list[tuple[str, str, Future]]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _resolve(self, batch: list[tuple[str, str, Future]]) -> None:
+        repositories = list(dict.fromkeys((owner, repo) for owner, repo, _ in batch))
+        try:
+            results = get_license_data_from_github_graphql(repositories)
+        except Exception:
+            _logger.warning("Failed to query license data.", exc_info=True)
+            results = {}
+        for owner, repo, future in batch:
+            future.set_result(results.get((owner, repo)))
+
+
+def _make_query(repositories: Sequence[tuple[str, str]]) -> str:
+    license_fields = "\n".join(
+        f"l{j}: object(expression: {json.dumps('HEAD:' + filename)}) {{"
+        " ... on Blob { oid byteSize isBinary isTruncated text } }"
+        for j, filename in enumerate(LICENSE_FILENAMES)
+    )
+    repository_fields = f"""
+        licenseInfo {{ key name spdxId url id }}
+        defaultBranchRef {{ name }}
+        root: object(expression: "HEAD:") {{
+            ... on Tree {{ entries {{ name type }} }}
+        }}
+        {license_fields}
+    """
+    return (
+        "query {\n"
+        + "\n".join(
+            f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)})"
+            f" {{ {repository_fields} }}"
+            for i, (owner, repo) in enumerate(repositories)
+        )
+        + "\n}"
+    )
+
+
+def _parse_repository(data: dict[str, Any]) -> GitHubGraphQLRepository:
+    license_files = {
+        filename: data.get(f"l{j}") for j, filename in enumerate(LICENSE_FILENAMES)
+    }
+    return GitHubGraphQLRepository.model_validate(
+        data | {"license_files": license_files}
+    )
+
+
+def _make_license_content(
+    owner: str, repo: str, repository: GitHubGraphQLRepository
+) -> Optional[GitHubLicenseContent]:
+    if repository.root is None or repository.default_branch_ref is None:
+        return None  # Empty repository
+
+    # Choose the most likely license file in the root directory
+    candidates = sorted(
+        (score, entry.name)
+        for entry in repository.root.entries
+        if entry.type == "blob"
+        if (score := _license_file_likelihood(entry.name)) >= 0
+    )
+    if not candidates:
+        return None
+    _, filename = candidates[0]
+    blob = repository.license_files.get(filename)
+    if blob is None or blob.text is None or blob.is_binary or blob.is_truncated:
+        return None  # Unusual file name such as "License.txt"
+
+    if repository.license_info is not None:
+        license_simple = GitHubLicenseSimple(
+            key=repository.license_info.key,
+            name=repository.license_info.name,
+            url=repository.license_info.url,
+            spdx_id=repository.license_info.spdx_id,
+            node_id=repository.license_info.id,
+        )
+    else:
+        license_simple = OTHER_LICENSE
+
+    branch = repository.default_branch_ref.name
+    content = blob.text.encode("utf-8")
+    return GitHubLicenseContent(
+        name=filename,
+        sha=blob.oid,
+        size=blob.byte_size,
+        url=f"{SETTINGS.github_api_url}/repos/{owner}/{repo}/contents/{filename}?ref={branch}",  # type: ignore[arg-type]
+        download_url=f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{filename}",  # type: ignore[arg-type]
+        content=b64encode(content).decode("ascii"),
+        encoding="base64",
+        license=license_simple,
+    )
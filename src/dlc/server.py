@@ -0,0 +1,278 @@
+"""Local daemon answering license data of pinned packages.
+
+A long-running process keeps worker threads, pooled HTTP connections and collected
+results in memory, so that CI jobs can get license data of their pins without
+starting cold each time. Results are also stored in the on-disk cache, and reused
+until `SETTINGS.server_cache_ttl` seconds pass since they were collected. Only
+the recently used results are kept in memory.
+
+API:
+
+- `POST /packages` with pins in requirements.txt format as the request body.
+  Responds package data in JSON Lines (same as `license.jsonl`) in order of the
+  pins. Packages of which metadata could not be fetched are omitted.
+- `GET /health` responds "ok".
+- `GET /stats` responds statistics of HTTP requests sent since the server started,
+  in the same format as `stats.json`.
+"""
+
+import io
+import logging
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import Executor, Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, ValidationError
+
+from dlc.cache import get_cache
+from dlc.exceptions import VersionSpecifierError
+from dlc.metrics import METRICS
+from dlc.models.common import Package
+from dlc.registries.pypi import (
+    _make_pypi_cache_key,
+    iter_package_metadata,
+    read_pinned_requirements,
+)
+
+_logger = logging.getLogger(__name__)
+
+# Upper limit of request body, which is far larger than requirements.txt of a
+# large project
+_MAX_REQUEST_SIZE = 16 * 1024 * 1024
+# Number of results kept in memory; the others are read from the on-disk cache
+_MAX_PACKAGES_IN_MEMORY = 10_000
+
+_Key = tuple[str, str]
+
+
+class CachedPackage(BaseModel):
+    """Package data stored together with the time it was collected."""
+
+    collected_at: float
+    package: Package
+
+
+class PackageService:
+    """Collect packages, sharing results among requests.
+
+    A package requested while another request is collecting it waits for the
+    result instead of collecting it again. Up to `max_packages` results used
+    recently are kept in memory.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        ttl: float,
+        max_packages: int = _MAX_PACKAGES_IN_MEMORY,
+    ) -> None:
+        self.executor = executor
+        self.ttl = ttl
+        self.max_packages = max_packages
+        self._packages: OrderedDict[_Key, CachedPackage] = OrderedDict()
+        self._pending: dict[_Key, Future[Optional[Package]]] = {}
+        self._lock = threading.Lock()
+
+    def get_packages(
+        self, name_and_version_tuples: Sequence[tuple[str, str]]
+    ) -> list[Package]:
+        """Get packages of pins, collecting the ones not collected recently."""
+        keys = [_make_pypi_cache_key(n, v) for n, v in name_and_version_tuples]
+        futures: dict[_Key, Future[Optional[Package]]] = {}
+        misses: list[tuple[_Key, tuple[str, str]]] = []
+        with self._lock:
+            for key, name_and_version in zip(keys, name_and_version_tuples):
+                if key in futures:
+                    continue
+                if (future := self._pending.get(key)) is None:
+                    future = Future()
+                    if (package := self._get_fresh(key)) is not None:
+                        future.set_result(package)
+                    else:
+                        self._pending[key] = future
+                        misses.append((key, name_and_version))
+                futures[key] = future
+
+        # Read the on-disk cache without blocking the other requests
+        targets: list[tuple[_Key, tuple[str, str]]] = []
+        for key, name_and_version in misses:
+            if (entry := self._read_cache(key)) is not None:
+                with self._lock:
+                    self._remember(key, entry)
+                    self._pending.pop(key).set_result(entry.package)
+            else:
+                targets.append((key, name_and_version))
+        _logger.info(
+            "Requested %d package(s); collecting %d of them.", len(keys), len(targets)
+        )
+
+        if targets:
+            self._collect(targets)
+        return [
+            package for key in keys if (package := futures[key].result()) is not None
+        ]
+
+    def _collect(self, targets: Sequence[tuple[_Key, tuple[str, str]]]) -> None:
+        results: dict[int, Package] = {}
+        try:
+            for i, package in iter_package_metadata(
+                self.executor, [name_and_version for _, name_and_version in targets]
+            ):
+                results[i] = package
+        except BaseException as ex:
+            with self._lock:
+                for key, _ in targets:
+                    self._pending.pop(key).set_exception(ex)
+            raise
+
+        entries: dict[_Key, CachedPackage] = {}
+        with self._lock:
+            for i, (key, _) in enumerate(targets):
+                collected = results.get(i)
+                # Failures are retried by the next request
+                if collected is not None and (
+                    collected.license_data is None
+                    or collected.license_data._tag != "failure"
+                ):
+                    entries[key] = CachedPackage(
+                        collected_at=time.time(), package=collected
+                    )
+                    self._remember(key, entries[key])
+                self._pending.pop(key).set_result(collected)
+        if (cache := get_cache()) is not None:
+            for key, entry in entries.items():
+                cache.put("package", *key, data=entry.model_dump_json().encode())
+
+    def _get_fresh(self, key: _Key) -> Optional[Package]:
+        entry = self._packages.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            del self._packages[key]
+            return None
+        self._packages.move_to_end(key)
+        return entry.package
+
+    def _read_cache(self, key: _Key) -> Optional[CachedPackage]:
+        if (cache := get_cache()) is None:
+            return None
+        content = cache.get("package", *key)
+        if content is None:
+            return None
+        try:
+            entry = CachedPackage.model_validate_json(content)
+        except ValidationError:
+            _logger.debug("Ignored invalid cache entry of %s %s", *key)
+            return None
+        return None if self._is_expired(entry) else entry
+
+    def _is_expired(self, entry: CachedPackage) -> bool:
+        return time.time() - entry.collected_at > self.ttl
+
+    def _remember(self, key: _Key, entry: CachedPackage) -> None:
+        self._packages[key] = entry
+        self._packages.move_to_end(key)
+        while len(self._packages) > self.max_packages:
+            self._packages.popitem(last=False)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: "_ServiceServer"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._respond(200, b"ok\n", "text/plain")
+        elif self.path == "/stats":
+            content = METRICS.get_stats().model_dump_json(indent=2).encode("utf-8")
+            self._respond(200, content, "application/json")
+        else:
+            self._respond(404, b"Not Found\n", "text/plain")
+
+    def do_POST(self) -> None:
+        if self.path != "/packages":
+            self._respond(404, b"Not Found\n", "text/plain")
+            return
+
+        size = int(self.headers.get("Content-Length", "0"))
+        if size > _MAX_REQUEST_SIZE:
+            self._respond(413, b"Request body too large\n", "text/plain")
+            return
+        body = self.rfile.read(size).decode("utf-8", errors="replace")
+        try:
+            with io.StringIO(body) as f:
+                name_and_version_tuples = read_pinned_requirements(f)
+        except (VersionSpecifierError, ValueError) as ex:
+            self._respond(400, f"{ex}\n".encode(), "text/plain")
+            return
+
+        try:
+            packages = self.server.service.get_packages(name_and_version_tuples)
+        except Exception:
+            _logger.exception("Failed to collect packages")
+            self._respond(500, b"Internal Server Error\n", "text/plain")
+            return
+        content = b"".join(
+            package.model_dump_json().encode("utf-8") + b"\n" for package in packages
+        )
+        self._respond(200, content, "application/jsonl")
+
+    def _respond(self, status: int, content: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        _logger.debug(format, *args)
+
+    def address_string(self) -> str:
+        # Address of a Unix domain socket client is an empty string
+        return str(self.client_address[0]) if self.client_address else "local"
+
+
+class _ServiceServer(socketserver.BaseServer):
+    service: PackageService
+
+
+class _TCPServer(ThreadingHTTPServer, _ServiceServer):
+    daemon_threads = True
+
+
+if sys.platform != "win32":
+
+    class _UnixServer(
+        socketserver.ThreadingMixIn, socketserver.UnixStreamServer, _ServiceServer
+    ):
+        daemon_threads = True
+
+
+def make_server(
+    service: PackageService,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    socket_path: Optional[Path] = None,
+) -> socketserver.BaseServer:
+    """Make a server of the service listening on a TCP port or a Unix socket.
+
+    The server is bound but not started; call its `serve_forever`.
+    """
+    server: _ServiceServer
+    if socket_path is None:
+        server = _TCPServer((host, port), _RequestHandler)
+    elif sys.platform != "win32":
+        socket_path.unlink(missing_ok=True)
+        server = _UnixServer(str(socket_path), _RequestHandler)
+    else:
+        msg = "Unix domain sockets are not supported on Windows."
+        raise ValueError(msg)
+    server.service = service
+    return server
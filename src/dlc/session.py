@@ -0,0 +1,97 @@
+"""Shared HTTP session."""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from dlc.metrics import METRICS
+from dlc.mirror import MirrorAdapter
+from dlc.settings import SETTINGS
+
+_session: Optional[requests.Session] = None
+_session_config: Optional[tuple[int, Optional[Path]]] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Get the HTTP session shared by all worker threads.
+
+    The session keeps connections alive in a pool per host, so that consecutive
+    requests to the same host (pypi.org, api.github.com etc.) can skip TCP and TLS
+    handshakes. Each pool holds up to `SETTINGS.max_workers` connections so that
+    every worker thread can have its own connection at the same time.
+
+    If `SETTINGS.mirror_dir` is set, the session reads responses from the mirror
+    directory instead of sending requests over network.
+
+    Requests sent with the session are recorded in `METRICS`.
+    """
+    global _session, _session_config
+
+    config = (SETTINGS.max_workers or 1, SETTINGS.mirror_dir)
+    with _session_lock:
+        if _session is None or _session_config != config:
+            _session = _make_session(*config)
+            _session_config = config
+        return _session
+
+
+class _MeteredSession(requests.Session):
+    """Session which records requests in `METRICS`."""
+
+    def request(  # type: ignore[override]
+        self,
+        method: str,
+        url: str,
+        *args: Any,  # noqa: ANN401
+        **kwargs: Any,  # noqa: ANN401
+    ) -> requests.Response:
+        start_ns = time.time_ns()
+        t0 = time.perf_counter()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except Exception as ex:
+            METRICS.record_request(
+                method,
+                url,
+                start_ns=start_ns,
+                duration=time.perf_counter() - t0,
+                status=None,
+                size=None,
+                error=type(ex).__name__,
+            )
+            raise
+
+        # Body of a streamed response is not read yet
+        if kwargs.get("stream"):
+            size = int(resp.headers.get("Content-Length", 0)) or None
+        else:
+            size = len(resp.content)
+        METRICS.record_request(
+            method,
+            url,
+            start_ns=start_ns,
+            duration=time.perf_counter() - t0,
+            status=resp.status_code,
+            size=size,
+            headers=resp.headers,
+        )
+        return resp
+
+
+def _make_session(pool_size: int, mirror_dir: Optional[Path]) -> requests.Session:
+    session = _MeteredSession()
+    adapter: BaseAdapter
+    if mirror_dir is not None:
+        adapter = MirrorAdapter(mirror_dir)
+    else:
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    session.headers["Connection"] = "keep-alive"
+    return session
@@ -1,17 +1,45 @@
 """Application settings."""
 
 import os
+import sys
+from pathlib import Path
 from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+def _default_cache_dir() -> Path:
+    if sys.platform == "win32" and "LOCALAPPDATA" in os.environ:
+        return Path(os.environ["LOCALAPPDATA"], "dlc", "Cache")
+    if "XDG_CACHE_HOME" in os.environ:
+        return Path(os.environ["XDG_CACHE_HOME"], "dlc")
+    return Path.home().joinpath(".cache", "dlc")
+
+
 class Settings(BaseSettings):
     """Application settings."""
 
     github_token: Optional[str] = None
+    github_api_url: str = "https://api.github.com"
+    github_graphql_url: str = "https://api.github.com/graphql"
+    use_github_graphql: bool = True
+    github_graphql_batch_size: int = 50
+    pin_release_ref: bool = False
+    use_distribution_license: bool = True
+    pypi_url: str = "https://pypi.org"
+    mirror_dir: Optional[Path] = None
     max_workers: Optional[int] = os.cpu_count() or 1
+    max_connections_per_host: int = 32
     timeout: float = 10.0
+    rate_limit_max_wait: float = 300.0
+    use_cache: bool = True
+    refresh_cache: bool = False
+    cache_dir: Path = _default_cache_dir()
+    cache_max_size: int = 512 * 1024 * 1024
+    server_host: str = "127.0.0.1"
+    server_port: int = 8765
+    server_socket: Optional[Path] = None
+    server_cache_ttl: float = 24 * 60 * 60
 
     model_config = SettingsConfigDict(
         env_file=".env", env_prefix="DLC_", extra="ignore"
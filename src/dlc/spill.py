@@ -0,0 +1,34 @@
+"""Temporary storage of raw responses to keep them out of memory."""
+
+import functools
+import tempfile
+import threading
+from collections.abc import Callable
+
+
+class SpillFile:
+    """Append-only temporary file holding content to be read back later.
+
+    `append` returns a function which reads the appended content back, so that
+    only its position is kept in memory. The file is deleted once the object and
+    all the functions are garbage collected, or the process exits.
+    """
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile()  # noqa: SIM115
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, content: bytes) -> Callable[[], bytes]:
+        """Append content and return a function to read it back."""
+        with self._lock:
+            offset = self._size
+            self._file.seek(offset)
+            self._file.write(content)
+            self._size += len(content)
+        return functools.partial(self._read, offset, len(content))
+
+    def _read(self, offset: int, size: int) -> bytes:
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
@@ -3,10 +3,13 @@
 import logging
 from collections.abc import Iterator
 from concurrent.futures import Executor, ThreadPoolExecutor
+from pathlib import Path
 
 import pytest
 
+from dlc.repositories.github import _licenses_at_ref, _tag_lists
 from dlc.settings import SETTINGS
+from tests.stub_server import StubServer
 
 
 @pytest.fixture
@@ -28,3 +31,26 @@ def package_info_logger() -> logging.Logger:
 def executor() -> Iterator[Executor]:
     with ThreadPoolExecutor(SETTINGS.max_workers) as executor:
         yield executor
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(SETTINGS, "cache_dir", tmp_path / "cache")
+    monkeypatch.setattr(SETTINGS, "use_cache", True)
+    monkeypatch.setattr(SETTINGS, "refresh_cache", False)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_shared_calls() -> None:
+    _tag_lists.clear()
+    _licenses_at_ref.clear()
+
+
+@pytest.fixture
+def stub_server(monkeypatch: pytest.MonkeyPatch) -> Iterator[StubServer]:
+    server = StubServer()
+    monkeypatch.setattr(SETTINGS, "github_api_url", server.url)
+    monkeypatch.setattr(SETTINGS, "github_graphql_url", f"{server.url}/graphql")
+    monkeypatch.setattr(SETTINGS, "pypi_url", server.url)
+    with server.running():
+        yield server
@@ -0,0 +1,429 @@
+"""Local HTTP server standing in for PyPI and GitHub APIs."""
+
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+import zipfile
+from base64 import b64encode
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class StubResponse:
+    body: bytes = b""
+    status: int = 200
+    headers: dict[str, str] = field(default_factory=dict)
+    delay: float = 0.0
+
+
+@dataclass
+class RecordedRequest:
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+    received_at: float = field(default_factory=time.monotonic)
+
+
+class StubServer:
+    """HTTP server which replies canned responses registered per path.
+
+    Query strings are ignored on looking up responses. Requests for paths without
+    registered responses are answered with "404 Not Found".
+
+    Behavior of real servers can be simulated: every response is delayed by at
+    least `latency` seconds, `error_rate` of requests fail with "502 Bad Gateway",
+    and every `rate_limit_every`-th request to GitHub REST API is rejected with
+    "403 Forbidden" asking to retry after `retry_after` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after: int = 1,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.responses: dict[str, StubResponse] = {}
+        self.graphql_repositories: dict[tuple[str, str], dict[str, Any]] = {}
+        self.requests: list[RecordedRequest] = []
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self._random = random.Random(seed)  # noqa: S311
+        self._n_github_requests = 0
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer(("127.0.0.1", 0), _make_handler(self))
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def add(
+        self,
+        path: str,
+        body: bytes = b"",
+        status: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        delay: float = 0.0,
+    ) -> None:
+        self.responses[path] = StubResponse(body, status, headers or {}, delay)
+
+    def requests_to(self, path: str) -> list[RecordedRequest]:
+        with self._lock:
+            return [r for r in self.requests if urlsplit(r.path).path == path]
+
+    @contextmanager
+    def running(self) -> Iterator["StubServer"]:
+        thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            thread.join()
+
+    def handle(self, request: RecordedRequest) -> StubResponse:
+        response = self._handle(request)
+        range_ = {k.lower(): v for k, v in request.headers.items()}.get("range")
+        if response.status == 200 and range_ is not None:
+            response = _make_partial_response(response, range_)
+        if response.delay < self.latency:
+            response = replace(response, delay=self.latency)
+        return response
+
+    def _handle(self, request: RecordedRequest) -> StubResponse:
+        path = urlsplit(request.path).path
+        with self._lock:
+            self.requests.append(request)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            limited = False
+            if self.rate_limit_every > 0 and path.startswith("/repos/"):
+                self._n_github_requests += 1
+                limited = self._n_github_requests % self.rate_limit_every == 0
+        if failed:
+            return StubResponse(b'{"message": "Bad Gateway"}', 502)
+        if limited:
+            return StubResponse(
+                b'{"message": "You have exceeded a secondary rate limit."}',
+                403,
+                {"Retry-After": str(self.retry_after)},
+            )
+        if request.method == "POST" and path == "/graphql":
+            return self._handle_graphql(request)
+        response = self.responses.get(path)
+        if response is None:
+            return StubResponse(b'{"message": "Not Found"}', 404)
+        etag = response.headers.get("ETag")
+        if etag is not None and request.headers.get("If-None-Match") == etag:
+            return StubResponse(b"", 304, {"ETag": etag})
+        return response
+
+    def _handle_graphql(self, request: RecordedRequest) -> StubResponse:
+        # Resolve only top level `repository` fields, each aliased as `rN`
+        query = json.loads(request.body)["query"]
+        data = {
+            alias: self.graphql_repositories.get((owner, name))
+            for alias, owner, name in _re_graphql_repository.findall(query)
+        }
+        return StubResponse(json.dumps({"data": data}).encode("utf-8"))
+
+
+def _make_partial_response(response: StubResponse, range_: str) -> StubResponse:
+    # Only a single range is supported: "bytes=START-END", "START-", or "-LENGTH"
+    match = _re_range.fullmatch(range_)
+    size = len(response.body)
+    if match is None:
+        return response
+    if match[1]:
+        start = int(match[1])
+        end = min(int(match[2]), size - 1) if match[2] else size - 1
+    else:
+        start, end = max(size - int(match[2]), 0), size - 1
+    if start >= size or start > end:
+        return StubResponse(b"", 416, {"Content-Range": f"bytes */{size}"})
+    headers = response.headers | {"Content-Range": f"bytes {start}-{end}/{size}"}
+    return replace(
+        response, body=response.body[start : end + 1], status=206, headers=headers
+    )
+
+
+_re_range = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Accept many concurrent connections
+
+
+_re_graphql_repository = re.compile(
+    r'(r\d+): repository\(owner: "([^"]+)", name: "([^"]+)"\)'
+)
+
+
+def _make_handler(server: StubServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are written separately
+
+        def do_GET(self) -> None:
+            self._reply()
+
+        def do_POST(self) -> None:
+            self._reply()
+
+        def log_message(self, format: str, *args) -> None:  # noqa: A002
+            pass
+
+        def _reply(self) -> None:
+            length = int(self.headers.get("Content-Length", "0"))
+            body = self.rfile.read(length) if length > 0 else b""
+            request = RecordedRequest(
+                self.command, self.path, dict(self.headers.items()), body
+            )
+            response = server.handle(request)
+            if response.delay > 0:
+                time.sleep(response.delay)
+            self.send_response(response.status)
+            for name, value in response.headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(response.body)))
+            self.end_headers()
+            self.wfile.write(response.body)
+
+    return Handler
+
+
+def make_pypi_release(
+    name: str,
+    version: str,
+    project_urls: Optional[dict[str, str]] = None,
+    license: Optional[str] = None,  # noqa: A002
+    urls: Optional[list[dict[str, Any]]] = None,
+) -> bytes:
+    """Make a response body of PyPI's "Get a release" JSON API.
+
+    `urls` is the list of distribution files; see `make_release_file`.
+    """
+    info: dict[str, Any] = {
+        key: None
+        for key in (
+            "author",
+            "author_email",
+            "bugtrack_url",
+            "classifiers",
+            "description_content_type",
+            "docs_url",
+            "download_url",
+            "dynamic",
+            "home_page",
+            "keywords",
+            "license",
+            "maintainer",
+            "maintainer_email",
+            "platform",
+            "provides_extra",
+            "requires_dist",
+            "requires_python",
+            "summary",
+            "yanked_reason",
+        )
+    }
+    info |= {
+        "description": f"# {name}\n\nA long README text.\n",
+        "downloads": {"last_day": -1, "last_month": -1, "last_week": -1},
+        "license": license,
+        "name": name,
+        "package_url": f"https://pypi.org/project/{name}/",
+        "project_url": f"https://pypi.org/project/{name}/",
+        "project_urls": project_urls,
+        "release_url": f"https://pypi.org/project/{name}/{version}/",
+        "version": version,
+        "yanked": False,
+    }
+    return json.dumps(
+        {"info": info, "last_serial": 1, "urls": urls or [], "vulnerabilities": []}
+    ).encode("utf-8")
+
+
+def make_release_file(url: str, content: bytes) -> dict[str, Any]:
+    """Make an item of `urls` in response of PyPI's "Get a release" JSON API."""
+    filename = url.rsplit("/", 1)[-1]
+    return {
+        "digests": {"sha256": hashlib.sha256(content).hexdigest()},
+        "filename": filename,
+        "packagetype": "bdist_wheel" if filename.endswith(".whl") else "sdist",
+        "size": len(content),
+        "url": url,
+        "yanked": False,
+    }
+
+
+def make_wheel(
+    name: str, version: str, metadata: str, files: dict[str, bytes]
+) -> bytes:
+    """Make a wheel of which `.dist-info` directory contains `files`.
+
+    `metadata` is the content of `METADATA` file. Some modules are added so that
+    the central directory is not at the beginning of the archive.
+    """
+    dist_info = f"{name.replace('-', '_')}-{version}.dist-info"
+    with io.BytesIO() as f:
+        with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for i in range(100):
+                zf.writestr(
+                    f"{name}/module{i}.py",
+                    "".join(
+                        hashlib.sha512(b"%d %d" % (i, j)).hexdigest() for j in range(16)
+                    ),
+                )
+            zf.writestr(f"{dist_info}/METADATA", metadata)
+            for path, content in files.items():
+                zf.writestr(f"{dist_info}/{path}", content)
+            zf.writestr(f"{dist_info}/RECORD", "")
+        return f.getvalue()
+
+
+def make_sdist(name: str, version: str, files: dict[str, bytes]) -> bytes:
+    """Make a source distribution in `.tar.gz` containing `files` in that order."""
+    with io.BytesIO() as f:
+        with tarfile.open(fileobj=f, mode="w:gz") as tar:
+            for path, content in files.items():
+                info = tarfile.TarInfo(f"{name}-{version}/{path}")
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return f.getvalue()
+
+
+def make_github_license(
+    owner: str, repo: str, text: str, spdx_id: str = "MIT"
+) -> bytes:
+    """Make a response body of GitHub's "Get the license for a repository" API."""
+    data = json.loads(make_github_content(owner, repo, "LICENSE", text))
+    data["license"] = {
+        "key": spdx_id.lower(),
+        "name": f"{spdx_id} License",
+        "spdx_id": spdx_id,
+        "url": f"https://api.github.com/licenses/{spdx_id.lower()}",
+        "node_id": "MDc6TGljZW5zZTEz",
+    }
+    return json.dumps(data).encode("utf-8")
+
+
+def make_github_content(
+    owner: str, repo: str, path: str, text: str, ref: str = "main"
+) -> bytes:
+    """Make a response body of GitHub's "Get repository content" API for a file."""
+    content = text.encode("utf-8")
+    # Same as `git hash-object`
+    sha = hashlib.sha1(b"blob %d\0%s" % (len(content), content)).hexdigest()  # noqa: S324
+    return json.dumps(
+        {
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": sha,
+            "size": len(content),
+            "url": f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={ref}",
+            "download_url": f"https://raw.githubusercontent.com/{owner}/{repo}/{ref}/{path}",
+            "type": "file",
+            "content": b64encode(content).decode("ascii"),
+            "encoding": "base64",
+        }
+    ).encode("utf-8")
+
+
+def make_github_tree(entries: dict[str, str]) -> bytes:
+    """Make a response body of GitHub's "Get a tree" API (non-recursive).
+
+    `entries` maps names of entries to their types, "blob" or "tree". SHA of a
+    tree entry is its name prefixed with "sha-".
+    """
+    return json.dumps(
+        {
+            "sha": "0123456789abcdef0123456789abcdef01234567",
+            "url": "https://api.github.com/repos/owner/repo/git/trees/0123456789abcdef",
+            "tree": [
+                {
+                    "path": name,
+                    "mode": "040000" if type_ == "tree" else "100644",
+                    "type": type_,
+                    "sha": f"sha-{name}",
+                }
+                for name, type_ in entries.items()
+            ],
+            "truncated": False,
+        }
+    ).encode("utf-8")
+
+
+def make_github_tags(tags: dict[str, str]) -> bytes:
+    """Make a response body of GitHub's "List matching references" API for tags.
+
+    `tags` maps names of tags to SHA of commits they point to.
+    """
+    return json.dumps(
+        [
+            {
+                "ref": f"refs/tags/{name}",
+                "node_id": "MDM6UmVmcmVmcy90YWdzL3YxLjAuMA==",
+                "url": f"https://api.github.com/repos/owner/repo/git/refs/tags/{name}",
+                "object": {
+                    "sha": sha,
+                    "type": "commit",
+                    "url": f"https://api.github.com/repos/owner/repo/git/commits/{sha}",
+                },
+            }
+            for name, sha in tags.items()
+        ]
+    ).encode("utf-8")
+
+
+def make_graphql_repository(
+    text: str, spdx_id: str = "MIT", filename: str = "LICENSE"
+) -> dict[str, Any]:
+    """Make a `repository` object in response of GitHub GraphQL API."""
+    from dlc.repositories.github import LICENSE_FILENAMES
+
+    data: dict[str, Any] = {
+        "licenseInfo": {
+            "key": spdx_id.lower(),
+            "name": f"{spdx_id} License",
+            "spdxId": spdx_id,
+            "url": f"https://choosealicense.com/licenses/{spdx_id.lower()}/",
+            "id": "MDc6TGljZW5zZTEz",
+        },
+        "defaultBranchRef": {"name": "main"},
+        "root": {
+            "entries": [
+                {"name": "README.md", "type": "blob"},
+                {"name": "src", "type": "tree"},
+                {"name": filename, "type": "blob"},
+            ]
+        },
+    }
+    for j, name in enumerate(LICENSE_FILENAMES):
+        data[f"l{j}"] = None
+        if name == filename:
+            data[f"l{j}"] = {
+                "oid": "0123456789abcdef0123456789abcdef01234567",
+                "byteSize": len(text),
+                "isBinary": False,
+                "isTruncated": False,
+                "text": text,
+            }
+    return data
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from benchmarks.corpus import (
+    install_corpus,
+    make_requirements,
+    scale_corpus,
+    synthesize_corpus,
+)
+from benchmarks.run import ServerOptions, run_benchmark
+from dlc.registries.pypi import collect_package_metadata
+from tests.stub_server import StubServer
+
+
+def test_run_benchmark():
+    result = run_benchmark(
+        synthesize_corpus(40),
+        server_options=ServerOptions(rate_limit_every=10, retry_after=0),
+    )
+
+    assert result.size == 40
+    assert result.num_packages == 40
+    # Packages without repository
+    assert result.num_failures == 2
+
+
+def test_scale_corpus(stub_server: StubServer):
+    entries = scale_corpus(synthesize_corpus(2), 5)
+    install_corpus(stub_server, entries)
+
+    with ThreadPoolExecutor(2) as executor:
+        packages = collect_package_metadata(
+            executor, StringIO(make_requirements(entries))
+        )
+
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("package-00000", b"MIT License of package-00000\n" * 20),
+        ("package-00001", b"MIT License of package-00001\n" * 20),
+        ("package-00000-1", b"MIT License of package-00000\n" * 20),
+        ("package-00001-1", b"MIT License of package-00001\n" * 20),
+        ("package-00000-2", b"MIT License of package-00000\n" * 20),
+    ]
+    assert stub_server.requests_to("/repos/org/package-00001-1/license")
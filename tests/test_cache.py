@@ -0,0 +1,61 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from dlc.cache import FileCache, get_cache
+from dlc.metrics import METRICS
+from dlc.settings import SETTINGS
+
+
+def test_get_and_put(tmp_path: Path):
+    cache = FileCache(tmp_path, max_size=1024 * 1024)
+    assert cache.get("pypi", "click", "8.1.8") is None
+
+    cache.put("pypi", "click", "8.1.8", data=b'{"info": {}}')
+    assert cache.get("pypi", "click", "8.1.8") == b'{"info": {}}'
+    assert cache.get("pypi", "click", "8.1.7") is None
+    assert cache.get("github", "click", "8.1.8") is None
+
+
+def test_contains(tmp_path: Path):
+    cache = FileCache(tmp_path, max_size=1024 * 1024)
+    cache.put("pypi", "click", "8.1.8", data=b"{}")
+    METRICS.reset()
+
+    assert cache.contains("pypi", "click", "8.1.8")
+    assert not cache.contains("pypi", "click", "8.1.7")
+    assert METRICS.get_stats().cache == {}
+
+
+def test_refresh(tmp_path: Path):
+    FileCache(tmp_path, max_size=1024).put("pypi", "a", data=b"old")
+
+    cache = FileCache(tmp_path, max_size=1024, refresh=True)
+    assert cache.get("pypi", "a") is None
+    assert not cache.contains("pypi", "a")
+    cache.put("pypi", "a", data=b"new")
+    assert FileCache(tmp_path, max_size=1024).get("pypi", "a") == b"new"
+
+
+def test_lru_eviction(tmp_path: Path):
+    data = os.urandom(400)  # Incompressible
+    cache = FileCache(tmp_path, max_size=1300)
+    for i, name in enumerate("abc"):
+        cache.put("pypi", name, data=data)
+        os.utime(cache._path_of("pypi", (name,)), (i, i))
+
+    # Reading an entry marks it as recently used
+    assert cache.get("pypi", "a") == data
+    assert cache._path_of("pypi", ("a",)).stat().st_mtime > 2
+
+    cache.put("pypi", "d", data=data)
+    assert cache.get("pypi", "b") is None
+    assert cache.get("pypi", "c") is None
+    assert cache.get("pypi", "a") == data
+    assert cache.get("pypi", "d") == data
+
+
+def test_get_cache_disabled(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(SETTINGS, "use_cache", False)
+    assert get_cache() is None
@@ -0,0 +1,369 @@
+import json
+import subprocess
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from dlc.cli import main
+from dlc.reports.license_jsonl import read_license_jsonl
+from dlc.settings import SETTINGS
+from tests.stub_server import StubServer, make_github_license, make_pypi_release
+
+# Modules which must not be imported just to parse command line arguments
+_HEAVY_MODULES = {
+    "dlc.models",
+    "dlc.registries",
+    "dlc.reports",
+    "dlc.settings",
+    "httpx",
+    "jinja2",
+    "pydantic",
+    "requests",
+    "rich",
+    "tenacity",
+}
+
+
+def _add_package(stub_server: StubServer, name: str, version: str) -> None:
+    stub_server.add(
+        f"/pypi/{name}/{version}/json",
+        make_pypi_release(name, version, {"Source": f"https://github.com/org/{name}"}),
+    )
+    stub_server.add(
+        f"/repos/org/{name}/license",
+        make_github_license("org", name, f"License of {name}\n"),
+    )
+
+
+def test_incremental(tmp_path: Path, stub_server: StubServer):
+    _add_package(stub_server, "foo", "1.0.0")
+    _add_package(stub_server, "bar", "2.0.0")
+    _add_package(stub_server, "baz", "3.0.0")
+    runner = CliRunner()
+
+    args = ["-f", "requirements_txt", "--no-cache", "-o", str(tmp_path / "1"), "-"]
+    result = runner.invoke(main, args, input="foo==1.0.0\nbar==1.0.0\n")
+    assert result.exit_code == 0, result.output
+    assert [p.name for p in read_license_jsonl(tmp_path / "1")] == ["foo"]
+
+    stub_server.requests.clear()
+    args = [
+        *("-f", "requirements_txt", "--no-cache", "-o", str(tmp_path / "2")),
+        *("--incremental", str(tmp_path / "1"), "-"),
+    ]
+    result = runner.invoke(main, args, input="foo==1.0.0\nbar==2.0.0\nbaz==3.0.0\n")
+    assert result.exit_code == 0, result.output
+
+    packages = read_license_jsonl(tmp_path / "2")
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("foo", b"License of foo\n"),
+        ("bar", b"License of bar\n"),
+        ("baz", b"License of baz\n"),
+    ]
+    assert not stub_server.requests_to("/pypi/foo/1.0.0/json")
+    assert not stub_server.requests_to("/repos/org/foo/license")
+    # Raw registry data of reused packages is copied from the previous report
+    registry_data = tmp_path.joinpath("2", "registry_data", "foo.json")
+    assert registry_data.read_bytes() == make_pypi_release(
+        "foo", "1.0.0", {"Source": "https://github.com/org/foo"}
+    )
+
+
+def test_incremental_reuses_license_file_by_url(
+    tmp_path: Path, stub_server: StubServer
+):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", license=f"{stub_server.url}/LICENSE"),
+    )
+    stub_server.add(
+        "/pypi/bar/1.0.0/json",
+        make_pypi_release("bar", "1.0.0", license=f"{stub_server.url}/missing"),
+    )
+    stub_server.add("/LICENSE", b"Copyright\n")
+    runner = CliRunner()
+
+    args = ["-f", "requirements_txt", "--no-cache", "-o", str(tmp_path / "1"), "-"]
+    result = runner.invoke(main, args, input="foo==1.0.0\nbar==1.0.0\n")
+    assert result.exit_code == 0, result.output
+
+    stub_server.requests.clear()
+    args = [
+        *("-f", "requirements_txt", "--no-cache", "-o", str(tmp_path / "2")),
+        *("--incremental", str(tmp_path / "1"), "-"),
+    ]
+    result = runner.invoke(main, args, input="foo==1.0.0\nbar==1.0.0\n")
+    assert result.exit_code == 0, result.output
+
+    packages = read_license_jsonl(tmp_path / "2")
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("foo", b"Copyright\n"),
+        ("bar", None),
+    ]
+    assert not stub_server.requests_to("/pypi/foo/1.0.0/json")
+    assert not stub_server.requests_to("/LICENSE")
+    # The license file which could not be downloaded is retried
+    assert stub_server.requests_to("/missing")
+
+
+def test_options_do_not_leak(tmp_path: Path, stub_server: StubServer):
+    _add_package(stub_server, "foo", "1.0.0")
+    args = ["-f", "requirements_txt", "--no-cache", "--refresh", "--pin-release-ref"]
+    args += ["--mirror", str(tmp_path), "-o", str(tmp_path / "report"), "-"]
+
+    CliRunner().invoke(main, args, input="foo==1.0.0\n")
+
+    assert SETTINGS.use_cache
+    assert not SETTINGS.refresh_cache
+    assert not SETTINGS.pin_release_ref
+    assert SETTINGS.mirror_dir is None
+
+
+@pytest.mark.parametrize(
+    "options", [[], ["--no-cache"], ["--refresh"], ["--engine", "async"]]
+)
+def test_report_files(tmp_path: Path, stub_server: StubServer, options: list[str]):
+    _add_package(stub_server, "zope.interface", "7.2")
+    args = ["-f", "requirements_txt", *options, "-o", str(tmp_path), "-"]
+
+    result = CliRunner().invoke(main, args, input="zope.interface==7.2\n")
+    assert result.exit_code == 0, result.output
+
+    assert tmp_path.joinpath("index.html").exists()
+    license_file = tmp_path.joinpath("license_files", "zope.interface.txt")
+    assert license_file.read_bytes() == b"License of zope.interface\n"
+    registry_data = tmp_path.joinpath("registry_data", "zope.interface.json")
+    assert registry_data.read_bytes() == make_pypi_release(
+        "zope.interface", "7.2", {"Source": "https://github.com/org/zope.interface"}
+    )
+
+
+def test_paginated_report(tmp_path: Path, stub_server: StubServer):
+    for name in ("foo", "bar", "baz"):
+        _add_package(stub_server, name, "1.0.0")
+    args = ["-f", "requirements_txt", "--page-size", "2", "-o", str(tmp_path), "-"]
+
+    input_ = "foo==1.0.0\nbar==1.0.0\nbaz==1.0.0\n"
+    result = CliRunner().invoke(main, args, input=input_)
+    assert result.exit_code == 0, result.output
+
+    first_page = tmp_path.joinpath("index.html").read_text(encoding="utf-8")
+    second_page = tmp_path.joinpath("index-2.html").read_text(encoding="utf-8")
+    assert 'id="foo"' in first_page
+    assert 'id="baz"' not in first_page
+    assert 'id="baz"' in second_page
+    assert not tmp_path.joinpath("index-3.html").exists()
+
+    search_index = tmp_path.joinpath("search_index.js").read_text(encoding="utf-8")
+    prefix = "var DLC_SEARCH_INDEX = "
+    assert search_index.startswith(prefix)
+    assert json.loads(search_index[len(prefix) :].rstrip().rstrip(";")) == {
+        "pages": ["index.html", "index-2.html"],
+        "packages": [
+            ["foo", "1.0.0", "MIT", 0],
+            ["bar", "1.0.0", "MIT", 0],
+            ["baz", "1.0.0", "MIT", 1],
+        ],
+    }
+
+
+@pytest.mark.parametrize("archive", ["zip", "tar.gz"])
+def test_archive(tmp_path: Path, stub_server: StubServer, archive: str):
+    _add_package(stub_server, "foo", "1.0.0")
+    args = ["-f", "requirements_txt", "--archive", archive, "-o", str(tmp_path), "-"]
+
+    result = CliRunner().invoke(main, args, input="foo==1.0.0\n")
+    assert result.exit_code == 0, result.output
+
+    archive_path = tmp_path / f"report.{archive}"
+    if archive == "zip":
+        with zipfile.ZipFile(archive_path) as zf:
+            names = zf.namelist()
+    else:
+        with tarfile.open(archive_path) as tf:
+            names = tf.getnames()
+    assert sorted(names) == [
+        "index.html",
+        "license.jsonl",
+        "license_files/foo.txt",
+        "registry_data/foo.json",
+        "stats.json",
+    ]
+    assert not tmp_path.joinpath("index.html").exists()
+    assert not tmp_path.joinpath("stats.json").exists()
+    assert [p.name for p in read_license_jsonl(tmp_path)] == ["foo"]
+
+
+def test_import_is_lightweight():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import dlc.cli"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    # Each line is formatted as "import time: <self> | <cumulative> | <name>"
+    imported = {
+        line.rsplit("|", 1)[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "dlc.cli" in imported
+    heavy = {
+        name
+        for name in imported
+        for module in _HEAVY_MODULES
+        if name == module or name.startswith(f"{module}.")
+    }
+    assert not heavy
+
+
+def test_batch(tmp_path: Path, stub_server: StubServer):
+    for name in ("foo", "bar", "baz"):
+        _add_package(stub_server, name, "1.0.0")
+    inputs = tmp_path / "services"
+    for service, requirements in [
+        ("app", "foo==1.0.0\nbar==1.0.0\n"),
+        ("web", "foo==1.0.0\nbaz==1.0.0\n"),
+        ("web-dev", "Foo==1.0.0\n"),
+    ]:
+        service_dir = inputs / service.split("-")[0]
+        service_dir.mkdir(parents=True, exist_ok=True)
+        filename = f"requirements{service.removeprefix(service_dir.name)}.txt"
+        service_dir.joinpath(filename).write_text(requirements, encoding="utf-8")
+    outdir = tmp_path / "report"
+
+    args = ["-f", "requirements_txt", "--no-cache", "-o", str(outdir), str(inputs)]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+
+    # Each package is collected only once
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 1
+    assert len(stub_server.requests_to("/repos/org/foo/license")) == 1
+    assert [p.name for p in read_license_jsonl(outdir / "projects" / "app")] == [
+        "foo",
+        "bar",
+    ]
+    assert [p.name for p in read_license_jsonl(outdir / "projects" / "web-dev")] == [
+        "foo"
+    ]
+    assert [p.name for p in read_license_jsonl(outdir)] == ["foo", "bar", "baz"]
+    inventory = [
+        json.loads(line)
+        for line in outdir.joinpath("inventory.jsonl").read_text().splitlines()
+    ]
+    assert [(x["name"], x["license_name"], x["projects"]) for x in inventory] == [
+        ("bar", "MIT", ["app"]),
+        ("baz", "MIT", ["web"]),
+        ("foo", "MIT", ["app", "web-dev", "web"]),
+    ]
+
+
+def test_shard_and_merge(tmp_path: Path, stub_server: StubServer):
+    names = [f"pkg{i}" for i in range(8)]
+    for name in names:
+        _add_package(stub_server, name, "1.0.0")
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("".join(f"{n}==1.0.0\n" for n in names), encoding="utf-8")
+    runner = CliRunner()
+
+    shard_outdirs = []
+    for index, archive in [
+        (1, []),
+        (2, ["--archive", "zip"]),
+        (3, ["--archive", "tar.gz"]),
+    ]:
+        shard_outdir = tmp_path / f"shard{index}"
+        args = ["-f", "requirements_txt", "--no-cache", "--shard", f"{index}/3"]
+        args += [*archive, "-o", str(shard_outdir), str(requirements)]
+        result = runner.invoke(main, args)
+        assert result.exit_code == 0, result.output
+        shard_outdirs.append(shard_outdir)
+
+    # Shards collect disjoint slices of the packages
+    shards = [[p.name for p in read_license_jsonl(d)] for d in shard_outdirs]
+    assert sorted(name for shard in shards for name in shard) == names
+    assert all(shards)
+    for name in names:
+        assert len(stub_server.requests_to(f"/pypi/{name}/1.0.0/json")) == 1
+
+    outdir = tmp_path / "report"
+    args = ["merge", "-o", str(outdir), *map(str, shard_outdirs)]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+
+    packages = read_license_jsonl(outdir)
+    assert [p.name for p in packages] == names
+    for name in names:
+        assert outdir.joinpath("registry_data", f"{name}.json").exists()
+        assert outdir.joinpath("license_files", f"{name}.txt").read_text() == (
+            f"License of {name}\n"
+        )
+        # Nothing is collected again
+        assert len(stub_server.requests_to(f"/pypi/{name}/1.0.0/json")) == 1
+        assert len(stub_server.requests_to(f"/repos/org/{name}/license")) == 1
+    assert outdir.joinpath("registry_data", f"{shards[0][0]}.json").read_bytes() == (
+        shard_outdirs[0].joinpath("registry_data", f"{shards[0][0]}.json").read_bytes()
+    )
+
+
+@pytest.mark.parametrize("value", ["0/2", "3/2", "1", "a/b", "1/0"])
+def test_shard_invalid(tmp_path: Path, value: str):
+    args = ["-f", "requirements_txt", "--shard", value, str(tmp_path)]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 2
+    assert "INDEX/COUNT" in result.output
+
+
+def test_stats(tmp_path: Path, stub_server: StubServer):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", {"Source": "https://github.com/org/foo"}),
+    )
+    stub_server.add(
+        "/repos/org/foo/license",
+        make_github_license("org", "foo", "License of foo\n"),
+        headers={"X-RateLimit-Remaining": "42"},
+    )
+    stub_server.add("/pypi/bar/1.0.0/json", b"Not Found", status=404)
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("foo==1.0.0\nbar==1.0.0\n", encoding="utf-8")
+    runner = CliRunner()
+
+    outdir = tmp_path / "report"
+    args = ["-f", "requirements_txt", "--export-spans", "-o", str(outdir)]
+    result = runner.invoke(main, [*args, str(requirements)])
+    assert result.exit_code == 0, result.output
+
+    stats = json.loads(outdir.joinpath("stats.json").read_text())
+    endpoints = {x["endpoint"]: x for x in stats["endpoints"]}
+    assert endpoints["pypi"]["requests"] == 2
+    assert endpoints["pypi"]["statuses"] == {"200": 1, "404": 1}
+    assert endpoints["pypi"]["bytes"] > 0
+    assert sum(endpoints["pypi"]["latency"]["counts"]) == 2
+    assert endpoints["github-license"]["rate_limit_remaining"] == 42
+    assert stats["cache"]["pypi"] == {"hits": 0, "misses": 2}
+
+    spans = json.loads(outdir.joinpath("spans.json").read_text())
+    (scope_spans,) = spans["resourceSpans"][0]["scopeSpans"]
+    root, *children = scope_spans["spans"]
+    assert root["name"] == "dlc collect"
+    assert len(children) == sum(x["requests"] for x in stats["endpoints"])
+    assert {child["parentSpanId"] for child in children} == {root["spanId"]}
+    assert {child["traceId"] for child in children} == {root["traceId"]}
+
+    # Metrics of each run are written separately
+    outdir = tmp_path / "report2"
+    args = ["-f", "requirements_txt", "-o", str(outdir), str(requirements)]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+
+    stats = json.loads(outdir.joinpath("stats.json").read_text())
+    assert stats["cache"]["pypi"] == {"hits": 1, "misses": 1}
+    endpoints = {x["endpoint"]: x for x in stats["endpoints"]}
+    assert endpoints["pypi"]["statuses"] == {"404": 1}
+    assert not outdir.joinpath("spans.json").exists()
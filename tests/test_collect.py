@@ -0,0 +1,244 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from dlc.cache import FileCache
+from dlc.models.common import Package
+from dlc.registries.pypi import collect_package_metadata, iter_package_metadata
+from dlc.registries.pypi_async import collect_package_metadata_async
+from tests.stub_server import (
+    StubServer,
+    make_github_content,
+    make_github_license,
+    make_github_tree,
+    make_pypi_release,
+)
+
+_REQUIREMENTS = ["foo==1.0.0\n", "bar==2.0\n", "baz==3.0.0\n"]
+
+
+@pytest.fixture
+def registry(stub_server: StubServer) -> StubServer:
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", {"Source": "https://github.com/org/foo"}),
+    )
+    stub_server.add(
+        "/pypi/bar/2.0/json",
+        make_pypi_release("bar", "2.0", {"Homepage": "https://example.com/bar"}),
+    )
+    stub_server.add(
+        "/repos/org/foo/license",
+        make_github_license("org", "foo", "MIT License\n"),
+    )
+    return stub_server
+
+
+def _summarize(packages: list[Package]) -> list[tuple[str, str, object]]:
+    return [(p.name, p.version, p.license_name) for p in packages]
+
+
+def test_collect_package_metadata(executor: Executor, registry: StubServer):
+    packages = collect_package_metadata(executor, _REQUIREMENTS)  # type: ignore[arg-type]
+
+    assert _summarize(packages) == [
+        ("foo", "1.0.0", "MIT"),
+        ("bar", "2.0", None),
+    ]
+    assert packages[0].license_file == b"MIT License\n"
+
+
+def test_collect_skips_invalid_version(executor: Executor, registry: StubServer):
+    requirements = [*_REQUIREMENTS, "qux==1.0.*\n"]
+    packages = collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+
+    assert _summarize(packages) == [
+        ("foo", "1.0.0", "MIT"),
+        ("bar", "2.0", None),
+    ]
+
+
+def test_registry_data_keeps_only_used_fields(stub_server: StubServer):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", {"Source": "n/a"}),
+    )
+
+    packages = asyncio.run(collect_package_metadata_async(["foo==1.0.0"]))  # type: ignore[arg-type]
+
+    assert packages[0].registry_data is not None
+    info = packages[0].registry_data.info
+    assert info.project_urls == {"Source": "n/a"}
+    assert "description" not in info.model_dump()
+
+
+def test_collect_package_metadata_async(registry: StubServer):
+    packages = asyncio.run(collect_package_metadata_async(_REQUIREMENTS))  # type: ignore[arg-type]
+
+    assert _summarize(packages) == [
+        ("foo", "1.0.0", "MIT"),
+        ("bar", "2.0", None),
+    ]
+
+
+def test_async_engine_accesses_cache_off_event_loop(
+    registry: StubServer, monkeypatch: pytest.MonkeyPatch
+):
+    threads: set[str] = set()
+    for method in ("get", "put"):
+        original = getattr(FileCache, method)
+
+        def record(*args: Any, original: Any = original, **kwargs: Any) -> Any:
+            threads.add(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(FileCache, method, record)
+
+    for _ in range(2):  # Fill the cache, and then read it
+        asyncio.run(collect_package_metadata_async(_REQUIREMENTS))  # type: ignore[arg-type]
+
+    assert threads
+    assert threading.main_thread().name not in threads
+
+
+def test_iter_package_metadata_is_pipelined(registry: StubServer):
+    registry.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", {"Source": "https://github.com/org/foo"}),
+        delay=0.5,
+    )
+    registry.add(
+        "/pypi/bar/2.0/json",
+        make_pypi_release("bar", "2.0", {"Source": "https://github.com/org/foo"}),
+    )
+
+    with ThreadPoolExecutor(4) as executor:
+        pins = [("foo", "1.0.0"), ("bar", "2.0")]
+        results = list(iter_package_metadata(executor, pins))
+
+    # "bar" completes first and its license lookup did not wait for "foo"
+    assert [(i, p.name) for i, p in results] == [(1, "bar"), (0, "foo")]
+    (foo_request,) = registry.requests_to("/pypi/foo/1.0.0/json")
+    license_requests = registry.requests_to("/repos/org/foo/license")
+    assert license_requests[0].received_at < foo_request.received_at + 0.5
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_license_file_is_prefetched(
+    executor: Executor, stub_server: StubServer, engine: str
+):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", license=f"{stub_server.url}/LICENSE"),
+    )
+    stub_server.add("/LICENSE", b"Copyright\n")
+
+    if engine == "thread":
+        packages = collect_package_metadata(executor, ["foo==1.0.0"])  # type: ignore[arg-type]
+    else:
+        packages = asyncio.run(collect_package_metadata_async(["foo==1.0.0"]))  # type: ignore[arg-type]
+
+    assert len(stub_server.requests_to("/LICENSE")) == 1
+    assert packages[0].license_file == b"Copyright\n"
+    assert len(stub_server.requests_to("/LICENSE")) == 1
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_license_file_download_failure(
+    executor: Executor, stub_server: StubServer, engine: str
+):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", license=f"{stub_server.url}/LICENSE"),
+    )
+    stub_server.add("/LICENSE", b"Not Found\n", status=404)
+    stub_server.add(
+        "/pypi/bar/1.0.0/json",
+        make_pypi_release("bar", "1.0.0", license="http://127.0.0.1:1/LICENSE"),
+    )
+
+    requirements = ["foo==1.0.0", "bar==1.0.0"]
+    if engine == "thread":
+        packages = collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+    else:
+        packages = asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("foo", None),
+        ("bar", None),
+    ]
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_lookups_are_shared_per_repository(
+    executor: Executor, stub_server: StubServer, engine: str
+):
+    requirements = [f"azure-{name}==1.0.0\n" for name in ("core", "identity", "mgmt")]
+    # Names of GitHub repositories are case insensitive
+    owners = {"core": "Azure", "identity": "azure", "mgmt": "Azure"}
+    for name, owner in owners.items():
+        stub_server.add(
+            f"/pypi/azure-{name}/1.0.0/json",
+            make_pypi_release(
+                f"azure-{name}",
+                "1.0.0",
+                {"Source": f"https://github.com/{owner}/azure-sdk-for-python"},
+            ),
+        )
+    for owner in ("Azure", "azure"):
+        stub_server.add(
+            f"/repos/{owner}/azure-sdk-for-python/license",
+            make_github_license(owner, "azure-sdk-for-python", "MIT License\n"),
+        )
+
+    if engine == "thread":
+        packages = collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+    else:
+        packages = asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+
+    assert [p.license_name for p in packages] == ["MIT", "MIT", "MIT"]
+    requests = [
+        *stub_server.requests_to("/repos/Azure/azure-sdk-for-python/license"),
+        *stub_server.requests_to("/repos/azure/azure-sdk-for-python/license"),
+    ]
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_source_tree_is_searched_per_package(
+    executor: Executor, stub_server: StubServer, engine: str
+):
+    # GitHub detects no license of the repository; each package has its own
+    requirements = ["pkg-a==1.0.0\n", "pkg-b==1.0.0\n"]
+    for name in ("pkg-a", "pkg-b"):
+        stub_server.add(
+            f"/pypi/{name}/1.0.0/json",
+            make_pypi_release(name, "1.0.0", {"Source": "https://github.com/o/mono"}),
+        )
+        stub_server.add(
+            f"/repos/o/mono/git/trees/sha-{name}", make_github_tree({"LICENSE": "blob"})
+        )
+        stub_server.add(
+            f"/repos/o/mono/contents/{name}/LICENSE",
+            make_github_content("o", "mono", f"{name}/LICENSE", f"License of {name}\n"),
+        )
+    stub_server.add("/repos/o/mono", b'{"default_branch": "main"}')
+    stub_server.add(
+        "/repos/o/mono/git/trees/main",
+        make_github_tree({"README.md": "blob", "pkg-a": "tree", "pkg-b": "tree"}),
+    )
+
+    if engine == "thread":
+        packages = collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+    else:
+        packages = asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+
+    assert [p.license_file for p in packages] == [
+        b"License of pkg-a\n",
+        b"License of pkg-b\n",
+    ]
+    # The license of the repository is still looked up only once
+    assert len(stub_server.requests_to("/repos/o/mono/license")) == 1
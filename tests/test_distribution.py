@@ -0,0 +1,224 @@
+import asyncio
+import io
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dlc.models.common import Package
+from dlc.models.pypi import PyPIRelease
+from dlc.registries import distribution
+from dlc.registries.distribution import (
+    get_license_data_from_sdist,
+    get_license_data_from_wheel,
+)
+from dlc.registries.pypi import collect_package_metadata
+from dlc.registries.pypi_async import collect_package_metadata_async
+from tests.stub_server import (
+    StubServer,
+    make_github_license,
+    make_pypi_release,
+    make_release_file,
+    make_sdist,
+    make_wheel,
+)
+
+METADATA_2_4 = """\
+Metadata-Version: 2.4
+Name: foo
+Version: 1.0.0
+License-Expression: MIT AND BSD-3-Clause
+License-File: LICENSE
+License-File: vendor/LICENSE.bsd
+Classifier: Programming Language :: Python
+
+A long README text.
+"""
+
+METADATA_2_1 = """\
+Metadata-Version: 2.1
+Name: foo
+Version: 1.0.0
+License: BSD
+Classifier: License :: OSI Approved :: BSD License
+"""
+
+
+def _add_wheel(
+    stub_server: StubServer, metadata: str, files: dict[str, bytes], *, pep658: bool
+) -> bytes:
+    wheel = make_wheel("foo", "1.0.0", metadata, files)
+    path = "/packages/foo-1.0.0-py3-none-any.whl"
+    stub_server.add(path, wheel)
+    if pep658:
+        stub_server.add(f"{path}.metadata", metadata.encode())
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release(
+            "foo",
+            "1.0.0",
+            {"Source": "https://github.com/o/foo"},
+            urls=[
+                make_release_file(f"{stub_server.url}/packages/foo-1.0.0.tar.gz", b""),
+                make_release_file(f"{stub_server.url}{path}", wheel),
+            ],
+        ),
+    )
+    stub_server.add("/repos/o/foo/license", make_github_license("o", "foo", "MIT\n"))
+    return wheel
+
+
+def _collect(engine: str) -> list[Package]:
+    requirements = ["foo==1.0.0\n"]
+    if engine == "async":
+        return asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+    with ThreadPoolExecutor(2) as executor:
+        return collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_license_from_wheel(stub_server: StubServer, engine: str):
+    wheel = _add_wheel(
+        stub_server,
+        METADATA_2_4,
+        {"licenses/LICENSE": b"MIT License\n", "licenses/vendor/LICENSE.bsd": b"BSD\n"},
+        pep658=True,
+    )
+
+    packages = _collect(engine)
+
+    assert packages[0].license_name == "MIT AND BSD-3-Clause"
+    assert packages[0].license_file == (
+        b"----- foo-1.0.0.dist-info/licenses/LICENSE -----\n\nMIT License\n\n"
+        b"----- foo-1.0.0.dist-info/licenses/vendor/LICENSE.bsd -----\n\nBSD\n"
+    )
+    assert not stub_server.requests_to("/repos/o/foo/license")
+    # Only the end of the wheel is read; the metadata is in a separate file
+    requests = stub_server.requests_to("/packages/foo-1.0.0-py3-none-any.whl")
+    assert len(requests) == 1
+    assert requests[0].headers["Range"] == "bytes=-65536"
+    assert len(wheel) > 65536
+
+    # Distribution files never change, so the result is cached permanently
+    stub_server.requests.clear()
+    assert _collect(engine)[0].license_file == packages[0].license_file
+    assert not stub_server.requests_to("/packages/foo-1.0.0-py3-none-any.whl")
+
+
+def test_license_from_wheel_without_pep658_metadata(stub_server: StubServer):
+    _add_wheel(stub_server, METADATA_2_1, {"LICENSE.txt": b"BSD\n"}, pep658=False)
+    release = PyPIRelease.model_validate_json(
+        stub_server.responses["/pypi/foo/1.0.0/json"].body
+    )
+
+    license_content = get_license_data_from_wheel(release)
+
+    assert license_content is not None
+    assert license_content.license_name == "BSD License"
+    assert license_content.decode_content() == b"BSD\n"
+    # The central directory, and then METADATA and LICENSE.txt
+    requests = stub_server.requests_to("/packages/foo-1.0.0-py3-none-any.whl")
+    assert requests[0].headers["Range"] == "bytes=-65536"
+    assert len(requests) <= 3
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_wheel_without_license_falls_back(stub_server: StubServer, engine: str):
+    metadata = "Metadata-Version: 2.1\nName: foo\nVersion: 1.0.0\n"
+    _add_wheel(stub_server, metadata, {}, pep658=True)
+
+    packages = _collect(engine)
+
+    assert packages[0].license_name == "MIT"
+    assert packages[0].license_file == b"MIT\n"
+    assert stub_server.requests_to("/repos/o/foo/license")
+
+
+def _add_sdist(stub_server: StubServer, filename: str, sdist: bytes) -> PyPIRelease:
+    path = f"/packages/{filename}"
+    stub_server.add(path, sdist)
+    body = make_pypi_release(
+        "foo",
+        "1.0.0",
+        license="MIT",
+        urls=[make_release_file(f"{stub_server.url}{path}", sdist)],
+    )
+    stub_server.add("/pypi/foo/1.0.0/json", body)
+    return PyPIRelease.model_validate_json(body)
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_license_from_sdist(stub_server: StubServer, engine: str):
+    # No repository is known, and a big file follows the license file
+    _add_sdist(
+        stub_server,
+        "foo-1.0.0.tar.gz",
+        make_sdist(
+            "foo",
+            "1.0.0",
+            {
+                "PKG-INFO": b"Metadata-Version: 2.1\n",
+                "docs/LICENSE": b"Not this one\n",
+                "LICENSE": b"MIT License\n",
+                "data.bin": os.urandom(1024 * 1024),
+            },
+        ),
+    )
+
+    packages = _collect(engine)
+
+    assert packages[0].license_name == "MIT"
+    assert packages[0].license_file == b"MIT License\n"
+
+
+@pytest.mark.parametrize(
+    "filename", ["LICENSE-MIT", "LICENSE.APACHE2", "LICENCE", "COPYING.LESSER"]
+)
+def test_license_with_suffix_from_sdist(stub_server: StubServer, filename: str):
+    release = _add_sdist(
+        stub_server,
+        "foo-1.0.0.tar.gz",
+        make_sdist(
+            "foo",
+            "1.0.0",
+            {"license.py": b"# Not this one\n", filename: b"MIT License\n"},
+        ),
+    )
+
+    license_content = get_license_data_from_sdist(release)
+
+    assert license_content is not None
+    assert license_content.license_files[0].path == f"foo-1.0.0/{filename}"
+    assert license_content.decode_content() == b"MIT License\n"
+
+
+def test_sdist_scan_gives_up(stub_server: StubServer, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(distribution, "_MAX_SDIST_SCAN_SIZE", 64 * 1024)
+    release = _add_sdist(
+        stub_server,
+        "foo-1.0.0.tar.gz",
+        make_sdist(
+            "foo",
+            "1.0.0",
+            {"data.bin": os.urandom(1024 * 1024), "LICENSE": b"MIT License\n"},
+        ),
+    )
+
+    assert get_license_data_from_sdist(release) is None
+
+
+def test_license_from_zip_sdist(stub_server: StubServer):
+    with io.BytesIO(make_wheel("foo", "1.0.0", "", {})) as f:
+        with zipfile.ZipFile(f, "a") as zf:
+            zf.writestr("foo-1.0.0/LICENSE-MIT", "MIT License\n")
+            zf.writestr("foo-1.0.0/src/foo/LICENSE", "Not this one\n")
+        release = _add_sdist(stub_server, "foo-1.0.0.zip", f.getvalue())
+
+    license_content = get_license_data_from_sdist(release)
+
+    assert license_content is not None
+    assert license_content.license_name == "MIT"
+    assert license_content.decode_content() == b"MIT License\n"
+    requests = stub_server.requests_to("/packages/foo-1.0.0.zip")
+    assert all("Range" in r.headers for r in requests)
@@ -0,0 +1,293 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import urlsplit
+
+import pytest
+
+from dlc.exceptions import LicenseDataUnavailableError
+from dlc.models.common import Package
+from dlc.models.github import GitHubGitObject, GitHubGitRef, GitHubLicenseContent
+from dlc.rate_limit import RateLimiter
+from dlc.registries.pypi import collect_package_metadata, iter_package_metadata
+from dlc.registries.pypi_async import collect_package_metadata_async
+from dlc.repositories import github
+from dlc.repositories.github import (
+    _licenses_at_ref,
+    _match_release_tag,
+    _tag_lists,
+    find_license_file_in_github,
+    get_license_data_from_github,
+)
+from dlc.repositories.github_graphql import get_license_data_from_github_graphql
+from dlc.settings import SETTINGS
+from tests.stub_server import (
+    StubServer,
+    make_github_content,
+    make_github_license,
+    make_github_tags,
+    make_github_tree,
+    make_graphql_repository,
+    make_pypi_release,
+)
+
+
+def test_license_data_is_revalidated(stub_server: StubServer):
+    path = "/repos/foo/bar/license"
+    stub_server.add(
+        path,
+        make_github_license("foo", "bar", "MIT License\n"),
+        headers={"ETag": '"abc"', "Last-Modified": "Mon, 06 Jan 2025 00:00:00 GMT"},
+    )
+
+    first = get_license_data_from_github("https://github.com/foo/bar")
+    second = get_license_data_from_github("https://github.com/foo/bar.git")
+
+    assert first is not None
+    assert second == first
+    assert second.decode_content() == b"MIT License\n"
+    requests = stub_server.requests_to(path)
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"abc"'
+    assert requests[1].headers["If-Modified-Since"] == "Mon, 06 Jan 2025 00:00:00 GMT"
+
+
+def test_forbidden_is_not_rate_limit(
+    monkeypatch: pytest.MonkeyPatch, stub_server: StubServer
+):
+    limiter = RateLimiter("test", rate=1000.0, burst=1000)
+    monkeypatch.setattr(github, "GITHUB_REST_RATE_LIMITER", limiter)
+    stub_server.add(
+        "/repos/foo/bar/license",
+        b'{"message": "Resource protected by organization SAML enforcement."}',
+        status=403,
+        headers={"X-RateLimit-Remaining": "4999"},
+    )
+
+    with pytest.raises(LicenseDataUnavailableError):
+        get_license_data_from_github("https://github.com/foo/bar")
+
+    # Neither retried nor paused the other requests
+    assert len(stub_server.requests_to("/repos/foo/bar/license")) == 1
+    assert limiter.reserve() == pytest.approx(0, abs=0.1)
+
+
+@pytest.mark.parametrize(
+    ("name", "version", "expected"),
+    [
+        ("foo", "1.0.0", "foo-1.0.0"),  # Prefixed with the package name
+        ("baz", "1.0.0", "v1.0.0"),
+        ("baz", "1.0", "v1.0.0"),
+        ("Foo.Bar", "2.0", "foo_bar-2.0"),
+        ("foo-bar", "2.1", "Foo-Bar/v2.1"),
+        ("baz", "3.0", "release-3.0"),
+        ("baz", "4.0", None),
+        ("baz", "invalid version", None),
+    ],
+)
+def test_match_release_tag(name: str, version: str, expected: Optional[str]):
+    tags = [
+        "v0.9.0",
+        "v1.0.0",
+        "1.0",
+        "foo-1.0.0",
+        "foo_bar-2.0",
+        "Foo-Bar/v2.1",
+        "release-3.0",
+        "nightly",
+    ]
+    refs = [
+        GitHubGitRef(
+            ref=f"refs/tags/{tag}",
+            object=GitHubGitObject(sha=f"{i:040x}", type="commit"),
+        )
+        for i, tag in enumerate(tags)
+    ]
+
+    ref = _match_release_tag(refs, name, version)
+
+    assert (ref.tag_name if ref is not None else None) == expected
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_license_data_at_release_tag(
+    monkeypatch: pytest.MonkeyPatch, stub_server: StubServer, engine: str
+):
+    monkeypatch.setattr(SETTINGS, "pin_release_ref", True)
+    monkeypatch.setattr(SETTINGS, "github_token", "dummy")
+    pins = [("foo", "1.0.0"), ("foo-extra", "1.0.0"), ("foo", "1.1.0")]
+    for name, version in pins:
+        stub_server.add(
+            f"/pypi/{name}/{version}/json",
+            make_pypi_release(name, version, {"Source": "https://github.com/o/r"}),
+        )
+    stub_server.add(
+        "/repos/o/r/git/matching-refs/tags",
+        make_github_tags({"v1.0.0": "c" * 40, "v1.1.0": "d" * 40}),
+        headers={"ETag": '"tags"'},
+    )
+    # The stub server ignores the query, so the same file is served for any ref
+    stub_server.add("/repos/o/r/license", make_github_license("o", "r", "MIT\n"))
+
+    def collect() -> list[Package]:
+        if engine == "async":
+            return asyncio.run(collect_package_metadata_async(requirements))
+        with ThreadPoolExecutor(4) as executor:
+            return collect_package_metadata(executor, requirements)
+
+    requirements = [f"{name}=={version}\n" for name, version in pins]
+    packages = collect()
+
+    assert [p.license_file for p in packages] == [b"MIT\n"] * 3
+    assert all(
+        isinstance(p.license_data, GitHubLicenseContent) and p.license_data.sha
+        for p in packages
+    )
+    # Packages released at the same tag share the lookup
+    requests = stub_server.requests_to("/repos/o/r/license")
+    assert sorted(urlsplit(r.path).query for r in requests) == [
+        "ref=v1.0.0",
+        "ref=v1.1.0",
+    ]
+    assert len(stub_server.requests_to("/repos/o/r/git/matching-refs/tags")) == 1
+    assert not stub_server.requests_to("/graphql")
+
+    # License data at a tag is cached permanently; only tags are revalidated
+    _tag_lists.clear()
+    _licenses_at_ref.clear()
+    stub_server.requests.clear()
+    packages = collect()
+
+    assert [p.license_file for p in packages] == [b"MIT\n"] * 3
+    assert not stub_server.requests_to("/repos/o/r/license")
+    requests = stub_server.requests_to("/repos/o/r/git/matching-refs/tags")
+    assert [r.headers["If-None-Match"] for r in requests] == ['"tags"']
+
+
+def test_find_license_file_in_github(stub_server: StubServer):
+    stub_server.add("/repos/foo/bar", b'{"default_branch": "develop"}')
+    stub_server.add(
+        "/repos/foo/bar/git/trees/develop",
+        make_github_tree({"README.md": "blob", "docs": "tree", "Baz": "tree"}),
+    )
+    stub_server.add(
+        "/repos/foo/bar/git/trees/sha-Baz",
+        make_github_tree({"setup.py": "blob", "licenses": "tree"}),
+    )
+    stub_server.add(
+        "/repos/foo/bar/git/trees/sha-licenses",
+        make_github_tree({"COPYING.txt": "blob", "LICENSE": "blob"}),
+    )
+    stub_server.add(
+        "/repos/foo/bar/contents/Baz/licenses/LICENSE",
+        make_github_content("foo", "bar", "Baz/licenses/LICENSE", "Copyright\n"),
+    )
+
+    license_content = find_license_file_in_github(
+        "https://github.com/foo/bar", hints=["baz"]
+    )
+
+    assert license_content is not None
+    assert license_content.name == "LICENSE"
+    assert license_content.license.key == "other"
+    assert license_content.decode_content() == b"Copyright\n"
+    # Only directories likely to contain a license file are listed, one by one
+    assert not stub_server.requests_to("/repos/foo/bar/git/trees/sha-docs")
+    requests = stub_server.requests_to("/repos/foo/bar/contents/Baz/licenses/LICENSE")
+    assert requests[0].path.endswith("?ref=develop")
+    assert all("recursive" not in r.path for r in stub_server.requests)
+
+
+def test_find_license_file_in_github_not_found(stub_server: StubServer):
+    stub_server.add("/repos/foo/bar", b'{"default_branch": "main"}')
+    stub_server.add(
+        "/repos/foo/bar/git/trees/main", make_github_tree({"README.md": "blob"})
+    )
+
+    assert find_license_file_in_github("https://github.com/foo/bar") is None
+    assert find_license_file_in_github("https://github.com/foo/qux") is None
+
+
+def test_graphql(stub_server: StubServer):
+    stub_server.graphql_repositories[("foo", "bar")] = make_graphql_repository(
+        "Apache License\n", spdx_id="Apache-2.0", filename="LICENSE.txt"
+    )
+    stub_server.graphql_repositories[("foo", "baz")] = make_graphql_repository(
+        "Copyright\n", filename="License.txt"
+    )
+
+    results = get_license_data_from_github_graphql(
+        [("foo", "bar"), ("foo", "baz"), ("foo", "qux")]
+    )
+
+    assert len(stub_server.requests_to("/graphql")) == 1
+    license_content = results[("foo", "bar")]
+    assert license_content is not None
+    assert license_content.name == "LICENSE.txt"
+    assert license_content.license.spdx_id == "Apache-2.0"
+    assert license_content.decode_content() == b"Apache License\n"
+    assert results[("foo", "baz")] is None  # Unusual file name
+    assert results[("foo", "qux")] is None  # Not found
+
+
+def test_graphql_batches_and_falls_back_to_rest(
+    monkeypatch: pytest.MonkeyPatch, stub_server: StubServer
+):
+    monkeypatch.setattr(SETTINGS, "github_token", "dummy")
+    pins = [(f"pkg{i}", "1.0.0") for i in range(10)]
+    for i, (name, version) in enumerate(pins):
+        stub_server.add(
+            f"/pypi/{name}/{version}/json",
+            make_pypi_release(name, version, {"Source": f"https://github.com/o/r{i}"}),
+        )
+        if i != 3:
+            stub_server.graphql_repositories[("o", f"r{i}")] = make_graphql_repository(
+                f"License of r{i}\n"
+            )
+    stub_server.add("/repos/o/r3/license", make_github_license("o", "r3", "REST\n"))
+
+    with ThreadPoolExecutor(4) as executor:
+        results = dict(iter_package_metadata(executor, pins))
+
+    packages: list[Package] = [results[i] for i in range(10)]
+    assert [p.license_file for p in packages] == [
+        b"REST\n" if i == 3 else f"License of r{i}\n".encode() for i in range(10)
+    ]
+    assert len(stub_server.requests_to("/graphql")) < 10
+    assert len(stub_server.requests_to("/repos/o/r3/license")) == 1
+
+
+def test_graphql_results_are_queried_again(
+    monkeypatch: pytest.MonkeyPatch, stub_server: StubServer
+):
+    monkeypatch.setattr(SETTINGS, "github_token", "dummy")
+    pins = [("foo", "1.0.0"), ("bar", "1.0.0")]
+    for name, version in pins:
+        stub_server.add(
+            f"/pypi/{name}/{version}/json",
+            make_pypi_release(
+                name, version, {"Source": f"https://github.com/o/{name}"}
+            ),
+        )
+    stub_server.graphql_repositories[("o", "foo")] = make_graphql_repository("MIT\n")
+    stub_server.add(
+        "/repos/o/bar/license",
+        make_github_license("o", "bar", "BSD\n"),
+        headers={"ETag": '"bar"'},
+    )
+
+    for _ in range(2):
+        with ThreadPoolExecutor(4) as executor:
+            results = dict(iter_package_metadata(executor, pins))
+        assert [results[i].license_file for i in range(2)] == [b"MIT\n", b"BSD\n"]
+
+    # Results of GraphQL API cannot be revalidated and are not cached, while a
+    # REST API response in the cache is revalidated with a conditional request
+    queries = [json.loads(r.body)["query"] for r in stub_server.requests_to("/graphql")]
+    assert len(queries) == 2
+    assert all('name: "foo"' in query for query in queries)
+    assert sum('name: "bar"' in query for query in queries) == 1
+    requests = stub_server.requests_to("/repos/o/bar/license")
+    assert [r.headers.get("If-None-Match") for r in requests] == [None, '"bar"']
@@ -0,0 +1,101 @@
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from dlc.cli import main
+from dlc.registries.installed import find_distribution_paths, read_installed_packages
+from dlc.reports.license_jsonl import read_license_jsonl
+from tests.stub_server import StubServer, make_github_license, make_pypi_release
+
+
+def _install(
+    site_packages: Path, name: str, version: str, metadata: str, files: dict[str, str]
+) -> None:
+    dist_info = site_packages / f"{name}-{version}.dist-info"
+    dist_info.mkdir(parents=True)
+    dist_info.joinpath("METADATA").write_text(
+        f"Metadata-Version: 2.4\nName: {name}\nVersion: {version}\n{metadata}",
+        encoding="utf-8",
+    )
+    for path, content in files.items():
+        dist_info.joinpath(path).parent.mkdir(parents=True, exist_ok=True)
+        dist_info.joinpath(path).write_text(content, encoding="utf-8")
+    records = [f"{dist_info.name}/{path}" for path in ["METADATA", *files, "RECORD"]]
+    dist_info.joinpath("RECORD").write_text(
+        "".join(f"{record},,\n" for record in records), encoding="utf-8"
+    )
+
+
+def test_read_installed_packages(tmp_path: Path):
+    _install(
+        tmp_path,
+        "foo",
+        "1.0.0",
+        "License-Expression: MIT\nLicense-File: LICENSE\n"
+        "Project-URL: Source, https://github.com/org/foo\n",
+        {"licenses/LICENSE": "MIT License\n"},
+    )
+    _install(
+        tmp_path,
+        "bar",
+        "2.0.0",
+        "Classifier: License :: OSI Approved :: BSD License\n",
+        {"COPYING": "BSD\n"},
+    )
+    _install(tmp_path, "baz", "3.0.0", "", {})
+
+    packages = read_installed_packages([tmp_path])
+
+    assert [(p.name, p.version, p.license_name) for p in packages] == [
+        ("bar", "2.0.0", "BSD License"),
+        ("baz", "3.0.0", None),
+        ("foo", "1.0.0", "MIT"),
+    ]
+    assert [p.license_file for p in packages] == [b"BSD\n", None, b"MIT License\n"]
+    assert packages[2].registry_data is not None
+    assert packages[2].registry_data.info.project_urls == {
+        "Source": "https://github.com/org/foo"
+    }
+
+
+def test_find_distribution_paths_of_interpreter():
+    paths = find_distribution_paths(Path(sys.executable))
+
+    # Dependencies of DLC are installed in the running interpreter
+    names = {package.name.lower() for package in read_installed_packages(paths)}
+    assert {"click", "pydantic", "requests"} <= names
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_installed_format(tmp_path: Path, stub_server: StubServer, engine: str):
+    site_packages = tmp_path / "site-packages"
+    _install(
+        site_packages,
+        "foo",
+        "1.0.0",
+        "License-Expression: MIT\nLicense-File: LICENSE\n",
+        {"licenses/LICENSE": "MIT License\n"},
+    )
+    # No license file is installed; it is looked up online
+    _install(site_packages, "bar", "2.0.0", "License: BSD\n", {})
+    stub_server.add(
+        "/pypi/bar/2.0.0/json",
+        make_pypi_release("bar", "2.0.0", {"Source": "https://github.com/org/bar"}),
+    )
+    stub_server.add(
+        "/repos/org/bar/license", make_github_license("org", "bar", "BSD\n", "BSD")
+    )
+    outdir = tmp_path / "report"
+    args = ["-f", "installed", "--engine", engine, "-o", str(outdir)]
+
+    result = CliRunner().invoke(main, [*args, str(site_packages)])
+    assert result.exit_code == 0, result.output
+
+    packages = read_license_jsonl(outdir)
+    assert [(p.name, p.license_name, p.license_file) for p in packages] == [
+        ("bar", "BSD", b"BSD\n"),
+        ("foo", "MIT", b"MIT License\n"),
+    ]
+    assert not stub_server.requests_to("/pypi/foo/1.0.0/json")
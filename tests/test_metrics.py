@@ -0,0 +1,66 @@
+import pytest
+
+from dlc.metrics import Metrics, endpoint
+
+
+def test_metrics():
+    metrics = Metrics()
+    metrics.reset(keep_spans=True)
+    with endpoint("pypi"):
+        for duration in (0.001, 0.2, 20.0):
+            metrics.record_request(
+                "GET",
+                "https://pypi.org/pypi/foo/1.0.0/json",
+                start_ns=0,
+                duration=duration,
+                status=200,
+                size=10,
+            )
+    with endpoint("github-license"):
+        metrics.record_request(
+            "GET",
+            "https://api.github.com/repos/org/foo/license",
+            start_ns=0,
+            duration=0.1,
+            status=None,
+            size=None,
+            error="ConnectionError",
+        )
+        for remaining in ("10", "5", "7"):
+            metrics.record_request(
+                "GET",
+                "https://api.github.com/repos/org/foo/license",
+                start_ns=0,
+                duration=0.1,
+                status=200,
+                size=1,
+                headers={"X-RateLimit-Remaining": remaining},
+            )
+    metrics.record_retry("github-license")
+    metrics.record_cache_lookup("pypi", hit=True)
+    metrics.record_cache_lookup("pypi", hit=False)
+
+    stats = metrics.get_stats()
+    github, pypi = stats.endpoints
+    assert (pypi.endpoint, pypi.host) == ("pypi", "pypi.org")
+    assert (pypi.requests, pypi.bytes, pypi.statuses) == (3, 30, {"200": 3})
+    assert pypi.latency.counts[0] == 1  # <= 5ms
+    assert pypi.latency.counts[6] == 1  # <= 250ms
+    assert pypi.latency.counts[-1] == 1  # > 10s
+    assert pypi.latency.sum == pytest.approx(20.201)
+    assert (pypi.latency.min, pypi.latency.max) == (0.001, 20.0)
+    assert (github.requests, github.errors) == (4, 1)
+    assert github.rate_limit_remaining == 5
+    assert stats.retries == {"github-license": 1}
+    assert stats.cache["pypi"].model_dump() == {"hits": 1, "misses": 1}
+
+    spans = metrics.get_spans()
+    assert [(s.endpoint, s.status, s.error) for s in spans[2:4]] == [
+        ("pypi", 200, None),
+        ("github-license", None, "ConnectionError"),
+    ]
+    assert spans[2].end_ns == 20_000_000_000
+
+    metrics.reset()
+    assert not metrics.get_stats().endpoints
+    assert not metrics.get_spans()
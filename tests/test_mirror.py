@@ -0,0 +1,150 @@
+import asyncio
+import json
+from concurrent.futures import Executor
+from pathlib import Path
+
+import pytest
+
+from dlc.mirror import read_mirror, resolve_mirror_path
+from dlc.models.common import Package
+from dlc.registries.pypi import collect_package_metadata
+from dlc.registries.pypi_async import collect_package_metadata_async
+from dlc.settings import SETTINGS
+from tests.stub_server import (
+    make_github_content,
+    make_github_license,
+    make_github_tags,
+    make_github_tree,
+    make_pypi_release,
+)
+
+
+@pytest.fixture
+def mirror_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    files = {
+        "pypi.org/pypi/foo/1.0.0/json": make_pypi_release(
+            "foo", "1.0.0", {"Source": "https://github.com/org/foo"}
+        ),
+        "api.github.com/repos/org/foo/license": make_github_license(
+            "org", "foo", "MIT License\n"
+        ),
+    }
+    for path, content in files.items():
+        tmp_path.joinpath(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.joinpath(path).write_bytes(content)
+
+    monkeypatch.setattr(SETTINGS, "mirror_dir", tmp_path)
+    monkeypatch.setattr(SETTINGS, "github_token", "dummy")  # Must not use GraphQL
+    return tmp_path
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_from_mirror(executor: Executor, mirror_dir: Path, engine: str):
+    requirements = ["foo==1.0.0\n", "bar==1.0.0\n"]
+    if engine == "thread":
+        packages = collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+    else:
+        packages = asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+
+    assert [(p.name, p.license_name, p.license_file) for p in packages] == [
+        ("foo", "MIT", b"MIT License\n"),
+    ]
+
+
+def test_resolve_mirror_path(tmp_path: Path):
+    repos_dir = tmp_path.joinpath("api.github.com", "repos", "org", "foo")
+    assert resolve_mirror_path(
+        tmp_path, "https://api.github.com/repos/org/foo/license"
+    ) == repos_dir.joinpath("license")
+    assert resolve_mirror_path(
+        tmp_path, "https://api.github.com/repos/org/foo/license?ref=release/1.0"
+    ) == repos_dir.joinpath("license?ref=release%2F1.0")
+    assert resolve_mirror_path(
+        tmp_path, "https://api.github.com/repos/org/foo/"
+    ) == repos_dir.joinpath("index.html")
+    assert resolve_mirror_path(tmp_path, "https://pypi.org/pypi/../../etc") is None
+    assert resolve_mirror_path(tmp_path, "https://pypi.org/pypi/%2E%2E/x") is None
+    assert read_mirror(tmp_path, "GET", "https://pypi.org/pypi/foo/json")[0] == 404
+
+
+def _collect(executor: Executor, requirements: list[str], engine: str) -> list[Package]:
+    if engine == "thread":
+        return collect_package_metadata(executor, requirements)  # type: ignore[arg-type]
+    return asyncio.run(collect_package_metadata_async(requirements))  # type: ignore[arg-type]
+
+
+def _write(directory: Path, path: str, content: bytes) -> None:
+    directory.joinpath(path).parent.mkdir(parents=True, exist_ok=True)
+    directory.joinpath(path).write_bytes(content)
+
+
+@pytest.mark.parametrize("engine", ["thread", "async"])
+def test_collect_from_mirror_at_release_tags(
+    executor: Executor,
+    mirror_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    engine: str,
+):
+    monkeypatch.setattr(SETTINGS, "pin_release_ref", True)
+    _write(
+        mirror_dir,
+        "pypi.org/pypi/foo/1.1.0/json",
+        make_pypi_release("foo", "1.1.0", {"Source": "https://github.com/org/foo"}),
+    )
+    _write(
+        mirror_dir,
+        "api.github.com/repos/org/foo/git/matching-refs/tags",
+        make_github_tags({"v1.0.0": "c" * 40, "v1.1.0": "d" * 40}),
+    )
+    for tag in ("v1.0.0", "v1.1.0"):
+        _write(
+            mirror_dir,
+            f"api.github.com/repos/org/foo/license?ref={tag}",
+            make_github_license("org", "foo", f"License at {tag}\n"),
+        )
+
+    packages = _collect(executor, ["foo==1.0.0\n", "foo==1.1.0\n"], engine)
+
+    assert [p.license_file for p in packages] == [
+        b"License at v1.0.0\n",
+        b"License at v1.1.0\n",
+    ]
+
+
+def test_collect_from_mirror_searching_source_tree(
+    executor: Executor, mirror_dir: Path
+):
+    mirror_dir.joinpath("api.github.com/repos/org/foo/license").unlink()
+    # The repository is both a file and a directory of the other files
+    files = {
+        "index.html": json.dumps({"default_branch": "main"}).encode(),
+        "git/trees/main": make_github_tree({"COPYING": "blob"}),
+        "contents/COPYING?ref=main": make_github_content(
+            "org", "foo", "COPYING", "MIT License\n"
+        ),
+    }
+    for path, content in files.items():
+        _write(mirror_dir, f"api.github.com/repos/org/foo/{path}", content)
+
+    packages = _collect(executor, ["foo==1.0.0\n"], "thread")
+
+    assert [p.license_file for p in packages] == [b"MIT License\n"]
+
+
+def test_collect_from_mirror_keeps_case_of_names(executor: Executor, mirror_dir: Path):
+    _write(
+        mirror_dir,
+        "pypi.org/pypi/flake8/7.0.0/json",
+        make_pypi_release(
+            "flake8", "7.0.0", {"Source": "https://github.com/PyCQA/flake8"}
+        ),
+    )
+    _write(
+        mirror_dir,
+        "api.github.com/repos/PyCQA/flake8/license",
+        make_github_license("PyCQA", "flake8", "MIT License\n"),
+    )
+
+    packages = _collect(executor, ["flake8==7.0.0\n"], "thread")
+
+    assert [p.license_file for p in packages] == [b"MIT License\n"]
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from dlc.exceptions import ApiRateLimitError
+from dlc.rate_limit import RateLimiter
+from dlc.settings import SETTINGS
+
+
+def test_burst_then_pace():
+    limiter = RateLimiter("test", rate=10.0, burst=3)
+    delays = [limiter.reserve() for _ in range(5)]
+
+    assert delays[:3] == pytest.approx([0, 0, 0], abs=0.01)
+    assert delays[3:] == pytest.approx([0.1, 0.2], abs=0.01)
+
+
+def test_pause_until_reset_when_quota_is_exhausted():
+    limiter = RateLimiter("test", rate=1000.0, burst=1000)
+    limiter.update(
+        200,
+        {"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": str(time.time() + 30)},
+    )
+
+    assert limiter.reserve() == pytest.approx(0, abs=0.1)
+    assert limiter.reserve() == pytest.approx(0, abs=0.1)
+    assert limiter.reserve() == pytest.approx(30, abs=1)
+
+
+def test_pause_on_retry_after():
+    limiter = RateLimiter("test", rate=1000.0, burst=1000)
+    limiter.update(403, {"Retry-After": "20", "X-RateLimit-Remaining": "100"})
+
+    # Every worker waits for the same pause, not for its own back-off
+    assert limiter.reserve() == pytest.approx(20, abs=1)
+    assert limiter.reserve() == pytest.approx(20, abs=1)
+
+
+def test_pause_only_on_rate_limit():
+    limiter = RateLimiter("test", rate=1000.0, burst=1000)
+    limiter.update(403, {"X-RateLimit-Remaining": "100"}, b'{"message": "Forbidden"}')
+    assert limiter.reserve() == pytest.approx(0, abs=0.1)
+
+    content = b'{"message": "You have exceeded a secondary rate limit."}'
+    limiter.update(403, {"X-RateLimit-Remaining": "100"}, content)
+    assert limiter.reserve() == pytest.approx(60, abs=1)
+
+
+def test_reset():
+    limiter = RateLimiter("test", rate=1.0, burst=1)
+    limiter.update(403, {"Retry-After": "20"})
+
+    limiter.reset(rate=10.0)
+
+    assert limiter.rate == 10.0
+    assert limiter.reserve() == pytest.approx(0, abs=0.1)
+    assert limiter.reserve() == pytest.approx(0.1, abs=0.05)
+
+
+def test_give_up_waiting_too_long(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(SETTINGS, "rate_limit_max_wait", 10.0)
+    limiter = RateLimiter("test", rate=1000.0, burst=1000)
+    limiter.update(
+        403,
+        {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(time.time() + 3600)},
+    )
+
+    with pytest.raises(ApiRateLimitError):
+        limiter.reserve()
@@ -0,0 +1,163 @@
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Executor
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from dlc.cli import main
+from dlc.client import query_packages
+from dlc.exceptions import ServerError
+from dlc.reports.license_jsonl import read_license_jsonl
+from dlc.server import PackageService, make_server
+from dlc.settings import SETTINGS
+from tests.stub_server import StubServer, make_github_license, make_pypi_release
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def dlc_server(
+    request: pytest.FixtureRequest,
+    monkeypatch: pytest.MonkeyPatch,
+    executor: Executor,
+    tmp_path: Path,
+) -> Iterator[PackageService]:
+    service = PackageService(executor, ttl=60)
+    if request.param == "unix":
+        socket_path = tmp_path / "dlc.sock"
+        monkeypatch.setattr(SETTINGS, "server_socket", socket_path)
+        server = make_server(service, socket_path=socket_path)
+    else:
+        server = make_server(service, port=0)
+        _, port = server.server_address  # type: ignore[misc,str-unpack]
+        monkeypatch.setattr(SETTINGS, "server_port", port)
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield service
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def _add_package(stub_server: StubServer, name: str) -> None:
+    stub_server.add(
+        f"/pypi/{name}/1.0.0/json",
+        make_pypi_release(name, "1.0.0", {"Source": f"https://github.com/org/{name}"}),
+    )
+    stub_server.add(
+        f"/repos/org/{name}/license",
+        make_github_license("org", name, f"License of {name}\n"),
+    )
+
+
+def test_query_reuses_results(stub_server: StubServer, dlc_server: PackageService):
+    _add_package(stub_server, "foo")
+    _add_package(stub_server, "bar")
+
+    packages = query_packages("foo==1.0.0\n")
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("foo", b"License of foo\n")
+    ]
+
+    packages = query_packages("bar==1.0.0\nfoo==1.0.0\nunknown==1.0.0\n")
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("bar", b"License of bar\n"),
+        ("foo", b"License of foo\n"),
+    ]
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 1
+    assert len(stub_server.requests_to("/repos/org/foo/license")) == 1
+
+
+def test_results_persist_until_expired(
+    stub_server: StubServer, executor: Executor, monkeypatch: pytest.MonkeyPatch
+):
+    _add_package(stub_server, "foo")
+    PackageService(executor, ttl=60).get_packages([("foo", "1.0.0")])
+
+    # Another server process reads the results in the on-disk cache
+    PackageService(executor, ttl=60).get_packages([("foo", "1.0.0")])
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 1
+
+    monkeypatch.setattr(SETTINGS, "use_cache", False)
+    service = PackageService(executor, ttl=0)
+    service.get_packages([("foo", "1.0.0")])
+    service.get_packages([("foo", "1.0.0")])
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 3
+
+
+def test_results_in_memory_are_bounded(stub_server: StubServer, executor: Executor):
+    pins = [("foo", "1.0.0"), ("bar", "1.0.0"), ("baz", "1.0.0")]
+    for name, _ in pins:
+        _add_package(stub_server, name)
+    service = PackageService(executor, ttl=60, max_packages=2)
+
+    service.get_packages(pins)
+    assert list(service._packages) == [("bar", "1.0.0"), ("baz", "1.0.0")]
+
+    # The least recently used result is read from the on-disk cache
+    service.get_packages([("foo", "1.0.0")])
+    assert list(service._packages) == [("baz", "1.0.0"), ("foo", "1.0.0")]
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 1
+
+
+def test_license_file_is_served_with_package(
+    stub_server: StubServer, dlc_server: PackageService, executor: Executor
+):
+    stub_server.add(
+        "/pypi/foo/1.0.0/json",
+        make_pypi_release("foo", "1.0.0", license=f"{stub_server.url}/LICENSE"),
+    )
+    stub_server.add("/LICENSE", b"Copyright\n")
+
+    (package,) = query_packages("foo==1.0.0\n")
+    assert package.license_file == b"Copyright\n"
+    assert len(stub_server.requests_to("/LICENSE")) == 1
+
+    # The license file is also kept in the on-disk cache
+    (package,) = PackageService(executor, ttl=60).get_packages([("foo", "1.0.0")])
+    assert package.license_file == b"Copyright\n"
+    assert len(stub_server.requests_to("/LICENSE")) == 1
+
+
+def test_concurrent_queries_share_collection(
+    stub_server: StubServer, dlc_server: PackageService
+):
+    _add_package(stub_server, "foo")
+    stub_server.latency = 0.2
+
+    threads = [
+        threading.Thread(target=query_packages, args=("foo==1.0.0\n",))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stub_server.requests_to("/pypi/foo/1.0.0/json")) == 1
+
+
+@pytest.mark.usefixtures("dlc_server")
+def test_invalid_query():
+    with pytest.raises(ServerError, match="400"):
+        query_packages("foo>=1.0.0\n")
+
+
+def test_query_command(
+    tmp_path: Path, stub_server: StubServer, dlc_server: PackageService
+):
+    _add_package(stub_server, "foo")
+    outdir = tmp_path / "report"
+
+    args = ["query", "-o", str(outdir), "-"]
+    result = CliRunner().invoke(main, args, input="foo==1.0.0\n")
+    assert result.exit_code == 0, result.output
+
+    assert outdir.joinpath("index.html").exists()
+    packages = read_license_jsonl(outdir)
+    assert [(p.name, p.license_file) for p in packages] == [
+        ("foo", b"License of foo\n")
+    ]
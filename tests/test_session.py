@@ -0,0 +1,15 @@
+import pytest
+
+from dlc.session import get_session
+from dlc.settings import SETTINGS
+
+
+def test_session_is_shared(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(SETTINGS, "max_workers", 3)
+    session = get_session()
+    assert get_session() is session
+    assert session.adapters["https://"]._pool_maxsize == 3  # type: ignore[attr-defined]
+
+    monkeypatch.setattr(SETTINGS, "max_workers", 5)
+    assert get_session() is not session
+    assert get_session().adapters["https://"]._pool_maxsize == 5  # type: ignore[attr-defined]